@@ -0,0 +1,70 @@
+"""
+Presupuesto de tiempo de importación de la aplicación.
+
+Mide, en intérpretes nuevos, cuánto tarda 'import src.app' (lo que separa
+'python main.py' de la pantalla de bienvenida) y comprueba que no arrastra
+las bibliotecas pesadas, que deben cargarse de forma diferida.
+
+Uso:
+    python -m benchmarks.arranque
+"""
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRESUPUESTO_IMPORTACION_S = 0.35  # 'import src.app' en frío, mejor de varias ejecuciones
+MODULOS_DIFERIDOS = ("matplotlib", "seaborn", "pandas")
+EJECUCIONES = 5
+
+_SONDA = """
+import json, sys, time
+inicio = time.perf_counter()
+import src.app
+segundos = time.perf_counter() - inicio
+print(json.dumps({"segundos": segundos, "cargados": [m for m in %r if m in sys.modules]}))
+""" % (MODULOS_DIFERIDOS,)
+
+
+def medir_importacion(ejecuciones: int = EJECUCIONES) -> Dict[str, Any]:
+    """
+    Importa 'src.app' en 'ejecuciones' procesos nuevos.
+
+    Returns:
+        Diccionario con el mejor tiempo ('segundos') y los módulos diferidos que
+        se hayan cargado igualmente ('cargados').
+    """
+    mejor = None
+    for _ in range(ejecuciones):
+        salida = subprocess.run(
+            [sys.executable, "-c", _SONDA],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        medida = json.loads(salida.stdout.strip().splitlines()[-1])
+        if mejor is None or medida["segundos"] < mejor["segundos"]:
+            mejor = medida
+    return mejor
+
+
+def comprobar_presupuesto(presupuesto: float = PRESUPUESTO_IMPORTACION_S) -> bool:
+    """Mide la importación e informa. False si se supera el presupuesto o se carga algo diferido."""
+    medida = medir_importacion()
+    correcto = True
+    print(f"import src.app: {medida['segundos'] * 1000:.0f} ms (presupuesto {presupuesto * 1000:.0f} ms)")
+    if medida["segundos"] > presupuesto:
+        print("PRESUPUESTO SUPERADO: el arranque es más lento de lo permitido.")
+        correcto = False
+    if medida["cargados"]:
+        print(f"IMPORTACIÓN NO DIFERIDA: {', '.join(medida['cargados'])} se carga al arrancar.")
+        correcto = False
+    return correcto
+
+
+if __name__ == "__main__":
+    sys.exit(0 if comprobar_presupuesto() else 1)
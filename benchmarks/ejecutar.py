@@ -0,0 +1,390 @@
+"""
+Benchmarks de carga, filtrado, análisis y exportación sobre datos sintéticos.
+
+Genera (o reutiliza) un CSV sintético por tamaño, mide cada operación varias
+veces y se queda con el mejor tiempo. Los resultados se guardan en JSON y se
+comparan con una referencia guardada: si alguna medida empeora más de la
+tolerancia, si 'import src.app' supera su presupuesto (ver
+benchmarks/arranque.py) o si la exportación de viajes a Parquet/Arrow no
+reproduce los datos (ver benchmarks/exportacion.py), se indica y el proceso
+termina con código 1.
+
+También se mide la agregación global en serie y en paralelo sobre el almacén
+mapeado y el arranque del pool de procesos; con ello se estima a partir de
+cuántas filas compensa repartir (Configuracion.MIN_FILAS_PARALELO).
+
+La referencia se guarda de 10k a 10M filas (TAMANOS_REFERENCIA), por encima de
+Configuracion.MIN_FILAS_PARALELO. La ejecución por defecto se queda en 1M: con
+10M cada carga del CSV tarda minutos y la batería completa pasa de media hora.
+Las medidas sin valor en la referencia se listan aparte (no se comparan).
+
+Uso:
+    python -m benchmarks.ejecutar --tamanos 10k 100k 1M
+    python -m benchmarks.ejecutar --guardar-referencia  # 10k, 100k, 1M y 10M
+"""
+import argparse
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.arranque import comprobar_presupuesto
+from benchmarks.exportacion import comprobar_exportacion_viajes
+from benchmarks.generador import generar_csv
+from src.config import Configuracion
+from src.controllers.main_controller import ControladorPrincipal
+from src.models.cubo_temporal import CuboTemporal
+from src.models.data_model import COLUMNA_DURACION, COLUMNA_HORA_DIA, ModeloDatos
+from src.models.matriz_od import MatrizOD
+from src.services.analytics_service import ServicioAnalisis
+from src.services.export_service import ServicioExportacion
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+RUTA_REFERENCIA = os.path.join(DIRECTORIO, "referencia.json")
+RUTA_RESULTADOS = os.path.join(DIRECTORIO, "resultados.json")
+
+TAMANOS_POR_DEFECTO = ["10k", "100k", "1M"]
+TAMANOS_REFERENCIA = ["10k", "100k", "1M", "10M"]
+TRABAJADORES_POR_DEFECTO = max(os.cpu_count() or 1, 2)
+TOLERANCIA = 0.25        # Empeoramiento relativo admitido frente a la referencia
+MARGEN_ABSOLUTO = 0.005  # Diferencias menores (s) se consideran ruido
+SUFIJOS = {"k": 1_000, "m": 1_000_000}
+
+
+def parsear_tamano(texto: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500."""
+    texto = texto.strip().lower().replace("_", "")
+    if texto and texto[-1] in SUFIJOS:
+        return int(float(texto[:-1]) * SUFIJOS[texto[-1]])
+    return int(texto)
+
+
+def medir(funcion: Callable[[], Any], repeticiones: int) -> float:
+    """Mejor tiempo (s) de 'repeticiones' ejecuciones de la función."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+class _VistaNula:
+    """Lo mínimo que el controlador necesita de la vista para construirse."""
+
+    btn_entrar = SimpleNamespace(config=lambda **_: None)
+
+    def mostrar_progreso_carga(self, filas: int, fraccion: float):
+        pass
+
+
+def arrancar_pool(trabajadores: int) -> None:
+    """Arranca un pool de procesos como el de la agregación y le da trabajo trivial."""
+    contexto = multiprocessing.get_context(Configuracion.INICIO_PROCESOS)
+    with ProcessPoolExecutor(max_workers=trabajadores, mp_context=contexto) as ejecutor:
+        for futuro in [ejecutor.submit(os.getpid) for _ in range(trabajadores)]:
+            futuro.result()
+
+
+def estimar_umbral_paralelo(
+    resultados: Dict[str, Dict[str, float]], trabajadores: int
+) -> Dict[str, Optional[int]]:
+    """
+    Filas a partir de las cuales la agregación en paralelo compensa.
+
+    'medido' es el menor tamaño en que el paralelo ha sido más rápido (None si
+    no lo ha sido en ninguno). 'estimado' supone 'trabajadores' núcleos libres:
+    repartir ahorra (1 - 1/trabajadores) del coste en serie por fila y el pool
+    cuesta lo medido en 'arranque_pool_procesos' (del tamaño mayor).
+    """
+    medido = None
+    for filas in sorted(resultados, key=int):
+        tiempos = resultados[filas]
+        if tiempos["agregar_por_destino_paralelo"] < tiempos["agregar_por_destino_serie"]:
+            medido = int(filas)
+            break
+
+    mayor = max(resultados, key=int)
+    coste_fila = resultados[mayor]["agregar_por_destino_serie"] / int(mayor)
+    ahorro_fila = coste_fila * (1 - 1 / trabajadores)
+    arranque = resultados[mayor]["arranque_pool_procesos"]
+    estimado = int(arranque / ahorro_fila) if ahorro_fila > 0 else None
+    return {"trabajadores": trabajadores, "medido": medido, "estimado": estimado}
+
+
+def ejecutar_tamano(
+    ruta_csv: str, repeticiones: int, salida: str, trabajadores: int
+) -> Dict[str, float]:
+    """Mide todas las operaciones sobre un CSV. Devuelve medida -> segundos."""
+    tiempos: Dict[str, float] = {}
+
+    def cargar(**opciones) -> ModeloDatos:
+        modelo = ModeloDatos(modo_almacen=opciones.pop("modo", "memoria"))
+        modelo.cargar_datos(ruta_csv, **opciones)
+        return modelo
+
+    # --- Carga ---
+    tiempos["cargar_datos_csv"] = medir(lambda: cargar(usar_cache=False), repeticiones)
+    cargar(usar_cache=True)  # Crea la caché binaria
+    tiempos["cargar_datos_cache"] = medir(lambda: cargar(usar_cache=True), repeticiones)
+    cargar(modo="mmap")  # Crea el almacén en disco
+    tiempos["cargar_datos_mmap"] = medir(lambda: cargar(modo="mmap"), repeticiones)
+
+    modelo = cargar(usar_cache=True)
+    destinos = modelo.obtener_destinos_unicos()
+    mayor = max(destinos, key=lambda d: len(modelo.obtener_viajes_por_destino(d)))
+
+    # --- Filtrado y análisis ---
+    tiempos["obtener_viajes_por_destino"] = medir(
+        lambda: [modelo.obtener_viajes_por_destino(d) for d in destinos], repeticiones
+    )
+    viajes_mayor = modelo.obtener_viajes_por_destino(mayor)
+    tiempos["procesar_datos_destino_mayor"] = medir(
+        lambda: ServicioAnalisis.procesar_datos_destino(viajes_mayor), repeticiones
+    )
+    tiempos["procesar_datos_destino_todos"] = medir(
+        lambda: [
+            ServicioAnalisis.procesar_datos_destino(modelo.obtener_viajes_por_destino(d))
+            for d in destinos
+        ],
+        repeticiones,
+    )
+
+    # --- Matriz origen-destino ---
+    todos = modelo.obtener_todos()
+    tiempos["construir_matriz_od"] = medir(
+        lambda: MatrizOD.construir(
+            todos.zonas,
+            todos.codigos_zona("Zona_origen"),
+            todos.codigos_zona("Zona_destino"),
+            todos.columna("Importe_total"),
+        ),
+        repeticiones,
+    )
+    matriz = modelo.obtener_matriz_od()
+    tiempos["top_origenes_matriz_od"] = medir(
+        lambda: [matriz.top_origenes(d) for d in destinos], repeticiones
+    )
+
+    # --- Cubo destino × día × hora ---
+    tiempos["construir_cubo_temporal"] = medir(
+        lambda: CuboTemporal.construir(
+            todos.zonas,
+            todos.codigos_zona("Zona_destino"),
+            todos.columna("Hora_inicio"),
+            todos.columna(COLUMNA_HORA_DIA),
+            todos.columna("Importe_total"),
+            todos.columna("Distancia_KM"),
+            todos.columna(COLUMNA_DURACION),
+        ),
+        repeticiones,
+    )
+    cubo = modelo.obtener_cubo_temporal()
+    tiempos["perfil_temporal_todos"] = medir(
+        lambda: [ServicioAnalisis.perfil_temporal(cubo, d) for d in destinos], repeticiones
+    )
+
+    controlador = ControladorPrincipal(modelo, _VistaNula())
+
+    def todos_destinos():
+        controlador.cache_analisis.invalidar()
+        return controlador._obtener_datos_todos_destinos()
+
+    tiempos["obtener_datos_todos_destinos"] = medir(todos_destinos, repeticiones)
+
+    # --- Agregación global en serie y en paralelo (almacén mapeado) ---
+    todos_mapeados = cargar(modo="mmap").obtener_todos()
+    tramo = todos_mapeados.tramo_mapeado()
+    tiempos["agregar_por_destino_serie"] = medir(
+        lambda: ServicioAnalisis.agregar_por_destino(todos_mapeados), repeticiones
+    )
+    tiempos["agregar_por_destino_paralelo"] = medir(
+        lambda: ServicioAnalisis._agregar_en_paralelo(tramo, trabajadores), repeticiones
+    )
+    tiempos["arranque_pool_procesos"] = medir(lambda: arrancar_pool(trabajadores), repeticiones)
+
+    # --- Exportación ---
+    globales = todos_destinos()
+    datos = ServicioAnalisis.procesar_datos_destino(viajes_mayor)
+    datos["destino_nombre"] = mayor
+    exportadores = {
+        "exportar_csv_global": lambda r: ServicioExportacion.exportar_csv_global(globales, r),
+        "exportar_json_global": lambda r: ServicioExportacion.exportar_json_global(globales, r),
+        "exportar_ndjson_global": lambda r: ServicioExportacion.exportar_ndjson_global(globales, r),
+        "exportar_csv": lambda r: ServicioExportacion.exportar_csv(datos, r),
+        "exportar_json": lambda r: ServicioExportacion.exportar_json(datos, r),
+        "exportar_md": lambda r: ServicioExportacion.exportar_md(datos, r, mayor),
+        "exportar_csv_od": lambda r: ServicioExportacion.exportar_csv_od(matriz, r),
+    }
+    if ServicioExportacion.arrow_disponible():
+        exportadores["exportar_parquet_global"] = (
+            lambda r: ServicioExportacion.exportar_parquet_global(globales, r)
+        )
+        exportadores["exportar_parquet_viajes"] = (
+            lambda r: ServicioExportacion.exportar_parquet_viajes(viajes_mayor, r)
+        )
+    for nombre, exportar in exportadores.items():
+        ruta = os.path.join(salida, nombre)
+        tiempos[nombre] = medir(lambda: exportar(ruta), repeticiones)
+
+    controlador._ejecutor.shutdown()
+    return tiempos
+
+
+def comparar(
+    resultados: Dict[str, Dict[str, float]],
+    referencia: Dict[str, Dict[str, float]],
+    tolerancia: float,
+) -> List[Dict[str, Any]]:
+    """Medidas que empeoran más de 'tolerancia' (relativa) y de MARGEN_ABSOLUTO."""
+    regresiones = []
+    for tamano, tiempos in resultados.items():
+        for medida, actual in tiempos.items():
+            previo = referencia.get(tamano, {}).get(medida)
+            if previo is None:
+                continue
+            if actual > previo * (1 + tolerancia) and actual - previo > MARGEN_ABSOLUTO:
+                regresiones.append(
+                    {
+                        "tamano": tamano,
+                        "medida": medida,
+                        "actual": actual,
+                        "referencia": previo,
+                        "factor": actual / previo if previo else float("inf"),
+                    }
+                )
+    return regresiones
+
+
+def sin_referencia(
+    resultados: Dict[str, Dict[str, float]], referencia: Dict[str, Dict[str, float]]
+) -> List[str]:
+    """Medidas ('tamano/medida') que no tienen valor en la referencia."""
+    return [
+        f"{tamano}/{medida}"
+        for tamano, tiempos in resultados.items()
+        for medida in tiempos
+        if medida not in referencia.get(tamano, {})
+    ]
+
+
+def entorno() -> Dict[str, str]:
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": (
+            importlib.metadata.version("pyarrow") if ServicioExportacion.arrow_disponible() else "-"
+        ),
+        "plataforma": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de la aplicación de taxis.")
+    parser.add_argument("--tamanos", nargs="+",
+                        help="Filas de cada CSV sintético (admite k y M). Por defecto "
+                             f"{' '.join(TAMANOS_POR_DEFECTO)}, o "
+                             f"{' '.join(TAMANOS_REFERENCIA)} con --guardar-referencia")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--trabajadores", type=int, default=TRABAJADORES_POR_DEFECTO,
+                        help="Procesos de la agregación en paralelo (por defecto %(default)s)")
+    parser.add_argument("--datos", default=os.path.join(tempfile.gettempdir(), "taxis_benchmark"),
+                        help="Directorio donde se generan (y reutilizan) los CSV")
+    parser.add_argument("--salida", default=RUTA_RESULTADOS, help="JSON de resultados")
+    parser.add_argument("--referencia", default=RUTA_REFERENCIA, help="JSON de referencia")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--guardar-referencia", action="store_true",
+                        help="Guardar estos resultados como nueva referencia")
+    args = parser.parse_args()
+
+    comprobaciones_correctas = comprobar_presupuesto()
+    comprobaciones_correctas &= comprobar_exportacion_viajes()
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    tamanos = args.tamanos or (
+        TAMANOS_REFERENCIA if args.guardar_referencia else TAMANOS_POR_DEFECTO
+    )
+    for texto in tamanos:
+        filas = parsear_tamano(texto)
+        ruta = os.path.join(args.datos, f"NYC_sintetico_{filas}_{args.semilla}.csv")
+        if not os.path.exists(ruta):
+            print(f"Generando {filas:,} viajes en {ruta}...")
+            generar_csv(ruta, filas, args.semilla)
+        print(f"Midiendo {filas:,} viajes...")
+        with tempfile.TemporaryDirectory() as salida:
+            resultados[str(filas)] = ejecutar_tamano(
+                ruta, args.repeticiones, salida, args.trabajadores
+            )
+        for medida, segundos in resultados[str(filas)].items():
+            print(f"  {medida:<32} {segundos * 1000:>10.1f} ms")
+
+    umbral = estimar_umbral_paralelo(resultados, args.trabajadores)
+    medido = (
+        f"más rápida desde {umbral['medido']:,} filas" if umbral["medido"]
+        else "más lenta en todos los tamaños medidos"
+    )
+    estimado = f"{umbral['estimado']:,} filas" if umbral["estimado"] else "-"
+    print(
+        f"Agregación en paralelo con {umbral['trabajadores']} procesos: {medido}; "
+        f"con núcleos libres compensaría desde {estimado} "
+        f"(Configuracion.MIN_FILAS_PARALELO = {Configuracion.MIN_FILAS_PARALELO:,})"
+    )
+
+    informe = {
+        "entorno": entorno(),
+        "semilla": args.semilla,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+        "umbral_paralelo": umbral,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=4)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.guardar_referencia:
+        with open(args.referencia, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=4)
+        print(f"Referencia actualizada en {args.referencia}")
+        return 0 if comprobaciones_correctas else 1
+
+    if not os.path.exists(args.referencia):
+        print("No hay referencia con la que comparar (use --guardar-referencia).")
+        return 0 if comprobaciones_correctas else 1
+    with open(args.referencia, encoding="utf-8") as f:
+        referencia = json.load(f)["resultados"]
+
+    regresiones = comparar(resultados, referencia, args.tolerancia)
+    faltan = sin_referencia(resultados, referencia)
+    if faltan:
+        print(
+            f"SIN REFERENCIA ({len(faltan)} medidas, no comparadas; "
+            f"regenérela con --guardar-referencia): {', '.join(faltan)}"
+        )
+    for r in regresiones:
+        print(
+            f"REGRESIÓN {r['tamano']} filas, {r['medida']}: "
+            f"{r['actual'] * 1000:.1f} ms frente a {r['referencia'] * 1000:.1f} ms "
+            f"(x{r['factor']:.2f})"
+        )
+    if not regresiones:
+        print("Sin regresiones frente a la referencia.")
+    return 1 if regresiones or not comprobaciones_correctas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Comprobación de la exportación de viajes a Parquet / Arrow IPC.
+
+Genera un CSV sintético pequeño con una columna de texto extra, lo carga con
+cada almacén (en memoria y mapeado, donde el texto está codificado como
+diccionario), exporta sus viajes y comprueba que lo leído de vuelta coincide
+con los registros del modelo. Requiere pyarrow; sin él no se comprueba nada.
+
+Uso:
+    python -m benchmarks.exportacion
+"""
+import csv
+import os
+import sys
+import tempfile
+from typing import List
+
+from benchmarks.generador import generar_csv
+from src.models.data_model import ModeloDatos
+from src.services.export_service import ServicioExportacion
+
+FILAS = 5_000
+COLUMNA_TEXTO = "Proveedor"
+TEXTOS = ("Creative Mobile", "VeriFone", "", "Ñandú")
+
+
+def _csv_con_texto(directorio: str) -> str:
+    """CSV sintético con la columna COLUMNA_TEXTO añadida al final."""
+    base = generar_csv(os.path.join(directorio, "NYC_base.csv"), FILAS)
+    ruta = os.path.join(directorio, "NYC_texto.csv")
+    with open(base, encoding="utf-8", newline="") as origen, \
+            open(ruta, "w", encoding="utf-8", newline="") as destino:
+        lector, escritor = csv.reader(origen), csv.writer(destino, lineterminator="\n")
+        escritor.writerow(next(lector) + [COLUMNA_TEXTO])
+        for i, fila in enumerate(lector):
+            escritor.writerow(fila + [TEXTOS[i % len(TEXTOS)]])
+    return ruta
+
+
+def comprobar_exportacion_viajes() -> bool:
+    """Exporta con cada almacén e informa. False si algún archivo no coincide con el modelo."""
+    if not ServicioExportacion.arrow_disponible():
+        print("Exportación Parquet/Arrow: sin pyarrow, no se comprueba.")
+        return True
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    errores: List[str] = []
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = _csv_con_texto(directorio)
+        for modo in ("memoria", "mmap"):
+            modelo = ModeloDatos(modo_almacen=modo)
+            modelo.cargar_datos(ruta_csv, usar_cache=False)
+            viajes = modelo.obtener_todos()
+            esperado = [v[COLUMNA_TEXTO] for v in viajes]
+
+            ruta = os.path.join(directorio, f"viajes_{modo}")
+            ServicioExportacion.exportar_parquet_viajes(viajes, ruta + ".parquet")
+            ServicioExportacion.exportar_arrow_viajes(viajes, ruta + ".arrow")
+            leidos = {
+                "parquet": pq.read_table(ruta + ".parquet"),
+                "arrow": pa.ipc.open_file(ruta + ".arrow").read_all(),
+            }
+            for formato, tabla in leidos.items():
+                if tabla.column(COLUMNA_TEXTO).to_pylist() != esperado:
+                    errores.append(f"{formato} con almacén '{modo}'")
+
+    if errores:
+        print(f"EXPORTACIÓN INCORRECTA: '{COLUMNA_TEXTO}' no coincide en {', '.join(errores)}.")
+        return False
+    print("Exportación Parquet/Arrow de viajes (memoria y mmap): correcta.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if comprobar_exportacion_viajes() else 1)
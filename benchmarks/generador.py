@@ -0,0 +1,160 @@
+"""
+Generador reproducible de viajes sintéticos con el esquema de los CSV 'NYC_*'.
+
+Las distribuciones imitan las de la muestra de enero de 2025: zonas con
+frecuencias de tipo Zipf (pocas zonas concentran muchos viajes), mayoría de
+pagos con forma 1, distancias log-normales y tarifas proporcionales a la
+distancia. La misma semilla produce siempre el mismo archivo.
+
+Uso:
+    python -m benchmarks.generador --filas 1000000 --salida /tmp/NYC_209901.csv
+"""
+import argparse
+import calendar
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+CABECERAS = [
+    "ID_Viaje", "Hora_inicio", "Hora_fin", "N_pasajeros", "Distancia_KM",
+    "Forma_de_pago", "Tarfia_base", "Extra", "Tax", "Propina", "Coste_Peaje",
+    "Recargo_adicional", "Importe_total", "Zona_origen", "Zona_destino",
+]
+
+N_ZONAS = 263  # Zonas de taxi de la ciudad de Nueva York
+EXPONENTE_ZIPF = 1.1
+PROB_MISMA_ZONA = 0.05  # Viajes que terminan en la zona de origen
+
+# Frecuencias observadas en la muestra
+FORMAS_PAGO = ([1, 2, 3, 4], [0.811, 0.160, 0.007, 0.022])
+PASAJEROS = ([0, 1, 2, 3, 4, 5, 6], [0.008, 0.638, 0.235, 0.058, 0.049, 0.006, 0.006])
+EXTRAS = ([1.0, 3.5, 0.0, 6.0, -1.0], [0.744, 0.208, 0.020, 0.014, 0.014])
+
+FILAS_POR_TROZO = 1_000_000
+
+
+def _pesos_zipf(n: int, exponente: float) -> np.ndarray:
+    pesos = 1.0 / np.arange(1, n + 1) ** exponente
+    return pesos / pesos.sum()
+
+
+def _tabla_fechas(anio: int, mes: int, minutos: int) -> np.ndarray:
+    """Texto 'dd/mm/YYYY H:MM' de cada minuto desde el inicio del mes."""
+    inicio = datetime(anio, mes, 1)
+    return np.array(
+        [
+            f"{f.day:02d}/{f.month:02d}/{f.year} {f.hour}:{f.minute:02d}"
+            for f in (inicio + timedelta(minutes=m) for m in range(minutos))
+        ],
+        dtype=object,
+    )
+
+
+def generar_trozo(
+    rng: np.random.Generator,
+    n: int,
+    primer_id: int,
+    zonas: np.ndarray,
+    pesos_origen: np.ndarray,
+    pesos_destino: np.ndarray,
+    fechas: np.ndarray,
+    desde: int,
+    hasta: int,
+) -> pd.DataFrame:
+    """Genera 'n' viajes ordenados por hora de inicio, entre los minutos 'desde' y 'hasta'."""
+    origen = rng.choice(len(zonas), size=n, p=pesos_origen)
+    destino = rng.choice(len(zonas), size=n, p=pesos_destino)
+    misma = rng.random(n) < PROB_MISMA_ZONA
+    destino[misma] = origen[misma]
+
+    distancia = np.round(rng.lognormal(mean=0.59, sigma=0.85, size=n), 2)
+    velocidad = rng.normal(14.0, 4.0, size=n).clip(4.0, 60.0)
+    duracion = np.rint(distancia / velocidad * 60).astype(np.int64)
+    inicio = np.sort(rng.integers(desde, max(hasta, desde + 1), size=n))
+
+    forma_pago = rng.choice(FORMAS_PAGO[0], size=n, p=FORMAS_PAGO[1])
+    tarifa = np.round(3.7 + 6.4 * distancia * rng.uniform(0.85, 1.15, size=n), 2)
+    extra = rng.choice(EXTRAS[0], size=n, p=EXTRAS[1])
+    tax = np.where(rng.random(n) < 0.96, 0.5, 0.0)
+    propina = np.where(
+        forma_pago == 1, np.round(tarifa * rng.uniform(0.1, 0.35, size=n), 2), 0.0
+    )
+    peaje = np.where(rng.random(n) < 0.028, 6.94, 0.0)
+    recargo = np.where(rng.random(n) < 0.985, 1, -1)
+    congestion = np.where(rng.random(n) < 0.7, 2.5, 0.0)
+    total = np.round(tarifa + extra + tax + propina + peaje + recargo + congestion, 2)
+
+    return pd.DataFrame(
+        {
+            "ID_Viaje": np.arange(primer_id, primer_id + n),
+            "Hora_inicio": fechas[inicio],
+            "Hora_fin": fechas[inicio + duracion],
+            "N_pasajeros": rng.choice(PASAJEROS[0], size=n, p=PASAJEROS[1]),
+            "Distancia_KM": distancia,
+            "Forma_de_pago": forma_pago,
+            "Tarfia_base": tarifa,
+            "Extra": extra,
+            "Tax": tax,
+            "Propina": propina,
+            "Coste_Peaje": peaje,
+            "Recargo_adicional": recargo,
+            "Importe_total": total,
+            "Zona_origen": zonas[origen],
+            "Zona_destino": zonas[destino],
+        },
+        columns=CABECERAS,
+    )
+
+
+def generar_csv(
+    ruta: str, filas: int, semilla: int = 42, anio: int = 2099, mes: int = 1
+) -> str:
+    """
+    Escribe un CSV sintético de 'filas' viajes en 'ruta' (por trozos de
+    FILAS_POR_TROZO filas, sin tener todo el archivo en memoria).
+
+    Returns:
+        La ruta escrita.
+    """
+    rng = np.random.default_rng(semilla)
+    zonas = np.array([f"Zona {i:03d}" for i in range(1, N_ZONAS + 1)], dtype=object)
+    # Rankings de popularidad distintos para origen y destino
+    pesos_origen = _pesos_zipf(N_ZONAS, EXPONENTE_ZIPF)[rng.permutation(N_ZONAS)]
+    pesos_destino = _pesos_zipf(N_ZONAS, EXPONENTE_ZIPF)[rng.permutation(N_ZONAS)]
+
+    minutos_mes = calendar.monthrange(anio, mes)[1] * 24 * 60
+    # Margen para viajes que terminan después de fin de mes
+    fechas = _tabla_fechas(anio, mes, minutos_mes + 24 * 60)
+
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8", newline="") as f:
+        # Cada trozo ocupa su parte del mes, así el archivo sale ordenado por inicio
+        trozos = max(-(-filas // FILAS_POR_TROZO), 1)
+        for k in range(trozos):
+            desde, hasta = k * filas // trozos, (k + 1) * filas // trozos
+            trozo = generar_trozo(
+                rng, hasta - desde, desde + 1, zonas, pesos_origen, pesos_destino, fechas,
+                k * minutos_mes // trozos, (k + 1) * minutos_mes // trozos,
+            )
+            trozo.to_csv(f, header=k == 0, index=False, lineterminator="\n")
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un CSV de viajes sintéticos.")
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    # Sin valor por defecto en data/: la app cargaría el archivo sintético
+    parser.add_argument("--salida", required=True, help="Ruta del CSV, p. ej. /tmp/NYC_209901.csv")
+    args = parser.parse_args()
+    print(generar_csv(args.salida, args.filas, args.semilla))
+
+
+if __name__ == "__main__":
+    main()
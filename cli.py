@@ -0,0 +1,8 @@
+import sys
+from src.cli import ModoLotes
+
+def main():
+    sys.exit(ModoLotes.ejecutar())
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+import threading
 import tkinter as tk
 from src.config import Configuracion
+from src.instrumentacion import Instrumentacion
 from src.views.styles import configurar_estilos
-from src.views.main_view import VistaPrincipal
+from src.views.main_view import VistaPrincipal, cargar_graficos
 from src.models.data_model import ModeloDatos
 from src.controllers.main_controller import ControladorPrincipal
 
@@ -39,3 +41,17 @@ class Aplicacion:
         
         # 3. Crear Controlador (inyecta modelo y vista)
         controlador = ControladorPrincipal(modelo, vista)
+
+        # 4. Con la bienvenida ya pintada, importar en segundo plano las
+        # bibliotecas de gráficos para que el primer análisis no las espere
+        if Configuracion.PRECARGAR_GRAFICOS:
+            self.raiz.after(Configuracion.RETARDO_PRECARGA_MS, self._precargar_dependencias)
+
+    @staticmethod
+    def _precargar_dependencias():
+        def importar():
+            with Instrumentacion.etapa("arranque.precarga", "arranque"):
+                import pandas  # noqa: F401
+                cargar_graficos()
+
+        threading.Thread(target=importar, name="precarga", daemon=True).start()
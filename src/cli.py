@@ -0,0 +1,266 @@
+"""
+Modo por lotes sin interfaz gráfica.
+
+Carga uno o varios CSV, calcula el análisis con ServicioAnalisis y escribe los
+formatos de ServicioExportacion en las rutas indicadas. No importa tkinter,
+matplotlib ni seaborn, así que funciona en servidores sin pantalla (cron).
+"""
+import argparse
+import glob
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from src.config import Configuracion
+from src.models.data_model import ModeloDatos
+from src.services.analytics_service import ServicioAnalisis
+from src.services.export_service import ServicioExportacion
+
+# Formatos de exportación disponibles en cada modo
+FORMATOS_GLOBALES = ("csv", "json", "ndjson", "parquet", "arrow")
+FORMATOS_DESTINO = ("csv", "json", "md", "parquet", "arrow")
+FORMATOS = ("csv", "json", "md", "ndjson", "parquet", "arrow")
+# Con --destino, Parquet y Arrow exportan los viajes del destino (no el resumen)
+FORMATOS_COLUMNARES = ("parquet", "arrow")
+
+
+class ModoLotes:
+    """
+    Ejecución de informes desde la línea de comandos.
+
+    Con '--destino' se exporta el análisis de cada destino pedido (y, en
+    Parquet/Arrow, sus viajes); sin él, el análisis global de todos los
+    destinos. Con '--por-archivo' cada CSV se procesa por separado con un
+    modelo nuevo, de modo que la memoria usada depende del archivo más grande
+    y no de la suma de todos.
+    """
+
+    @staticmethod
+    def construir_parser() -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(
+            prog="cli.py",
+            description="Genera los informes de viajes sin interfaz gráfica.",
+        )
+        parser.add_argument(
+            "datos",
+            nargs="*",
+            default=[Configuracion.RUTA_DATOS],
+            help="CSV, directorios o patrones glob (por defecto %(default)s)",
+        )
+        parser.add_argument(
+            "-d", "--destino", action="append", default=[],
+            help="Destino a exportar (repetible). Sin él se exporta el análisis global",
+        )
+        for formato in FORMATOS:
+            parser.add_argument(
+                f"--{formato}", metavar="RUTA",
+                help=f"Ruta de salida {formato.upper()}. Admite {{destino}} y {{fuente}}"
+                     " (CSV, JSON y NDJSON globales se comprimen si acaba en '.gz')",
+            )
+        parser.add_argument(
+            "--od", metavar="RUTA",
+            help="Ruta de salida de la matriz origen-destino completa: CSV (o '.csv.gz'),"
+                 " o Parquet / Arrow IPC según la extensión. Admite {fuente}",
+        )
+        parser.add_argument(
+            "--por-archivo", action="store_true",
+            help="Procesar cada CSV por separado (la ruta de salida debe incluir {fuente})",
+        )
+        parser.add_argument(
+            "--almacen", choices=("memoria", "mmap"), default=Configuracion.MODO_ALMACEN,
+            help="Almacén de columnas (mmap: en disco, menos memoria residente)",
+        )
+        parser.add_argument(
+            "--trabajadores", type=int, default=Configuracion.TRABAJADORES_EXPORTACION,
+            help="Procesos para el análisis global; solo se usan con --almacen mmap"
+                 " y muchas filas (por defecto %(default)s)",
+        )
+        parser.add_argument(
+            "--sin-cache", action="store_true",
+            help="No leer ni escribir la caché binaria junto a los CSV",
+        )
+        parser.add_argument(
+            "-q", "--silencioso", action="store_true", help="No mostrar mensajes de avance"
+        )
+        return parser
+
+    @staticmethod
+    def ejecutar(argumentos: Optional[List[str]] = None) -> int:
+        """
+        Punto de entrada del modo por lotes.
+
+        Returns:
+            Código de salida: 0 si todo ha ido bien, 1 si falta algún archivo
+            o destino.
+        """
+        parser = ModoLotes.construir_parser()
+        args = parser.parse_args(argumentos)
+
+        salidas = {f: getattr(args, f) for f in FORMATOS if getattr(args, f)}
+        if not salidas and not args.od:
+            opciones = ", ".join(f"--{f}" for f in FORMATOS)
+            parser.error(f"indica al menos una salida ({opciones} u --od)")
+        solo_destino = sorted(set(salidas) - set(FORMATOS_GLOBALES))
+        if not args.destino and solo_destino:
+            opciones = ", ".join(f"--{f}" for f in solo_destino)
+            parser.error(f"{opciones} solo está disponible junto con --destino")
+        solo_global = sorted(set(salidas) - set(FORMATOS_DESTINO))
+        if args.destino and solo_global:
+            opciones = ", ".join(f"--{f}" for f in solo_global)
+            parser.error(f"{opciones} solo está disponible para el análisis global")
+        columnares = set(salidas) & set(FORMATOS_COLUMNARES) or (
+            args.od and not ModoLotes._es_csv(args.od)
+        )
+        if columnares and not ServicioExportacion.arrow_disponible():
+            parser.error("--parquet y --arrow requieren pyarrow (pip install pyarrow)")
+        if len(args.destino) > 1 and any("{destino}" not in r for r in salidas.values()):
+            parser.error("con varios destinos las rutas de salida deben incluir {destino}")
+
+        # Un argumento sin archivos (p. ej. un mes mal escrito) no se omite en silencio
+        sin_archivos = [p for p in args.datos if not ModoLotes._expandir([p])]
+        if sin_archivos:
+            print(f"Error: ningún archivo coincide con {sin_archivos}", file=sys.stderr)
+            return 1
+        rutas = ModoLotes._expandir(args.datos)
+
+        if args.por_archivo:
+            plantillas = [*salidas.values(), *([args.od] if args.od else [])]
+            if len(rutas) > 1 and any("{fuente}" not in r for r in plantillas):
+                parser.error("con --por-archivo las rutas de salida deben incluir {fuente}")
+            # Etiquetas calculadas sobre todos los archivos: dos homónimos en
+            # directorios distintos no escriben en la misma ruta de salida
+            grupos = list(zip(([r] for r in rutas), ModeloDatos.etiquetas_fuente(rutas)))
+        else:
+            grupos = [(rutas, None)]
+
+        correcto = True
+        for grupo, etiqueta in grupos:
+            # Un modelo por grupo: al terminar se libera antes de cargar el siguiente
+            modelo = ModeloDatos(modo_almacen=args.almacen)
+            if not args.silencioso:
+                modelo.suscribir_progreso(ModoLotes._mostrar_progreso)
+            ModoLotes._cargar(modelo, grupo, usar_cache=not args.sin_cache)
+            fuente = etiqueta or "+".join(modelo.obtener_fuentes())
+
+            if args.destino:
+                correcto &= ModoLotes._exportar_destinos(
+                    modelo, args.destino, salidas, fuente, args.silencioso
+                )
+            elif salidas:
+                # Los agregados se calculan una vez; cada formato finaliza y
+                # escribe los destinos uno a uno, sin reunir los resultados
+                estados = ServicioAnalisis.agregar_por_destino(
+                    modelo.obtener_todos(),
+                    trabajadores=args.trabajadores,
+                    matriz=modelo.obtener_matriz_od(),
+                )
+                exportadores = {
+                    "csv": ServicioExportacion.exportar_csv_global,
+                    "json": ServicioExportacion.exportar_json_global,
+                    "ndjson": ServicioExportacion.exportar_ndjson_global,
+                    "parquet": ServicioExportacion.exportar_parquet_global,
+                    "arrow": ServicioExportacion.exportar_arrow_global,
+                }
+                for formato, plantilla in salidas.items():
+                    ruta = ModoLotes._ruta_salida(plantilla, fuente=fuente)
+                    exportadores[formato](ServicioAnalisis.finalizar_por_destino(estados), ruta)
+                    ModoLotes._informar(f"Exportación global a {ruta} completada.", args.silencioso)
+            if args.od:
+                ruta = ModoLotes._ruta_salida(args.od, fuente=fuente)
+                ModoLotes._exportar_od(modelo, ruta)
+                ModoLotes._informar(f"Matriz origen-destino en {ruta} completada.", args.silencioso)
+            del modelo
+
+        return 0 if correcto else 1
+
+    @staticmethod
+    def _expandir(patrones: List[str]) -> List[str]:
+        """Rutas de CSV de los argumentos (archivos, directorios o globs), sin repetir."""
+        rutas: List[str] = []
+        for patron in patrones:
+            if os.path.isdir(patron):
+                patron = os.path.join(patron, "*.csv")
+            rutas.extend(sorted(glob.glob(patron)))
+        return list(dict.fromkeys(rutas))
+
+    @staticmethod
+    def _cargar(modelo: ModeloDatos, rutas: List[str], usar_cache: bool) -> None:
+        if len(rutas) == 1:
+            # Respeta el almacén elegido (cargar_varios carga siempre en memoria)
+            avisos = modelo.cargar_datos(rutas[0], usar_cache=usar_cache)
+        else:
+            avisos = modelo.cargar_varios(rutas, usar_cache=usar_cache)
+        for aviso in avisos:
+            print(f"Aviso: {aviso}", file=sys.stderr)
+
+    @staticmethod
+    def _exportar_destinos(
+        modelo: ModeloDatos,
+        destinos: List[str],
+        salidas: Dict[str, str],
+        fuente: str,
+        silencioso: bool,
+    ) -> bool:
+        """Exporta el análisis de cada destino pedido. False si alguno no existe."""
+        correcto = True
+        for destino in destinos:
+            viajes = modelo.obtener_viajes_por_destino(destino)
+            datos = ServicioAnalisis.procesar_datos_destino(viajes)
+            if not datos:
+                print(f"Aviso: no hay viajes con destino '{destino}' en {fuente}", file=sys.stderr)
+                correcto = False
+                continue
+            datos["destino_nombre"] = destino
+
+            for formato, plantilla in salidas.items():
+                ruta = ModoLotes._ruta_salida(plantilla, destino=destino, fuente=fuente)
+                if formato == "csv":
+                    ServicioExportacion.exportar_csv(datos, ruta)
+                elif formato == "json":
+                    ServicioExportacion.exportar_json(datos, ruta)
+                elif formato == "parquet":
+                    ServicioExportacion.exportar_parquet_viajes(viajes, ruta)
+                elif formato == "arrow":
+                    ServicioExportacion.exportar_arrow_viajes(viajes, ruta)
+                else:
+                    ServicioExportacion.exportar_md(datos, ruta, destino)
+                ModoLotes._informar(f"Exportación de {destino} a {ruta} completada.", silencioso)
+        return correcto
+
+    @staticmethod
+    def _exportar_od(modelo: ModeloDatos, ruta: str) -> None:
+        """Escribe la matriz origen-destino en CSV, Parquet o Arrow IPC según la ruta."""
+        matriz = modelo.obtener_matriz_od()
+        if ModoLotes._es_csv(ruta):
+            ServicioExportacion.exportar_csv_od(matriz, ruta)
+        elif ServicioExportacion.formato_columnar(ruta) == "arrow":
+            ServicioExportacion.exportar_arrow_od(matriz, ruta)
+        else:
+            ServicioExportacion.exportar_parquet_od(matriz, ruta)
+
+    @staticmethod
+    def _es_csv(ruta: str) -> bool:
+        return ruta.lower().endswith((".csv", ".csv.gz"))
+
+    @staticmethod
+    def _ruta_salida(plantilla: str, **campos: Any) -> str:
+        """Sustituye {destino} y {fuente} en la ruta (espacios como '_')."""
+        valores = {clave: str(v).replace(" ", "_") for clave, v in campos.items()}
+        valores.setdefault("destino", "global")
+        ruta = plantilla.replace("{destino}", valores["destino"])
+        ruta = ruta.replace("{fuente}", valores.get("fuente", ""))
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        return ruta
+
+    @staticmethod
+    def _mostrar_progreso(filas: int, fraccion: float) -> None:
+        print(f"\rCargando datos... {fraccion:.0%} ({filas:,} viajes)", end="", file=sys.stderr)
+        if fraccion >= 1.0:
+            print(file=sys.stderr)
+
+    @staticmethod
+    def _informar(mensaje: str, silencioso: bool) -> None:
+        if not silencioso:
+            print(mensaje)
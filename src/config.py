@@ -1,3 +1,6 @@
+import os
+
+
 class Configuracion:
     TITULO_APP = "Taxis Analytics Pro"
     TAMANO_VENTANA = "1280x800"
@@ -22,3 +25,31 @@ class Configuracion:
     TAMANO_SUBTITULO = 14
     TAMANO_TEXTO = 11
     TAMANO_KPI = 22 # Para números grandes
+
+    # Carga de datos
+    RUTA_DATOS = os.path.join("data", "NYC_*.csv")  # Archivo, directorio o patrón glob
+    TRABAJADORES_CARGA = os.cpu_count() or 1       # Procesos al cargar varios archivos
+    # Arranque de los procesos trabajadores sin fork: un fork copiaría los
+    # cerrojos tomados por los hilos de Tk, de análisis o de precarga
+    INICIO_PROCESOS = "forkserver" if os.name == "posix" else "spawn"
+    TAMANO_BLOQUE_CARGA = 100_000 # Filas por bloque al leer el CSV
+    USAR_CACHE_BINARIA = True     # Guardar/leer <csv>.cache.npz junto al CSV
+    MODO_ALMACEN = "memoria"      # "memoria" o "mmap" (columnas en disco, <csv>.columnas/)
+    SEGUIR_ARCHIVO = False        # Incorporar los viajes que se añadan al último CSV (modo 'tail')
+    INTERVALO_SEGUIMIENTO_MS = 2000  # Cada cuánto se comprueba si el CSV ha crecido
+
+    # Análisis
+    TAMANO_CACHE_ANALISIS = 32    # Resultados por destino guardados en la caché LRU
+    # Procesos para la exportación global. En serie por defecto: repartir solo
+    # compensa con almacén mapeado, varios núcleos y más de MIN_FILAS_PARALELO filas
+    TRABAJADORES_EXPORTACION = 1
+    # Por debajo, arrancar procesos no compensa. Medido con benchmarks/ejecutar.py
+    # (200k-3M filas, 2 procesos): el pool tarda ~1 s en arrancar y la pasada en
+    # serie ~0.5 s por millón de filas, así que el corte queda en unos 5M filas
+    MIN_FILAS_PARALELO = 5_000_000
+
+    # Rendimiento
+    PRECARGAR_GRAFICOS = True     # Importar matplotlib/seaborn/pandas en segundo plano al arrancar
+    RETARDO_PRECARGA_MS = 100     # Espera tras pintar la bienvenida antes de precargar
+    INSTRUMENTACION = False       # Medir tiempos por etapa (también con TAXIS_PERFIL=1)
+    MAX_EVENTOS_INSTRUMENTACION = 100_000  # Etapas guardadas para el panel y la traza
@@ -1,9 +1,16 @@
+import csv
 import os
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Optional, Tuple
 from tkinter import filedialog
 from src.models.data_model import ModeloDatos
 from src.views.main_view import VistaPrincipal
-from src.services.analytics_service import ServicioAnalisis
+from src.config import Configuracion
+from src.instrumentacion import Instrumentacion
+from src.services.analytics_service import EstadoAgregado, ServicioAnalisis
+from src.services.cache_analisis import CacheAnalisis
 from src.services.export_service import ServicioExportacion
 
 
@@ -17,101 +24,336 @@ class ControladorPrincipal:
         self.modelo = modelo
         self.vista = vista
         self._timer_id = None
-        self.datos_actuales = None  # Cache de datos analizados
+        self.datos_actuales = None  # Análisis del destino mostrado
+        # Resultados por (destino, versión del dataset), con sus agregados en
+        # bruto para sumarles los viajes anexados en modo 'tail' sin recalcular
+        self.cache_analisis = CacheAnalisis(Configuracion.TAMANO_CACHE_ANALISIS)
+        # (destino, versión, agregados) del destino mostrado, fijados aunque la
+        # LRU expulse su entrada: el modo 'tail' nunca lo recalcula entero
+        self._estado_visible: Optional[Tuple[str, Hashable, EstadoAgregado]] = None
+
+        # Análisis en segundo plano: un único hilo trabajador y una cola de
+        # resultados que el hilo de Tk consulta con after()
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analisis")
+        self._resultados: queue.Queue = queue.Queue()
+        self._peticion_actual = 0  # Solo se pinta el resultado de la última petición
+        self._futuro = None
+        self._sondeo_id = None
+        self._seguimiento_id = None  # Temporizador del modo 'tail'
 
         # Vincular la acción del botón 'Entrar'
         self.vista.btn_entrar.config(command=self.entrar_panel)
 
+        # La vista muestra el avance de la carga del CSV
+        self.modelo.suscribir_progreso(self.vista.mostrar_progreso_carga)
+
     def entrar_panel(self):
         """Transición de la pantalla de bienvenida al panel principal."""
         self.vista.mostrar_panel()
         self.vista.lista_destinos.bind(
             "<<ListboxSelect>>", self.manejar_seleccion_destino
         )
+        self.vista.combo_fuente.bind("<<ComboboxSelected>>", self.manejar_cambio_fuente)
+        if self.vista.btn_estadisticas is not None:
+            self.vista.btn_estadisticas.config(command=self.mostrar_estadisticas)
         self.cargar_datos_y_destinos()
 
-    def cargar_datos_y_destinos(self):
-        """Orquesta la carga del archivo CSV y actualiza la lista lateral."""
+    def cargar_datos_y_destinos(self, forzar: bool = False):
+        """
+        Orquesta la carga de los CSV de datos y actualiza la lista lateral.
+
+        Args:
+            forzar: Recarga los archivos aunque ya haya datos en memoria.
+        """
         try:
-            ruta_csv = os.path.join(os.getcwd(), "data", "NYC_202501.csv")
+            ruta_datos = os.path.join(os.getcwd(), Configuracion.RUTA_DATOS)
 
-            if not self.modelo.obtener_todos():
-                self.modelo.cargar_datos(ruta_csv)
+            if forzar or not self.modelo.obtener_todos():
+                avisos = self.modelo.cargar_varios(ruta_datos)
+                self.cache_analisis.invalidar()
+                self._estado_visible = None
+                if avisos:
+                    self.vista.mostrar_aviso("\n".join(avisos))
 
+            self.vista.actualizar_fuentes(self.modelo.obtener_fuentes())
             destinos = self.modelo.obtener_destinos_unicos()
             self.vista.actualizar_lista_destinos(destinos)
 
+            if Configuracion.SEGUIR_ARCHIVO and self._seguimiento_id is None:
+                self._seguimiento_id = self.vista.after(
+                    Configuracion.INTERVALO_SEGUIMIENTO_MS, self._seguir_archivo
+                )
+
         except FileNotFoundError:
-            print("Error: No se encontró el archivo de datos 'NYC_202501.csv'.")
+            print(f"Error: No se encontraron archivos de datos en '{Configuracion.RUTA_DATOS}'.")
         except Exception as e:
             print(f"Error inesperado cargando datos: {e}")
 
+    def _seguir_archivo(self):
+        """
+        Modo 'tail': incorpora los viajes añadidos al CSV más reciente y refresca
+        la lista y el destino mostrado si sus datos han cambiado.
+        """
+        self._seguimiento_id = None
+        conocidos = self.cache_analisis.destinos()
+        if self._estado_visible is not None:
+            conocidos.append(self._estado_visible[0])
+        previas = {d: self.modelo.obtener_version(d) for d in conocidos}
+        try:
+            afectados = self.modelo.leer_anexos()
+        except (ValueError, UnicodeDecodeError, csv.Error, OSError) as e:
+            # Línea malformada o archivo rotado/borrado a mitad de lectura
+            print(f"Seguimiento del archivo desactivado: {e}")
+            return
+
+        if afectados is None:
+            # El archivo ha encogido (rotado o reescrito): recarga completa
+            self.cargar_datos_y_destinos(forzar=True)
+            return
+
+        # Combinar los agregados conocidos con los de los viajes nuevos
+        for destino, nuevos in afectados.items():
+            if destino not in previas:
+                continue
+            estado = self._estado_guardado(destino, previas[destino])
+            if estado is None:
+                continue
+            estado.merge(ServicioAnalisis.agregar(nuevos))
+            self._guardar_estado(destino, self.modelo.obtener_version(destino), estado)
+
+        if afectados:
+            destinos = self.modelo.obtener_destinos_unicos()
+            actual = self.datos_actuales.get("destino_nombre") if self.datos_actuales else None
+            if len(destinos) != self.vista.lista_destinos.cantidad():
+                # Han aparecido destinos nuevos
+                self.vista.actualizar_lista_destinos(destinos)
+                if actual:
+                    self.vista.seleccionar_destino(actual)
+            if actual in afectados:
+                self._actualizar_vista(refresco=True)
+
+        self._seguimiento_id = self.vista.after(
+            Configuracion.INTERVALO_SEGUIMIENTO_MS, self._seguir_archivo
+        )
+
+    def manejar_cambio_fuente(self, evento: tk.Event):
+        """Limita el análisis al mes elegido (o a todos) y refresca la lista."""
+        fuente = self.vista.obtener_fuente_seleccionada()
+        if fuente == self.modelo.obtener_fuente_activa():
+            return
+        self.modelo.seleccionar_fuente(fuente)
+
+        destinos = self.modelo.obtener_destinos_unicos()
+        self.vista.actualizar_lista_destinos(destinos)
+
+        # Volver a mostrar el destino actual con los datos del nuevo filtro
+        if self.datos_actuales:
+            destino = self.datos_actuales.get("destino_nombre")
+            if destino in destinos:
+                self.vista.seleccionar_destino(destino)
+                self._actualizar_vista()
+
     def manejar_seleccion_destino(self, evento: tk.Event):
         """Handler para el evento de selección con debounce."""
         if self._timer_id:
             self.vista.after_cancel(self._timer_id)
         self._timer_id = self.vista.after(250, self._actualizar_vista)
 
-    def _actualizar_vista(self):
-        """Calcula el análisis y actualiza la vista con los nuevos datos."""
+    def _actualizar_vista(self, refresco: bool = False):
+        """
+        Muestra el análisis del destino seleccionado.
+
+        Si está en caché se pinta al momento; si no, se calcula en el hilo
+        trabajador mientras la vista muestra un estado de carga.
+
+        Args:
+            refresco: Recalcula el destino ya mostrado (p. ej. con viajes nuevos)
+                sin pasar por el estado de carga.
+        """
         self._timer_id = None
 
-        seleccion = self.vista.lista_destinos.curselection()
-        if seleccion:
-            index = seleccion[0]
-            destino = self.vista.lista_destinos.get(index)
+        destino = self.vista.obtener_destino_seleccionado()
+        if destino is None:
+            return
+        version = self.modelo.obtener_version(destino)
 
-            # 1. Obtener viajes crudos
-            viajes = self.modelo.obtener_viajes_por_destino(destino)
+        # Cualquier petición anterior queda obsoleta
+        self._peticion_actual += 1
+        if self._futuro is not None:
+            self._futuro.cancel()  # Solo tiene efecto si aún no ha empezado
+            self._futuro = None
 
-            # 2. Procesar métricas en el controlador
-            datos = ServicioAnalisis.procesar_datos_destino(viajes)
-            if not datos:
-                return
+        datos = self.cache_analisis.obtener(destino, version)
+        if datos is not None:
+            self._mostrar_datos(destino, datos)
+            return
 
-            self.datos_actuales = datos
-            self.datos_actuales["destino_nombre"] = (
-                destino  # Guardar nombre para reportes
-            )
+        if not refresco:
+            self.vista.mostrar_cargando(destino)
+        self._futuro = self._ejecutor.submit(
+            self._analizar_en_segundo_plano, self._peticion_actual, destino, version
+        )
+        if self._sondeo_id is None:
+            self._sondeo_id = self.vista.after(50, self._sondear_resultados)
 
-            # 3. Preparar callbacks de exportación
-            # Nota: CSV y JSON ahora son GLOBALES, MD y PNG son ACTUALES
-            callbacks = {
-                "csv": lambda: self.exportar_global("csv"),
-                "json": lambda: self.exportar_global("json"),
-                "md": lambda: self.exportar_actual("md"),
-                "png": lambda: self.exportar_actual("png"),
-            }
+    def _analizar_en_segundo_plano(self, peticion: int, destino: str, version: Hashable):
+        """Se ejecuta en el hilo trabajador: no debe tocar widgets de Tk."""
+        try:
+            estado, error = self._calcular_estado(destino), None
+        except Exception as e:
+            print(f"Error analizando {destino}: {e}")
+            estado, error = None, str(e) or type(e).__name__
+        self._resultados.put((peticion, destino, version, estado, error))
+
+    def _sondear_resultados(self):
+        """Recoge en el hilo de Tk los resultados del trabajador."""
+        self._sondeo_id = None
+        while True:
+            try:
+                peticion, destino, version, estado, error = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            # Aunque la petición esté obsoleta, el resultado sirve para la caché
+            datos = self._guardar_estado(destino, version, estado) if estado else None
+            if peticion == self._peticion_actual:
+                self._futuro = None
+                if datos:
+                    self._mostrar_datos(destino, datos)
+                else:
+                    # Sin resultado la vista se quedaría en 'Calculando análisis...'
+                    self.datos_actuales = None
+                    self.vista.mostrar_error(destino, error or "no hay viajes para este destino")
+
+        if self._futuro is not None:
+            self._sondeo_id = self.vista.after(50, self._sondear_resultados)
+
+    def _mostrar_datos(self, destino: str, datos):
+        """Pinta el análisis de un destino en la vista."""
+        self.datos_actuales = datos
+
+        version = self.modelo.obtener_version(destino)
+        estado = self._estado_guardado(destino, version)
+        self._estado_visible = (destino, version, estado) if estado is not None else None
+
+        # Preparar callbacks de exportación
+        # Nota: CSV, JSON, NDJSON, Parquet y OD son GLOBALES; MD, PNG y los viajes, ACTUALES
+        callbacks = {
+            "csv": lambda: self.exportar_global("csv"),
+            "json": lambda: self.exportar_global("json"),
+            "ndjson": lambda: self.exportar_global("ndjson"),
+            "parquet": lambda: self.exportar_global("parquet"),
+            "od": self.exportar_od,
+            "md": lambda: self.exportar_actual("md"),
+            "png": lambda: self.exportar_actual("png"),
+            "viajes": lambda: self.exportar_actual("viajes"),
+        }
+
+        # Flujos y perfil día × hora: consultas directas a la matriz OD y al cubo
+        flujos = ServicioAnalisis.flujos_od(self.modelo.obtener_matriz_od(), destino)
+        temporal = ServicioAnalisis.perfil_temporal(self.modelo.obtener_cubo_temporal(), destino)
+        self.vista.mostrar_analisis(destino, datos, callbacks, flujos, temporal)
+
+    def _calcular_estado(self, destino: str) -> EstadoAgregado:
+        """Agregados en bruto de los viajes de un destino (sin caché)."""
+        return ServicioAnalisis.agregar(self.modelo.obtener_viajes_por_destino(destino))
+
+    def _calcular_analisis(self, destino: str):
+        """Obtiene los viajes de un destino y calcula su análisis (sin caché)."""
+        datos = self._calcular_estado(destino).finalize()
+        if datos:
+            datos["destino_nombre"] = destino  # Guardar nombre para reportes
+        return datos
+
+    def _guardar_estado(self, destino: str, version: Hashable, estado: EstadoAgregado):
+        """Guarda los agregados de un destino y su análisis final en la caché."""
+        datos = estado.finalize()
+        if datos:
+            datos["destino_nombre"] = destino
+            self.cache_analisis.guardar(destino, version, datos, estado)
+        if self._estado_visible is not None and self._estado_visible[0] == destino:
+            self._estado_visible = (destino, version, estado)
+        return datos
+
+    def _estado_guardado(self, destino: str, version: Hashable) -> Optional[EstadoAgregado]:
+        """Agregados en bruto de un destino: los de la caché o los fijados del destino mostrado."""
+        estado = self.cache_analisis.consultar_estado(destino, version)
+        if estado is None and self._estado_visible is not None:
+            visible, version_visible, estado_visible = self._estado_visible
+            if (visible, version_visible) == (destino, version):
+                estado = estado_visible
+        return estado
+
+    def mostrar_estadisticas(self):
+        """Abre (o refresca) el panel con los tiempos por etapa."""
+        contadores = Instrumentacion.contadores()
+        for nombre, valor in self.cache_analisis.estadisticas().items():
+            contadores[f"cache_analisis.{nombre}"] = valor
+
+        def reiniciar():
+            Instrumentacion.reiniciar()
+            self.mostrar_estadisticas()
+
+        self.vista.mostrar_estadisticas(
+            Instrumentacion.resumen(),
+            contadores,
+            {
+                "actualizar": self.mostrar_estadisticas,
+                "exportar": self.exportar_traza,
+                "reiniciar": reiniciar,
+            },
+        )
 
-            # 4. Actualizar UI
-            self.vista.mostrar_analisis(destino, datos, callbacks)
+    def exportar_traza(self):
+        """Guarda las etapas medidas como traza de Chrome (chrome://tracing, Perfetto)."""
+        archivo = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile="traza_rendimiento.json",
+            filetypes=[("Traza de Chrome", "*.json"), ("Todos los archivos", "*.*")],
+            title="Exportar traza de rendimiento",
+        )
+        if not archivo:
+            return
+        try:
+            Instrumentacion.exportar_traza(archivo)
+            print(f"Traza de rendimiento guardada en {archivo}.")
+        except Exception as e:
+            print(f"Error exportando la traza: {e}")
 
     def exportar_actual(self, formato: str):
-        """Exporta los datos del destino ACTUALMENTE seleccionado (MD, PNG)."""
+        """
+        Exporta los datos del destino ACTUALMENTE seleccionado (MD, PNG) o sus
+        viajes filtrados ('viajes': Parquet o Arrow IPC según la extensión).
+        """
         if not self.datos_actuales:
             return
 
         filtro = ""
         ext = ""
+        otros_tipos = []
         if formato == "md":
             filtro, ext = "Archivos Markdown (*.md)", ".md"
         elif formato == "png":
             filtro, ext = "Imagen PNG (*.png)", ".png"
+        elif formato == "viajes":
+            filtro, ext = "Archivos Parquet (*.parquet)", ".parquet"
+            otros_tipos = [("Arrow IPC", "*.arrow")]
         else:
             return
 
-        destino_safe = self.datos_actuales.get("destino_nombre", "Destino").replace(
-            " ", "_"
-        )
+        destino_nombre = self.datos_actuales.get("destino_nombre", "Destino")
+        destino_safe = destino_nombre.replace(" ", "_")
+        prefijo = "Viajes" if formato == "viajes" else "Reporte"
 
         archivo = filedialog.asksaveasfilename(
             defaultextension=ext,
-            initialfile=f"Reporte_{destino_safe}{ext}",
+            initialfile=f"{prefijo}_{destino_safe}{ext}",
             filetypes=[
                 (filtro.split(" (")[0], f"*{ext}"),
+                *otros_tipos,
                 ("Todos los archivos", "*.*"),
             ],
-            title=f"Exportar reporte actual como {formato.upper()}",
+            title=f"Exportar {'viajes' if formato == 'viajes' else 'reporte'} actual"
+                  f" como {ext[1:].upper()}",
         )
 
         if not archivo:
@@ -128,59 +370,119 @@ class ControladorPrincipal:
                 fig = self.vista.figura_actual
                 if fig:
                     ServicioExportacion.exportar_png(fig, archivo)
+            elif formato == "viajes":
+                viajes = self.modelo.obtener_viajes_por_destino(destino_nombre)
+                if ServicioExportacion.formato_columnar(archivo) == "arrow":
+                    ServicioExportacion.exportar_arrow_viajes(viajes, archivo)
+                else:
+                    ServicioExportacion.exportar_parquet_viajes(viajes, archivo)
 
             print(f"Exportación actual a {archivo} completada.")
         except Exception as e:
             print(f"Error exportando actual: {e}")
 
     def exportar_global(self, formato: str):
-        """Exporta los datos de TODOS los destinos (CSV, JSON)."""
-        filtro = ""
-        ext = ""
-        if formato == "csv":
-            filtro, ext = "Archivos CSV (*.csv)", ".csv"
-        elif formato == "json":
-            filtro, ext = "Archivos JSON (*.json)", ".json"
-        else:
+        """Exporta los datos de TODOS los destinos (CSV, JSON, NDJSON, Parquet/Arrow)."""
+        tipos = {
+            "csv": [("Archivos CSV", "*.csv"), ("CSV comprimido", "*.csv.gz")],
+            "json": [("Archivos JSON", "*.json"), ("JSON comprimido", "*.json.gz")],
+            "ndjson": [("Archivos NDJSON", "*.ndjson"), ("NDJSON comprimido", "*.ndjson.gz")],
+            "parquet": [("Archivos Parquet", "*.parquet"), ("Arrow IPC", "*.arrow")],
+        }
+        if formato not in tipos:
             return
+        ext = f".{formato}"
 
         archivo = filedialog.asksaveasfilename(
             defaultextension=ext,
             initialfile=f"Reporte_Global{ext}",
-            filetypes=[
-                (filtro.split(" (")[0], f"*{ext}"),
-                ("Todos los archivos", "*.*"),
-            ],
+            filetypes=[*tipos[formato], ("Todos los archivos", "*.*")],
             title=f"Exportar reporte GLOBAL como {formato.upper()}",
         )
 
         if not archivo:
             return
 
+        exportadores = {
+            "csv": ServicioExportacion.exportar_csv_global,
+            "json": ServicioExportacion.exportar_json_global,
+            "ndjson": ServicioExportacion.exportar_ndjson_global,
+            "parquet": ServicioExportacion.exportar_parquet_global,
+        }
+        if formato == "parquet" and ServicioExportacion.formato_columnar(archivo) == "arrow":
+            formato = "arrow"
+            exportadores[formato] = ServicioExportacion.exportar_arrow_global
         try:
-            # Procesar todos los destinos (puede tardar un poco)
-            datos_globales = self._obtener_datos_todos_destinos()
-
-            if formato == "csv":
-                ServicioExportacion.exportar_csv_global(datos_globales, archivo)
-            elif formato == "json":
-                ServicioExportacion.exportar_json_global(datos_globales, archivo)
+            # Cada destino se escribe en cuanto se calcula (análisis y escritura intercalados)
+            with Instrumentacion.etapa("exportacion.global", "exportacion", formato=formato):
+                exportadores[formato](self._iterar_datos_todos_destinos(), archivo)
 
             print(f"Exportación global a {archivo} completada.")
         except Exception as e:
             print(f"Error exportando global: {e}")
 
+    def exportar_od(self):
+        """Exporta la matriz origen-destino completa (CSV, Parquet o Arrow IPC)."""
+        archivo = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            initialfile="Matriz_OD.csv",
+            filetypes=[
+                ("Archivos CSV", "*.csv"),
+                ("CSV comprimido", "*.csv.gz"),
+                ("Archivos Parquet", "*.parquet"),
+                ("Arrow IPC", "*.arrow"),
+                ("Todos los archivos", "*.*"),
+            ],
+            title="Exportar matriz origen-destino",
+        )
+
+        if not archivo:
+            return
+
+        matriz = self.modelo.obtener_matriz_od()
+        try:
+            with Instrumentacion.etapa("exportacion.od", "exportacion"):
+                if archivo.lower().endswith((".csv", ".csv.gz")):
+                    ServicioExportacion.exportar_csv_od(matriz, archivo)
+                elif ServicioExportacion.formato_columnar(archivo) == "arrow":
+                    ServicioExportacion.exportar_arrow_od(matriz, archivo)
+                else:
+                    ServicioExportacion.exportar_parquet_od(matriz, archivo)
+
+            print(f"Exportación de la matriz OD a {archivo} completada.")
+        except Exception as e:
+            print(f"Error exportando la matriz OD: {e}")
+
     def _obtener_datos_todos_destinos(self):
-        """Itera sobre todos los destinos y genera sus métricas."""
-        todos_datos = []
+        """Lista con las métricas de todos los destinos (ver '_iterar_datos_todos_destinos')."""
+        return list(self._iterar_datos_todos_destinos())
+
+    def _iterar_datos_todos_destinos(self):
+        """
+        Genera las métricas de todos los destinos, en orden alfabético.
+
+        Reutiliza los análisis ya presentes en la caché. Si faltan pocos destinos
+        se calculan individualmente; si faltan muchos se usa la pasada agrupada.
+        Cada resultado se entrega en cuanto está listo, sin reunirlos en memoria.
+        """
         destinos = self.modelo.obtener_destinos_unicos()
+        cacheados = {
+            d: self.cache_analisis.consultar(d, self.modelo.obtener_version(d))
+            for d in destinos
+        }
+        faltan = [d for d, datos in cacheados.items() if datos is None]
+
+        if len(faltan) > len(destinos) // 2:
+            estados = ServicioAnalisis.agregar_por_destino(
+                self.modelo.obtener_todos(),
+                trabajadores=Configuracion.TRABAJADORES_EXPORTACION,
+                matriz=self.modelo.obtener_matriz_od(),
+            )
+            for d in ServicioAnalisis.finalizar_por_destino(estados):
+                yield cacheados.get(d["destino_nombre"]) or d
+            return
 
         for d in destinos:
-            viajes = self.modelo.obtener_viajes_por_destino(d)
-            if viajes:
-                datos = ServicioAnalisis.procesar_datos_destino(viajes)
-                if datos:
-                    datos["destino_nombre"] = d
-                    todos_datos.append(datos)
-
-        return todos_datos
+            datos = cacheados[d] or self._calcular_analisis(d)
+            if datos:
+                yield datos
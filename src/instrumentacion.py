@@ -0,0 +1,184 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import Configuracion
+
+# La variable de entorno tiene prioridad sobre la configuración (TAXIS_PERFIL=1)
+_VARIABLE_ENTORNO = "TAXIS_PERFIL"
+_NULO = nullcontext()
+
+
+def _activa_por_defecto() -> bool:
+    valor = os.environ.get(_VARIABLE_ENTORNO)
+    if valor is not None:
+        return valor.strip().lower() not in ("", "0", "false", "no")
+    return Configuracion.INSTRUMENTACION
+
+
+class Instrumentacion:
+    """
+    Medición ligera de tiempos por etapa (carga, filtrado, análisis, gráfico,
+    repintado) y contadores.
+
+    Se activa con la variable de entorno TAXIS_PERFIL=1 o con
+    Configuracion.INSTRUMENTACION. Desactivada, 'etapa' devuelve un contexto
+    vacío compartido y 'medir' deja la función decorada intacta, así que el
+    coste es prácticamente nulo. Las etapas quedan en un búfer acotado que se
+    puede resumir (panel de estadísticas) o exportar como traza de Chrome
+    (chrome://tracing o https://ui.perfetto.dev).
+
+    Las etapas que se ejecutan en procesos trabajadores no se registran.
+    """
+
+    activa: bool = _activa_por_defecto()
+    _eventos: deque = deque(maxlen=Configuracion.MAX_EVENTOS_INSTRUMENTACION)
+    _contadores: Dict[str, int] = {}
+    _cerrojo = threading.Lock()
+    _origen = time.perf_counter()
+
+    @staticmethod
+    def etapa(nombre: str, categoria: str = "app", **argumentos: Any):
+        """
+        Contexto que mide la duración de un bloque:
+
+            with Instrumentacion.etapa("analisis.destino", destino=d):
+                ...
+
+        Los argumentos extra se guardan con el evento (aparecen en la traza).
+        """
+        if not Instrumentacion.activa:
+            return _NULO
+        return Instrumentacion._medir_bloque(nombre, categoria, argumentos)
+
+    @staticmethod
+    @contextmanager
+    def _medir_bloque(nombre: str, categoria: str, argumentos: Dict[str, Any]):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            fin = time.perf_counter()
+            Instrumentacion._registrar(nombre, categoria, inicio, fin, argumentos)
+
+    @staticmethod
+    def medir(nombre: str, categoria: str = "app") -> Callable:
+        """
+        Decorador que mide cada llamada a la función. Si la instrumentación está
+        desactivada al importar el módulo decorado, devuelve la función original.
+        """
+        def decorador(funcion: Callable) -> Callable:
+            if not Instrumentacion.activa:
+                return funcion
+
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    fin = time.perf_counter()
+                    Instrumentacion._registrar(nombre, categoria, inicio, fin, None)
+
+            return envoltura
+        return decorador
+
+    @staticmethod
+    def contar(nombre: str, cantidad: int = 1) -> None:
+        """Suma 'cantidad' a un contador (p. ej. filas parseadas)."""
+        if not Instrumentacion.activa:
+            return
+        with Instrumentacion._cerrojo:
+            Instrumentacion._contadores[nombre] = Instrumentacion._contadores.get(nombre, 0) + cantidad
+
+    @staticmethod
+    def _registrar(
+        nombre: str, categoria: str, inicio: float, fin: float, argumentos: Optional[Dict[str, Any]]
+    ) -> None:
+        evento = (nombre, categoria, inicio, fin - inicio, threading.get_ident(), argumentos)
+        with Instrumentacion._cerrojo:
+            Instrumentacion._eventos.append(evento)
+
+    @staticmethod
+    def resumen() -> List[Dict[str, Any]]:
+        """
+        Estadísticas por etapa, de mayor a menor tiempo total.
+
+        Returns:
+            Lista de diccionarios con 'etapa', 'llamadas', 'total_ms',
+            'media_ms' y 'max_ms'.
+        """
+        with Instrumentacion._cerrojo:
+            eventos = list(Instrumentacion._eventos)
+
+        por_etapa: Dict[str, List[float]] = {}
+        for nombre, _, _, duracion, _, _ in eventos:
+            por_etapa.setdefault(nombre, []).append(duracion)
+
+        filas = [
+            {
+                "etapa": nombre,
+                "llamadas": len(duraciones),
+                "total_ms": sum(duraciones) * 1000,
+                "media_ms": sum(duraciones) / len(duraciones) * 1000,
+                "max_ms": max(duraciones) * 1000,
+            }
+            for nombre, duraciones in por_etapa.items()
+        ]
+        return sorted(filas, key=lambda f: -f["total_ms"])
+
+    @staticmethod
+    def contadores() -> Dict[str, int]:
+        with Instrumentacion._cerrojo:
+            return dict(Instrumentacion._contadores)
+
+    @staticmethod
+    def exportar_traza(ruta_archivo: str) -> None:
+        """
+        Escribe las etapas registradas en formato 'Trace Event' de Chrome
+        (eventos completos 'X' en microsegundos) y los contadores como evento 'C'.
+        """
+        with Instrumentacion._cerrojo:
+            eventos = list(Instrumentacion._eventos)
+            contadores = dict(Instrumentacion._contadores)
+
+        pid = os.getpid()
+        origen = Instrumentacion._origen
+        traza = [
+            {
+                "name": nombre,
+                "cat": categoria,
+                "ph": "X",
+                "ts": (inicio - origen) * 1e6,
+                "dur": duracion * 1e6,
+                "pid": pid,
+                "tid": hilo,
+                **({"args": argumentos} if argumentos else {}),
+            }
+            for nombre, categoria, inicio, duracion, hilo, argumentos in eventos
+        ]
+        if contadores:
+            traza.append(
+                {
+                    "name": "contadores",
+                    "ph": "C",
+                    "ts": (time.perf_counter() - origen) * 1e6,
+                    "pid": pid,
+                    "args": contadores,
+                }
+            )
+
+        with open(ruta_archivo, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": traza, "displayTimeUnit": "ms"}, f, default=str)
+
+    @staticmethod
+    def reiniciar() -> None:
+        """Descarta las etapas y contadores registrados."""
+        with Instrumentacion._cerrojo:
+            Instrumentacion._eventos.clear()
+            Instrumentacion._contadores.clear()
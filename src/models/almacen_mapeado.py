@@ -0,0 +1,267 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.cache_datos import CacheDatos
+
+_ARCHIVO_META = "meta.json"
+_ARCHIVO_ZONAS = "zonas.npy"
+# Filas repartidas por iteración al ordenar las columnas en disco
+_FILAS_POR_PASO = 1_000_000
+
+
+class ColumnaCodificada:
+    """
+    Columna de texto codificada como diccionario (códigos enteros + vocabulario).
+    En el almacén mapeado todas las columnas deben tener ancho fijo, así que el
+    texto se guarda así. Indexarla devuelve los textos de las posiciones pedidas.
+    """
+
+    def __init__(self, codigos: np.ndarray, vocabulario: np.ndarray):
+        self.codigos = codigos
+        self.vocabulario = vocabulario
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def __getitem__(self, posiciones):
+        return self.vocabulario[self.codigos[posiciones]]
+
+
+class AlmacenMapeado:
+    """
+    Almacén de columnas en disco (un .npy por columna) abierto con memoria mapeada.
+
+    Las filas se guardan ordenadas (de forma estable) por 'Zona_destino', de modo
+    que los viajes de cada destino ocupan un rango contiguo y pueden servirse como
+    vistas sin copia. Las columnas de texto se guardan codificadas como diccionario.
+    El sistema operativo decide qué páginas residen en memoria y varios procesos
+    pueden compartir la misma copia de los datos.
+    """
+
+    @staticmethod
+    def ruta_directorio(ruta_csv: str) -> str:
+        """Directorio del almacén asociado a un CSV."""
+        return ruta_csv + ".columnas"
+
+    @staticmethod
+    def abrir(
+        ruta_csv: str, firma: Dict[str, Any]
+    ) -> Optional[Tuple[List[str], List[str], Dict[str, Any], int]]:
+        """
+        Abre el almacén de un CSV si existe y corresponde a su firma actual
+        (ver CacheDatos.coincide: basta la firma rápida, sin hash).
+
+        Returns:
+            Tupla (cabeceras, zonas, columnas, bytes_leidos) con columnas
+            mapeadas en modo solo lectura, o None si no hay almacén válido.
+            'bytes_leidos' es el desplazamiento del CSV hasta su última línea completa.
+        """
+        directorio = AlmacenMapeado.ruta_directorio(ruta_csv)
+        ruta_meta = os.path.join(directorio, _ARCHIVO_META)
+        if not os.path.exists(ruta_meta):
+            return None
+
+        try:
+            with open(ruta_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            if not CacheDatos.coincide(meta.get("firma", {}), ruta_csv, firma):
+                return None
+            if meta["firma"]["mtime_ns"] != firma["mtime_ns"]:
+                # Mismo contenido con otra fecha: se guarda la nueva para que las
+                # siguientes aperturas no vuelvan a leer el CSV entero
+                meta["firma"]["mtime_ns"] = firma["mtime_ns"]
+                try:
+                    AlmacenMapeado._escribir_meta(directorio, meta)
+                except OSError:
+                    pass  # Sin permisos: el almacén sigue siendo válido
+            return AlmacenMapeado.mapear(directorio)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def mapear(directorio: str) -> Tuple[List[str], List[str], Dict[str, Any], int]:
+        """
+        Mapea las columnas de un almacén ya validado (ver 'abrir'), p. ej. desde
+        un proceso trabajador que solo recibe el directorio y un rango de filas.
+
+        Raises:
+            OSError, ValueError, KeyError: Si el almacén falta o está incompleto.
+        """
+        with open(os.path.join(directorio, _ARCHIVO_META), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        modo = "r" if meta["filas"] else None  # No se puede mapear un archivo vacío
+        zonas = np.load(os.path.join(directorio, _ARCHIVO_ZONAS)).tolist()
+        columnas = {}
+        for i, nombre in enumerate(meta["columnas"]):
+            valores = np.load(os.path.join(directorio, f"{i}.npy"), mmap_mode=modo)
+            if nombre in meta["textos"]:
+                vocabulario = np.load(os.path.join(directorio, f"{i}.vocab.npy"))
+                valores = ColumnaCodificada(valores, vocabulario)
+            columnas[nombre] = valores
+
+        return meta["cabeceras"], zonas, columnas, meta["bytes_leidos"]
+
+    @staticmethod
+    def construir(
+        ruta_csv: str,
+        firma: Dict[str, Any],
+        cabeceras: List[str],
+        bloques: Iterable[Dict[str, np.ndarray]],
+        zonas: List[str],
+        bytes_leidos: List[int],
+    ) -> None:
+        """
+        Escribe el almacén consumiendo los bloques de columnas de uno en uno.
+
+        Cada bloque se vuelca a un archivo temporal por columna; al final las
+        filas se reordenan por destino con una ordenación por conteo por
+        tramos de _FILAS_POR_PASO filas: se cuentan los viajes de cada destino,
+        se calcula (y guarda en disco) la fila de salida de cada fila y cada
+        columna se reparte tramo a tramo en esas posiciones. Además de un tramo
+        solo se guardan contadores por zona, así que la memoria usada no
+        depende del número de filas.
+
+        Args:
+            firma: Firma del CSV (ver CacheDatos.firma).
+            cabeceras: Nombres de columna del CSV en orden.
+            bloques: Iterable de diccionarios columna -> array de cada bloque.
+            zonas: Diccionario de zonas; se completa mientras se consumen los bloques.
+            bytes_leidos: Celda [n] con los bytes del CSV consumidos por el lector
+                de bloques; su valor al terminar de consumirlos se guarda en el meta.
+        """
+        directorio = AlmacenMapeado.ruta_directorio(ruta_csv)
+        temporal = directorio + ".tmp"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+
+        try:
+            # --- 1. Volcado secuencial de los bloques ---
+            # Las columnas derivadas se añaden tras las del CSV al aparecer en los bloques
+            nombres: List[str] = list(cabeceras)
+            tipos: Dict[str, np.dtype] = {}
+            vocabularios: Dict[str, Dict[str, int]] = {}
+            archivos = {}
+            filas = 0
+            try:
+                for bloque in bloques:
+                    for nombre, valores in bloque.items():
+                        if nombre not in archivos:
+                            if nombre not in nombres:
+                                nombres.append(nombre)
+                            ruta_crudo = os.path.join(temporal, f"{nombres.index(nombre)}.raw")
+                            archivos[nombre] = open(ruta_crudo, "wb")
+                        if valores.dtype == object:
+                            vocab = vocabularios.setdefault(nombre, {})
+                            valores = np.fromiter(
+                                (vocab.setdefault(v, len(vocab)) for v in valores),
+                                dtype=np.int32,
+                                count=len(valores),
+                            )
+                        tipos[nombre] = valores.dtype
+                        archivos[nombre].write(valores.tobytes())
+                    filas += len(next(iter(bloque.values()), ()))
+            finally:
+                for f in archivos.values():
+                    f.close()
+
+            # --- 2. Reordenar por destino (estable) y guardar como .npy ---
+            def mapear_crudo(i: int, nombre: str) -> np.ndarray:
+                ruta = os.path.join(temporal, f"{i}.raw")
+                tipo = tipos.get(nombre, np.dtype(np.int32))
+                if not filas or not os.path.exists(ruta):
+                    return np.empty(0, dtype=tipo)
+                return np.memmap(ruta, dtype=tipo, mode="r", shape=(filas,))
+
+            destinos = None
+            if "Zona_destino" in nombres and filas:
+                destinos = mapear_crudo(nombres.index("Zona_destino"), "Zona_destino")
+
+            # Primera pasada: viajes por destino y primera fila de cada destino
+            posiciones = None
+            if destinos is not None:
+                conteos = np.zeros(len(zonas), dtype=np.int64)
+                for inicio in range(0, filas, _FILAS_POR_PASO):
+                    conteos += np.bincount(
+                        destinos[inicio:inicio + _FILAS_POR_PASO], minlength=len(zonas)
+                    )
+                siguiente = np.cumsum(conteos) - conteos
+
+                # Segunda pasada: fila de salida de cada fila, a continuación de las
+                # ya colocadas de su destino (orden estable); se guarda en disco
+                posiciones = np.memmap(
+                    os.path.join(temporal, "posiciones.raw"),
+                    dtype=np.int64,
+                    mode="w+",
+                    shape=(filas,),
+                )
+                for inicio in range(0, filas, _FILAS_POR_PASO):
+                    tramo = np.asarray(destinos[inicio:inicio + _FILAS_POR_PASO])
+                    orden = np.argsort(tramo, kind="stable")
+                    por_zona = np.bincount(tramo, minlength=len(zonas))
+                    ordenados = tramo[orden]
+                    rango = np.arange(len(tramo)) - (np.cumsum(por_zona) - por_zona)[ordenados]
+                    posiciones[inicio + orden] = siguiente[ordenados] + rango
+                    siguiente += por_zona
+            del destinos
+
+            # Tercera pasada, columna a columna: cada tramo se reparte en sus posiciones
+            for i, nombre in enumerate(nombres):
+                origen = mapear_crudo(i, nombre)
+                ruta_npy = os.path.join(temporal, f"{i}.npy")
+                if not filas:
+                    np.save(ruta_npy, origen)
+                else:
+                    salida = np.lib.format.open_memmap(
+                        ruta_npy, mode="w+", dtype=origen.dtype, shape=(filas,)
+                    )
+                    for inicio in range(0, filas, _FILAS_POR_PASO):
+                        fin = min(inicio + _FILAS_POR_PASO, filas)
+                        destino = (
+                            posiciones[inicio:fin] if posiciones is not None
+                            else slice(inicio, fin)
+                        )
+                        salida[destino] = origen[inicio:fin]
+                    salida.flush()
+                    del salida
+                del origen
+                if os.path.exists(os.path.join(temporal, f"{i}.raw")):
+                    os.remove(os.path.join(temporal, f"{i}.raw"))
+
+                if nombre in vocabularios:
+                    vocabulario = np.array(list(vocabularios[nombre]), dtype=str)
+                    np.save(os.path.join(temporal, f"{i}.vocab.npy"), vocabulario)
+
+            if posiciones is not None:
+                del posiciones
+                os.remove(os.path.join(temporal, "posiciones.raw"))
+            np.save(os.path.join(temporal, _ARCHIVO_ZONAS), np.array(zonas, dtype=str))
+            meta = {
+                "firma": firma,
+                "cabeceras": cabeceras,
+                "columnas": nombres,
+                "textos": sorted(vocabularios),
+                "filas": filas,
+                "bytes_leidos": bytes_leidos[0],
+            }
+            # El meta.json se escribe al final: su presencia marca el almacén como completo
+            AlmacenMapeado._escribir_meta(temporal, meta)
+
+            shutil.rmtree(directorio, ignore_errors=True)
+            os.replace(temporal, directorio)
+        except BaseException:
+            # Un almacén a medias no se deja en disco (tampoco al interrumpir)
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _escribir_meta(directorio: str, meta: Dict[str, Any]) -> None:
+        """Escribe el meta.json del almacén de forma atómica."""
+        ruta = os.path.join(directorio, _ARCHIVO_META)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(ruta + ".tmp", ruta)
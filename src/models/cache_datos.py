@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+# Incrementar cuando cambie la disposición de las columnas guardadas
+VERSION_FORMATO = 5
+
+_CLAVE_META = "__meta__"
+_CLAVE_CABECERAS = "__cabeceras__"
+_CLAVE_ZONAS = "__zonas__"
+_CLAVE_BYTES = "__bytes_leidos__"
+_PREFIJO_COLUMNA = "col:"
+
+
+class CacheDatos:
+    """
+    Caché binaria (.npz) del almacén columnar, guardada junto al CSV de origen.
+
+    La caché se identifica por la ruta, el tamaño, la fecha de modificación y un
+    hash del contenido del CSV. Al leerla solo se comprueban ruta, tamaño y fecha
+    (ver 'coincide'); el hash se calcula únicamente si cambió la fecha, para no
+    descartar la caché de un CSV tocado o copiado sin cambios.
+    """
+
+    @staticmethod
+    def ruta_cache(ruta_csv: str) -> str:
+        """Ruta del archivo de caché asociado a un CSV."""
+        return ruta_csv + ".cache.npz"
+
+    @staticmethod
+    def firma(ruta_csv: str) -> Dict[str, Any]:
+        """Calcula la firma completa (ruta, tamaño, mtime y hash) que se guarda con la caché."""
+        firma = CacheDatos.firma_rapida(ruta_csv)
+        firma["hash"] = CacheDatos._hash_contenido(ruta_csv)
+        return firma
+
+    @staticmethod
+    def firma_rapida(ruta_csv: str) -> Dict[str, Any]:
+        """Firma sin hash (ruta, tamaño y mtime): no lee el contenido del CSV."""
+        info = os.stat(ruta_csv)
+        return {
+            "version": VERSION_FORMATO,
+            "ruta": os.path.abspath(ruta_csv),
+            "tamano": info.st_size,
+            "mtime_ns": info.st_mtime_ns,
+        }
+
+    @staticmethod
+    def coincide(guardada: Dict[str, Any], ruta_csv: str, actual: Dict[str, Any]) -> bool:
+        """
+        Indica si una firma guardada corresponde al CSV en su estado actual.
+
+        Si ruta, tamaño y mtime coinciden con 'actual' (firma rápida o completa)
+        no se lee el archivo. Si solo difiere el mtime se compara el hash del
+        contenido con el guardado.
+        """
+        def sin_hash(firma: Dict[str, Any]) -> Dict[str, Any]:
+            return {k: v for k, v in firma.items() if k != "hash"}
+
+        if sin_hash(guardada) == sin_hash(actual):
+            return True
+        otra_fecha = {**sin_hash(guardada), "mtime_ns": actual["mtime_ns"]}
+        if "hash" not in guardada or otra_fecha != sin_hash(actual):
+            return False
+        contenido = actual.get("hash") or CacheDatos._hash_contenido(ruta_csv)
+        return guardada["hash"] == contenido
+
+    @staticmethod
+    def _hash_contenido(ruta_csv: str) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        with open(ruta_csv, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        return h.hexdigest()
+
+    @staticmethod
+    def leer(
+        ruta_csv: str, firma: Dict[str, Any]
+    ) -> Optional[Tuple[List[str], List[str], Dict[str, np.ndarray], int]]:
+        """
+        Lee la caché de un CSV si existe y sigue siendo válida.
+
+        Args:
+            ruta_csv: Ruta del CSV de origen.
+            firma: Firma actual del CSV (ver 'firma_rapida' y 'coincide').
+
+        Returns:
+            Tupla (cabeceras, zonas, columnas, bytes_leidos) o None si no hay
+            caché válida. 'bytes_leidos' es el desplazamiento del CSV hasta el
+            que llegó la carga (su última línea completa).
+        """
+        ruta = CacheDatos.ruta_cache(ruta_csv)
+        if not os.path.exists(ruta):
+            return None
+
+        try:
+            with np.load(ruta, allow_pickle=False) as npz:
+                meta = json.loads(str(npz[_CLAVE_META]))
+                if not CacheDatos.coincide(meta, ruta_csv, firma):
+                    return None
+
+                cabeceras = npz[_CLAVE_CABECERAS].tolist()
+                zonas = npz[_CLAVE_ZONAS].tolist()
+                bytes_leidos = int(npz[_CLAVE_BYTES])
+                columnas = {}
+                # Incluye las columnas derivadas, que no están en las cabeceras
+                for clave in npz.files:
+                    if not clave.startswith(_PREFIJO_COLUMNA):
+                        continue
+                    nombre = clave[len(_PREFIJO_COLUMNA):]
+                    valores = npz[clave]
+                    # El texto se guarda como unicode fijo; en memoria es 'object'
+                    if valores.dtype.kind == "U":
+                        valores = valores.astype(object)
+                    columnas[nombre] = valores
+        except (OSError, ValueError, KeyError):
+            # Caché corrupta o de otro formato: se reconstruye
+            return None
+
+        return cabeceras, zonas, columnas, bytes_leidos
+
+    @staticmethod
+    def guardar(
+        ruta_csv: str,
+        firma: Dict[str, Any],
+        cabeceras: List[str],
+        zonas: List[str],
+        columnas: Dict[str, np.ndarray],
+        bytes_leidos: int,
+    ) -> bool:
+        """
+        Escribe la caché del CSV de forma atómica.
+
+        Args:
+            firma: Firma del CSV calculada antes de parsearlo.
+            bytes_leidos: Bytes del CSV consumidos al parsearlo (ver 'leer').
+
+        Returns:
+            True si se ha escrito, False si no ha sido posible (p. ej. sin permisos).
+        """
+        ruta = CacheDatos.ruta_cache(ruta_csv)
+        temporal = ruta + ".tmp"
+        arrays = {
+            _CLAVE_META: np.array(json.dumps(firma)),
+            _CLAVE_CABECERAS: np.array(cabeceras, dtype=str),
+            _CLAVE_ZONAS: np.array(zonas, dtype=str),
+            _CLAVE_BYTES: np.array(bytes_leidos, dtype=np.int64),
+        }
+        for nombre, valores in columnas.items():
+            if valores.dtype == object:
+                valores = valores.astype(str)
+            arrays[_PREFIJO_COLUMNA + nombre] = valores
+
+        try:
+            with open(temporal, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        return True
@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DIAS_SEMANA = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+HORAS_DIA = 24
+CELDAS_SEMANA = len(DIAS_SEMANA) * HORAS_DIA
+# Sumas guardadas por celda; 'viajes' es el conteo
+METRICAS_CUBO = ("viajes", "ingresos", "distancia", "duracion")
+_DIA_EPOCA = 3  # 1970-01-01 fue jueves (lunes = 0)
+
+
+class CuboTemporal:
+    """
+    Agregados por destino × día de la semana × hora del día: número de
+    viajes y sumas de importe, distancia y duración de cada celda.
+
+    Se construye en una sola pasada vectorizada (un np.bincount por métrica
+    sobre la clave destino·168 + día·24 + hora) y ocupa zonas × 7 × 24
+    valores por métrica, así que rebanar un destino o sumar sobre zonas,
+    días u horas cuesta lo que el cubo y no lo que el número de viajes.
+    Los viajes sin fecha de inicio no cuentan; la duración solo suma los
+    viajes de duración positiva, como en las medias del análisis.
+    """
+
+    def __init__(self, zonas: List[str], sumas: Dict[str, np.ndarray]):
+        self.zonas = zonas
+        self.sumas = sumas  # métrica -> array (zonas, 7, 24)
+        self._codigo = {zona: i for i, zona in enumerate(zonas)}
+
+    @staticmethod
+    def vacio(zonas: List[str]) -> "CuboTemporal":
+        forma = (len(zonas), len(DIAS_SEMANA), HORAS_DIA)
+        return CuboTemporal(
+            zonas,
+            {
+                m: np.zeros(forma, dtype=np.int64 if m == "viajes" else np.float64)
+                for m in METRICAS_CUBO
+            },
+        )
+
+    @staticmethod
+    def construir(
+        zonas: List[str],
+        destinos: np.ndarray,
+        minutos_inicio: np.ndarray,
+        horas: np.ndarray,
+        importes: np.ndarray,
+        distancias: np.ndarray,
+        duraciones: np.ndarray,
+    ) -> "CuboTemporal":
+        """
+        Args:
+            zonas: Diccionario de zonas del almacén (código -> nombre).
+            destinos: Código de zona de destino de cada viaje.
+            minutos_inicio: 'Hora_inicio' en minutos desde 1970.
+            horas: Hora del día del inicio (0-23), -1 si no hay fecha.
+            importes, distancias, duraciones: Valores de cada viaje (NaN suma 0).
+        """
+        n = len(zonas)
+        validas = horas >= 0
+        if not validas.all():
+            destinos, minutos_inicio, horas, importes, distancias, duraciones = (
+                c[validas] for c in (destinos, minutos_inicio, horas, importes, distancias, duraciones)
+            )
+
+        dias = (minutos_inicio // 1440 + _DIA_EPOCA) % 7
+        claves = destinos.astype(np.int64) * CELDAS_SEMANA + dias * HORAS_DIA + horas
+        forma = (n, len(DIAS_SEMANA), HORAS_DIA)
+
+        def sumar(valores: Optional[np.ndarray]) -> np.ndarray:
+            pesos = None if valores is None else np.where(np.isnan(valores), 0.0, valores)
+            return np.bincount(claves, weights=pesos, minlength=n * CELDAS_SEMANA).reshape(forma)
+
+        return CuboTemporal(
+            zonas,
+            {
+                "viajes": sumar(None),
+                "ingresos": sumar(importes),
+                "distancia": sumar(distancias),
+                "duracion": sumar(np.where(duraciones > 0, duraciones, 0.0)),
+            },
+        )
+
+    def combinar(self, otro: "CuboTemporal") -> "CuboTemporal":
+        """Cubo con las celdas de ambos sumadas (p. ej. al anexar viajes)."""
+        zonas = otro.zonas if len(otro.zonas) >= len(self.zonas) else self.zonas
+        sumas = {}
+        for metrica in METRICAS_CUBO:
+            forma = (len(zonas), len(DIAS_SEMANA), HORAS_DIA)
+            total = np.zeros(forma, dtype=self.sumas[metrica].dtype)
+            for cubo in (self, otro):
+                parcial = cubo.sumas[metrica]
+                total[:len(parcial)] += parcial
+            sumas[metrica] = total
+        return CuboTemporal(zonas, sumas)
+
+    # --- Consultas ---
+
+    def rebanada(self, metrica: str, destino: Optional[str] = None) -> np.ndarray:
+        """
+        Matriz día × hora (7 × 24) de una métrica para un destino, o de todos
+        los destinos sumados si 'destino' es None. Ceros si no hay viajes.
+        """
+        suma = self.sumas[metrica]
+        if destino is None:
+            return suma.sum(axis=0)
+        c = self._codigo.get(destino)
+        if c is None or c >= len(suma):
+            return np.zeros(suma.shape[1:], dtype=suma.dtype)
+        return suma[c]
+
+    def media(self, metrica: str, destino: Optional[str] = None) -> np.ndarray:
+        """Media por viaje de cada celda (7 × 24); NaN donde no hay viajes."""
+        viajes = self.rebanada("viajes", destino)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(viajes > 0, self.rebanada(metrica, destino) / viajes, np.nan)
+
+    def por_hora(self, metrica: str, destino: Optional[str] = None) -> np.ndarray:
+        """Suma de la métrica por hora del día (24 valores)."""
+        return self.rebanada(metrica, destino).sum(axis=0)
+
+    def por_dia(self, metrica: str, destino: Optional[str] = None) -> np.ndarray:
+        """Suma de la métrica por día de la semana (7 valores, lunes primero)."""
+        return self.rebanada(metrica, destino).sum(axis=1)
@@ -1,38 +1,1038 @@
 import csv
+import glob
+import io
+import multiprocessing
 import os
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from typing import List, Dict, Any, Callable, Hashable, Iterable, Iterator, Optional, BinaryIO, Tuple, Union
+
+import numpy as np
+from src.config import Configuracion
+from src.instrumentacion import Instrumentacion
+from src.models.almacen_mapeado import AlmacenMapeado, ColumnaCodificada
+from src.models.cache_datos import CacheDatos
+from src.models.cubo_temporal import CuboTemporal
+from src.models.matriz_od import MatrizOD
+
+# Tipos de las columnas conocidas del CSV de viajes.
+# Las columnas no listadas aquí se guardan como texto.
+COLUMNAS_FLOAT = (
+    "Distancia_KM",
+    "Tarfia_base",  # Nota: typo conocido en el CSV original
+    "Extra",
+    "Tax",
+    "Propina",
+    "Coste_Peaje",
+    "Recargo_adicional",
+    "Importe_total",
+)
+COLUMNAS_INT = ("ID_Viaje", "N_pasajeros", "Forma_de_pago")
+# Columnas float que el CSV escribe sin decimales cuando el valor es entero
+COLUMNAS_FLOAT_SIN_DECIMALES = ("Recargo_adicional",)
+COLUMNAS_ZONA = ("Zona_origen", "Zona_destino")
+# Fechas 'dd/mm/YYYY H:MM', guardadas como minutos desde 1970-01-01 (int64)
+COLUMNAS_FECHA = ("Hora_inicio", "Hora_fin")
+FORMATO_FECHA = "%d/%m/%Y %H:%M"
+SIN_FECHA = np.iinfo(np.int64).min  # Marca de fecha vacía o inválida
+
+# Columnas derivadas calculadas una vez en la carga (no forman parte del CSV)
+COLUMNA_DURACION = "Duracion_min"     # float64, NaN si falta alguna fecha
+COLUMNA_VELOCIDAD = "Velocidad_kmh"   # float64, NaN si la duración no es positiva
+COLUMNA_HORA_DIA = "Hora_dia"         # int8 (0-23), -1 si no hay fecha de inicio
+COLUMNA_FUENTE = "Fuente"             # int16, índice del archivo (mes) de origen
+ZONA_VACIA = ""  # Zona de los viajes sin origen/destino (no se lista como destino)
+
+_EPOCA = datetime(1970, 1, 1)
+# Filas por tramo al recorrer el almacén completo (matriz OD, cubo, búsquedas):
+# los temporales no crecen con el número de filas (p. ej. almacén mapeado)
+_FILAS_POR_TRAMO = 1_000_000
+
+
+def _a_float(valores: List[str]) -> np.ndarray:
+    """Convierte una lista de textos a float64. Los valores inválidos quedan como NaN."""
+    try:
+        return np.asarray(valores).astype(np.float64)
+    except ValueError:
+        salida = np.empty(len(valores), dtype=np.float64)
+        for i, v in enumerate(valores):
+            try:
+                salida[i] = float(v)
+            except (ValueError, TypeError):
+                salida[i] = np.nan
+        return salida
+
+
+def _a_int(valores: List[str]) -> np.ndarray:
+    """Convierte una lista de textos a int64. Los valores inválidos quedan como 0."""
+    try:
+        return np.asarray(valores).astype(np.int64)
+    except ValueError:
+        salida = np.zeros(len(valores), dtype=np.int64)
+        for i, v in enumerate(valores):
+            try:
+                salida[i] = int(v)
+            except (ValueError, TypeError):
+                pass
+        return salida
+
+
+def _minutos_desde_epoca_lento(valores: Iterable[str]) -> np.ndarray:
+    """Interpreta fechas una a una con strptime (con memoria de las ya vistas)."""
+    vistos: Dict[str, int] = {}
+    salida = []
+    for v in valores:
+        minutos = vistos.get(v)
+        if minutos is None:
+            try:
+                delta = datetime.strptime(v, FORMATO_FECHA) - _EPOCA
+                minutos = int(delta.total_seconds()) // 60
+            except (ValueError, TypeError):
+                minutos = SIN_FECHA
+            vistos[v] = minutos
+        salida.append(minutos)
+    return np.array(salida, dtype=np.int64)
+
+
+def _a_minutos_epoca(valores: List[str]) -> np.ndarray:
+    """
+    Convierte fechas 'dd/mm/YYYY H:MM' a minutos desde 1970-01-01 (int64).
+
+    Las cadenas se tratan como una matriz de bytes y día, mes, año, hora y minuto
+    se extraen por posición de forma vectorizada. Las filas que no encajan en ese
+    patrón (o con día > 28, para validar el mes) se resuelven con strptime.
+    Las fechas vacías o inválidas quedan como SIN_FECHA.
+    """
+    n = len(valores)
+    if not n:
+        return np.empty(0, dtype=np.int64)
+    try:
+        crudo = np.asarray(valores, dtype="S17")
+    except UnicodeEncodeError:
+        return _minutos_desde_epoca_lento(valores)
+
+    b = crudo.view(np.uint8).reshape(n, 17).astype(np.int32)
+    largo = (b != 0).sum(axis=1)
+    filas = np.arange(n)
+    d = b - ord("0")
+
+    # 'dd/mm/YYYY H:MM' (15) o 'dd/mm/YYYY HH:MM' (16)
+    largo_ok = (largo == 15) | (largo == 16)
+    pos_min = np.clip(largo - 2, 0, 16)
+    pos_sep = np.clip(largo - 3, 0, 16)
+    posiciones_digito = [0, 1, 3, 4, 6, 7, 8, 9, 11]
+    digitos_ok = np.all((d[:, posiciones_digito] >= 0) & (d[:, posiciones_digito] <= 9), axis=1)
+    digitos_ok &= (d[filas, pos_min] >= 0) & (d[filas, pos_min] <= 9)
+    digitos_ok &= (d[filas, pos_min + 1] >= 0) & (d[filas, pos_min + 1] <= 9)
+    hora_doble = largo == 16
+    digitos_ok &= ~hora_doble | ((d[:, 12] >= 0) & (d[:, 12] <= 9))
+    separadores_ok = (
+        (b[:, 2] == ord("/"))
+        & (b[:, 5] == ord("/"))
+        & (b[:, 10] == ord(" "))
+        & (b[filas, pos_sep] == ord(":"))
+    )
+
+    dia = d[:, 0] * 10 + d[:, 1]
+    mes = d[:, 3] * 10 + d[:, 4]
+    anio = d[:, 6] * 1000 + d[:, 7] * 100 + d[:, 8] * 10 + d[:, 9]
+    hora = np.where(hora_doble, d[:, 11] * 10 + d[:, 12], d[:, 11])
+    minuto = d[filas, pos_min] * 10 + d[filas, pos_min + 1]
+
+    rapido = (
+        largo_ok & digitos_ok & separadores_ok
+        & (dia >= 1) & (dia <= 28) & (mes >= 1) & (mes <= 12)
+        & (hora <= 23) & (minuto <= 59)
+    )
+
+    # Días desde la época (algoritmo 'days_from_civil' de H. Hinnant)
+    y = anio - (mes <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * ((mes + 9) % 12) + 2) // 5 + dia - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    dias = era * 146097 + doe - 719468
+
+    salida = (dias.astype(np.int64) * 1440) + hora * 60 + minuto
+    lentos = np.flatnonzero(~rapido)
+    if len(lentos):
+        salida[lentos] = _minutos_desde_epoca_lento(valores[i] for i in lentos)
+    return salida
+
+
+def _formatear_minutos(minutos: int) -> str:
+    """Inversa de '_a_minutos_epoca' para mostrar/exportar una fecha."""
+    if minutos == SIN_FECHA:
+        return ""
+    f = _EPOCA + timedelta(minutes=int(minutos))
+    return f"{f.day:02d}/{f.month:02d}/{f.year} {f.hour}:{f.minute:02d}"
+
+
+def _texto_valor(nombre: str, valor: Any, zonas: List[str]) -> str:
+    """Representación CSV de un valor tipado del almacén."""
+    if nombre in COLUMNAS_ZONA:
+        return zonas[valor]
+    if nombre in COLUMNAS_FECHA:
+        return _formatear_minutos(valor)
+    if nombre in COLUMNAS_FLOAT:
+        if np.isnan(valor):
+            return ""
+        if nombre in COLUMNAS_FLOAT_SIN_DECIMALES and float(valor).is_integer():
+            return str(int(valor))
+        return repr(float(valor))
+    if nombre in COLUMNAS_INT:
+        return str(int(valor))
+    return str(valor)
+
+
+def _calcular_derivadas(columnas: Dict[str, np.ndarray]) -> None:
+    """Añade duración, velocidad y hora del día a partir de las fechas y la distancia."""
+    if not all(c in columnas for c in COLUMNAS_FECHA):
+        return
+    inicio, fin = columnas["Hora_inicio"], columnas["Hora_fin"]
+    validas = (inicio != SIN_FECHA) & (fin != SIN_FECHA)
+
+    duracion = np.full(len(inicio), np.nan)
+    duracion[validas] = (fin[validas] - inicio[validas]).astype(np.float64)
+    columnas[COLUMNA_DURACION] = duracion
+
+    if "Distancia_KM" in columnas:
+        velocidad = np.full(len(inicio), np.nan)
+        positivas = duracion > 0
+        velocidad[positivas] = columnas["Distancia_KM"][positivas] / (duracion[positivas] / 60)
+        columnas[COLUMNA_VELOCIDAD] = velocidad
+
+    hora_dia = np.full(len(inicio), -1, dtype=np.int8)
+    con_inicio = inicio != SIN_FECHA
+    hora_dia[con_inicio] = (inicio[con_inicio] % 1440) // 60
+    columnas[COLUMNA_HORA_DIA] = hora_dia
+
+
+def _codificar_zonas(valores: Iterable[str], tabla: Dict[str, int], zonas: List[str], n: int) -> np.ndarray:
+    """
+    Codifica nombres de zona como enteros usando un diccionario compartido.
+    Las zonas nuevas se añaden al final de 'zonas' y de 'tabla'.
+    """
+    def codigo(nombre: str) -> int:
+        c = tabla.get(nombre)
+        if c is None:
+            c = tabla[nombre] = len(zonas)
+            zonas.append(nombre)
+        return c
+
+    return np.fromiter((codigo(v) for v in valores), dtype=np.int32, count=n)
+
+
+def _indexar_por_zona(
+    codigos: np.ndarray, zonas: List[str], filas: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Construye un índice nombre de zona -> posiciones de fila (en orden de aparición).
+    Se hace con una única ordenación estable en lugar de un recorrido por zona.
+    Si se pasan 'filas', solo se indexan esas posiciones.
+    """
+    if filas is not None:
+        codigos = codigos[filas]
+    if not len(codigos):
+        return {}
+    orden = np.argsort(codigos, kind="stable")
+    ordenados = codigos[orden]
+    inicios = np.r_[0, np.flatnonzero(np.diff(ordenados)) + 1]
+    posiciones = orden if filas is None else filas[orden]
+    return {
+        zonas[ordenados[a]]: grupo
+        for a, grupo in zip(inicios, np.split(posiciones, inicios[1:]))
+    }
+
+
+def _indexar_por_rangos(codigos: np.ndarray, zonas: List[str]) -> Dict[str, slice]:
+    """
+    Índice nombre de zona -> rango contiguo de filas, para columnas ya ordenadas
+    por zona (almacén mapeado). Los rangos se sirven como vistas sin copia.
+    """
+    if not len(codigos):
+        return {}
+    # Búsqueda binaria de los límites de cada zona: no recorre ni copia la columna
+    limites = np.searchsorted(codigos, np.arange(len(zonas) + 1, dtype=codigos.dtype)).tolist()
+    return {
+        zona: slice(a, b)
+        for zona, a, b in zip(zonas, limites, limites[1:])
+        if b > a
+    }
+
+
+def _columna_vacia(nombre: str, n: int) -> np.ndarray:
+    """Columna de relleno para un archivo que no trae 'nombre'."""
+    if nombre in COLUMNAS_FLOAT or nombre in (COLUMNA_DURACION, COLUMNA_VELOCIDAD):
+        return np.full(n, np.nan)
+    if nombre in COLUMNAS_FECHA:
+        return np.full(n, SIN_FECHA, dtype=np.int64)
+    if nombre in COLUMNAS_INT:
+        return np.zeros(n, dtype=np.int64)
+    if nombre in COLUMNAS_ZONA:
+        # El código 0 es una zona real: el relleno depende del diccionario
+        raise ValueError("Las zonas se rellenan con ModeloDatos._columna_relleno")
+    if nombre == COLUMNA_HORA_DIA:
+        return np.full(n, -1, dtype=np.int8)
+    return np.full(n, "", dtype=object)
+
+
+def _cargar_archivo_aislado(ruta: str, tamano_bloque: Optional[int], usar_cache: Optional[bool]):
+    """
+    Carga un CSV en un modelo propio (se ejecuta en un proceso trabajador).
+
+    Returns:
+        Tupla (cabeceras, zonas, columnas, bytes_leidos) sin la columna de
+        fuente; 'bytes_leidos' es el desplazamiento hasta la última línea completa.
+    """
+    modelo = ModeloDatos(modo_almacen="memoria")
+    modelo.cargar_datos(ruta, tamano_bloque, usar_cache)
+    modelo._columnas.pop(COLUMNA_FUENTE, None)
+    return modelo._cabeceras, modelo._zonas, modelo._columnas, modelo._bytes_leidos[0]
+
+
+class VistaViajes(Sequence):
+    """
+    Vista de solo lectura sobre un subconjunto de filas del almacén columnar.
+
+    Se comporta como una lista de diccionarios (compatibilidad con el código que
+    esperaba filas de csv.DictReader), pero los diccionarios se construyen bajo
+    demanda. El acceso vectorizado se hace con 'columna' y 'codigos_zona'.
+
+    Las filas se seleccionan con un array de posiciones o con un 'slice'
+    contiguo; en este último caso las columnas se devuelven como vistas sin
+    copia (p. ej. sobre un almacén mapeado en memoria).
+    """
+
+    def __init__(
+        self,
+        columnas: Dict[str, np.ndarray],
+        zonas: List[str],
+        cabeceras: List[str],
+        indices: Optional[Union[np.ndarray, slice]] = None,
+    ):
+        self._columnas = columnas
+        self._zonas = zonas
+        self._cabeceras = cabeceras
+        self._indices = indices
+
+    def __len__(self) -> int:
+        if isinstance(self._indices, slice):
+            return self._indices.stop - self._indices.start
+        if self._indices is not None:
+            return len(self._indices)
+        if not self._columnas:
+            return 0
+        return len(next(iter(self._columnas.values())))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            inicio, fin, paso = i.indices(len(self))
+            if paso == 1 and not isinstance(self._indices, np.ndarray):
+                # Un rango contiguo sigue siendo un slice (sin copia)
+                base = self._indices.start if self._indices is not None else 0
+                subrango = slice(base + inicio, base + max(fin, inicio))
+                return VistaViajes(self._columnas, self._zonas, self._cabeceras, subrango)
+            posiciones = self._posiciones()[inicio:fin:paso]
+            return VistaViajes(self._columnas, self._zonas, self._cabeceras, posiciones)
+
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("Índice de viaje fuera de rango")
+        if isinstance(self._indices, slice):
+            fila = self._indices.start + i
+        elif self._indices is not None:
+            fila = int(self._indices[i])
+        else:
+            fila = i
+        return self._fila_como_dict(fila)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _posiciones(self) -> np.ndarray:
+        """Posiciones de fila de la vista como array."""
+        if isinstance(self._indices, np.ndarray):
+            return self._indices
+        if isinstance(self._indices, slice):
+            return np.arange(self._indices.start, self._indices.stop)
+        return np.arange(len(self))
+
+    def _fila_como_dict(self, fila: int) -> Dict[str, str]:
+        """
+        Registro de una fila como lo daba csv.DictReader: todos los valores
+        como texto ('' para los vacíos), de modo que 'ultimo_registro' y los
+        JSON exportados conservan el esquema de antes del almacén columnar.
+        """
+        registro = {}
+        for nombre in self._cabeceras:
+            registro[nombre] = _texto_valor(nombre, self._columnas[nombre][fila], self._zonas)
+        return registro
+
+    def subconjunto(self, posiciones: np.ndarray) -> "VistaViajes":
+        """Vista con las filas indicadas (posiciones relativas a esta vista)."""
+        return VistaViajes(
+            self._columnas, self._zonas, self._cabeceras, self._posiciones()[posiciones]
+        )
+
+    def tramo_mapeado(self) -> Optional[Tuple[str, int, int]]:
+        """
+        (directorio, inicio, fin) si la vista es un rango contiguo de filas de
+        un almacén mapeado, o None. Con eso otro proceso puede reabrir las
+        columnas en disco (AlmacenMapeado.mapear) sin que se le envíen copias.
+        """
+        destinos = self._columnas.get("Zona_destino")
+        if not isinstance(destinos, np.memmap) or isinstance(self._indices, np.ndarray):
+            return None
+        inicio = self._indices.start if isinstance(self._indices, slice) else 0
+        return os.path.dirname(destinos.filename), inicio, inicio + len(self)
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Devuelve los valores tipados de una columna para las filas de la vista."""
+        datos = self._columnas[nombre]
+        return datos[:] if self._indices is None else datos[self._indices]
+
+    def codigos_zona(self, nombre: str) -> np.ndarray:
+        """Devuelve los códigos enteros de una columna de zona ('Zona_origen'/'Zona_destino')."""
+        return self.columna(nombre)
+
+    def texto_codificado(self, nombre: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (códigos, vocabulario) de una columna de texto codificada como
+        diccionario (almacén mapeado) para las filas de la vista, o None si la
+        columna no está codificada.
+        """
+        datos = self._columnas[nombre]
+        if not isinstance(datos, ColumnaCodificada):
+            return None
+        codigos = datos.codigos[:] if self._indices is None else datos.codigos[self._indices]
+        return codigos, datos.vocabulario
+
+    @property
+    def zonas(self) -> List[str]:
+        """Diccionario código -> nombre de zona."""
+        return self._zonas
+
+    @property
+    def cabeceras(self) -> List[str]:
+        """Columnas del CSV original, en su orden."""
+        return self._cabeceras
+
+    def tiene_columna(self, nombre: str) -> bool:
+        return nombre in self._columnas
+
 
 class ModeloDatos:
     """
     Modelo para gestionar la carga y acceso a los datos del archivo CSV.
-    Almacena los registros en memoria como una lista de diccionarios.
+    Almacena los registros en memoria en formato columnar: arrays de NumPy para
+    los campos numéricos y códigos enteros (diccionario compartido) para las zonas.
+
+    Con modo_almacen="mmap" las columnas viven en disco (AlmacenMapeado) y se
+    acceden mediante memoria mapeada.
     """
-    def __init__(self):
-        self._datos: List[Dict[str, Any]] = []
+    def __init__(self, modo_almacen: Optional[str] = None):
+        self._modo_almacen = modo_almacen or Configuracion.MODO_ALMACEN
+        self._columnas: Dict[str, np.ndarray] = {}
         self._cabeceras: List[str] = []
+        self._zonas: List[str] = []
+        self._codigo_zona: Dict[str, int] = {}
+        # Índices zona -> posiciones de fila, construidos una vez por carga
+        self._indice_destino: Dict[str, Union[np.ndarray, slice]] = {}
+        # None: el de origen se resuelve por zona bajo demanda (almacén mapeado)
+        self._indice_origen: Optional[Dict[str, np.ndarray]] = {}
+        # Viajes e ingresos por par (origen, destino), también por carga
+        self._matriz_od = MatrizOD.vacia(self._zonas)
+        # Viajes y sumas por destino × día de la semana × hora
+        self._cubo_temporal = CuboTemporal.vacio(self._zonas)
+        # Archivos (meses) cargados y filtro activo sobre ellos
+        self._fuentes: List[str] = []
+        self._fuente_activa: Optional[str] = None
+        self._filas_activas: Optional[np.ndarray] = None  # None = todas las filas
+        # Seguimiento de archivos que crecen: rutas cargadas y bytes ya incorporados
+        self._rutas: List[str] = []
+        self._bytes_leidos: List[int] = []
+        # Búfer con capacidad de sobra por columna para anexar filas sin copiar todo
+        self._reservas: Dict[str, np.ndarray] = {}
+        # Sello de versión: cambia cada vez que cambian los datos visibles
+        self._version = 0
+        # Versión por destino: avanza al anexar viajes de ese destino
+        self._versiones_destino: Dict[str, int] = {}
+        # Callbacks (filas_leidas, fraccion) notificados durante la carga
+        self._suscriptores_progreso: List[Callable[[int, float], None]] = []
+
+    def suscribir_progreso(self, callback: Callable[[int, float], None]) -> None:
+        """
+        Registra un callback que recibe el progreso de la carga.
+
+        Args:
+            callback: Función llamada tras cada bloque con el número de filas
+                leídas y la fracción (0-1) del archivo procesada.
+        """
+        self._suscriptores_progreso.append(callback)
+
+    def obtener_version(self, destino: Optional[str] = None) -> Hashable:
+        """
+        Versión del dataset; se incrementa en cada carga o cambio de filtro.
+        Con 'destino' devuelve la versión de los datos de ese destino, que
+        cambia además cuando 'leer_anexos' le añade viajes.
+        """
+        if destino is None:
+            return self._version
+        return (self._version, self._versiones_destino.get(destino, 0))
+
+    def _notificar_progreso(self, filas: int, fraccion: float) -> None:
+        for callback in self._suscriptores_progreso:
+            callback(filas, fraccion)
 
-    def cargar_datos(self, ruta_archivo: str) -> None:
+    @Instrumentacion.medir("carga.cargar_datos", "carga")
+    def cargar_datos(
+        self,
+        ruta_archivo: str,
+        tamano_bloque: Optional[int] = None,
+        usar_cache: Optional[bool] = None,
+    ) -> List[str]:
         """
         Carga datos desde un archivo CSV a memoria.
-        
+
+        El archivo se lee en bloques de 'tamano_bloque' filas. Cada bloque se
+        convierte a columnas tipadas y se descarta el texto, de modo que el pico
+        de memoria no depende del tamaño del archivo en texto.
+
+        Si la caché binaria está activa y es válida para el CSV, las columnas se
+        leen de ella sin parsear; si no, se parsea el CSV y se regenera la caché.
+
         Args:
             ruta_archivo: Ruta absoluta o relativa al archivo .csv.
-            
+            tamano_bloque: Filas por bloque. Por defecto Configuracion.TAMANO_BLOQUE_CARGA.
+            usar_cache: Activa la caché binaria. Por defecto Configuracion.USAR_CACHE_BINARIA.
+
+        Returns:
+            Avisos de la carga para mostrar al usuario (p. ej. que el almacén
+            mapeado no se pudo crear y los datos se cargaron en memoria).
+
         Raises:
             FileNotFoundError: Si el archivo no existe.
         """
         if not os.path.exists(ruta_archivo):
             raise FileNotFoundError(f"Archivo no encontrado: {ruta_archivo}")
-            
-        with open(ruta_archivo, mode='r', encoding='utf-8') as f:
-            lector = csv.DictReader(f)
-            if lector.fieldnames:
-                self._cabeceras = list(lector.fieldnames)
-            self._datos = list(lector)
 
-    def obtener_todos(self) -> List[Dict[str, Any]]:
-        """Devuelve todos los registros cargados."""
-        return self._datos
+        if self._modo_almacen == "mmap":
+            return self._cargar_mapeado(ruta_archivo, tamano_bloque)
+
+        if usar_cache is None:
+            usar_cache = Configuracion.USAR_CACHE_BINARIA
+        firma = None
+        if usar_cache:
+            with Instrumentacion.etapa("carga.leer_cache", "carga"):
+                almacen = CacheDatos.leer(ruta_archivo, CacheDatos.firma_rapida(ruta_archivo))
+            if almacen is not None:
+                self._cabeceras, self._zonas, self._columnas, leidos = almacen
+                self._codigo_zona = {z: i for i, z in enumerate(self._zonas)}
+                self._finalizar_carga([ruta_archivo], [leidos])
+                return []
+            # La firma que se guarda (con hash) se toma antes de parsear
+            firma = CacheDatos.firma(ruta_archivo)
+
+        leidos = self._parsear_csv(ruta_archivo, tamano_bloque)
+        if firma:
+            CacheDatos.guardar(
+                ruta_archivo, firma, self._cabeceras, self._zonas, self._columnas, leidos
+            )
+        self._finalizar_carga([ruta_archivo], [leidos])
+        return []
+
+    @Instrumentacion.medir("carga.cargar_varios", "carga")
+    def cargar_varios(
+        self,
+        patron: Union[str, List[str]],
+        tamano_bloque: Optional[int] = None,
+        trabajadores: Optional[int] = None,
+        usar_cache: Optional[bool] = None,
+    ) -> List[str]:
+        """
+        Carga varios CSV mensuales (un directorio o un patrón glob) en un único almacén.
+
+        Cada archivo se parsea en un proceso distinto (reutilizando su caché
+        binaria si existe). Después se unifican los diccionarios de zonas y se
+        concatenan las columnas en el orden de los archivos. Cada viaje queda
+        etiquetado con su archivo de origen en la columna COLUMNA_FUENTE.
+        La carga de varios archivos se hace siempre en memoria.
+
+        Args:
+            patron: Directorio (se toman sus *.csv), patrón glob, p. ej.
+                'data/NYC_2025*.csv', o lista explícita de rutas (se respeta su orden).
+            tamano_bloque: Filas por bloque al parsear cada archivo.
+            trabajadores: Procesos para el parseo. Por defecto Configuracion.TRABAJADORES_CARGA.
+            usar_cache: Activa la caché binaria de cada archivo (ver 'cargar_datos').
+
+        Returns:
+            Avisos de la carga (ver 'cargar_datos').
+
+        Raises:
+            FileNotFoundError: Si ningún archivo coincide con el patrón o si
+                alguna ruta de la lista no existe.
+        """
+        if isinstance(patron, str):
+            if os.path.isdir(patron):
+                patron = os.path.join(patron, "*.csv")
+            rutas = sorted(glob.glob(patron))
+        else:
+            rutas = list(patron)
+            faltan = [r for r in rutas if not os.path.isfile(r)]
+            if faltan:
+                raise FileNotFoundError(f"Archivo no encontrado: {', '.join(faltan)}")
+        if not rutas:
+            raise FileNotFoundError(f"Ningún archivo coincide con: {patron}")
+        if len(rutas) == 1:
+            return self.cargar_datos(rutas[0], tamano_bloque, usar_cache)
+
+        trabajadores = min(trabajadores or Configuracion.TRABAJADORES_CARGA, len(rutas))
+        partes = []
+        contexto = multiprocessing.get_context(Configuracion.INICIO_PROCESOS)
+        with ProcessPoolExecutor(max_workers=max(trabajadores, 1), mp_context=contexto) as ejecutor:
+            futuros = [
+                ejecutor.submit(_cargar_archivo_aislado, ruta, tamano_bloque, usar_cache)
+                for ruta in rutas
+            ]
+            filas = 0
+            for hechos, futuro in enumerate(futuros, start=1):
+                partes.append(futuro.result())
+                filas += len(next(iter(partes[-1][2].values()), ()))
+                self._notificar_progreso(filas, hechos / len(rutas) * 0.99)
+
+        self._fusionar(partes)
+        self._finalizar_carga(rutas, [parte[3] for parte in partes], unico=False)
+        return []
+
+    def _fusionar(self, partes: List[Any]) -> None:
+        """
+        Une los almacenes (cabeceras, zonas, columnas, bytes) de varios archivos,
+        recodificando las zonas contra un diccionario compartido.
+        """
+        self._cabeceras = list(partes[0][0])
+        self._zonas = []
+        self._codigo_zona = {}
+        nombres = list(dict.fromkeys(n for _, _, columnas, _ in partes for n in columnas))
+
+        piezas: Dict[str, List[np.ndarray]] = {n: [] for n in nombres}
+        fuentes = []
+        for fuente, (_, zonas, columnas, _) in enumerate(partes):
+            n = len(next(iter(columnas.values()), ()))
+            recodificar = _codificar_zonas(zonas, self._codigo_zona, self._zonas, len(zonas))
+            for nombre in nombres:
+                valores = columnas.get(nombre)
+                if valores is None:
+                    valores = self._columna_relleno(nombre, n)
+                elif nombre in COLUMNAS_ZONA:
+                    valores = recodificar[valores]
+                piezas[nombre].append(valores)
+            fuentes.append(np.full(n, fuente, dtype=np.int16))
+
+        self._columnas = {n: np.concatenate(p) for n, p in piezas.items()}
+        self._columnas[COLUMNA_FUENTE] = np.concatenate(fuentes)
+
+    def _cargar_mapeado(self, ruta_archivo: str, tamano_bloque: Optional[int]) -> List[str]:
+        """
+        Abre (o construye y abre) el almacén en disco del CSV. Si no se puede
+        crear, carga en memoria y lo indica en los avisos devueltos.
+        """
+        avisos: List[str] = []
+        # Abrir un almacén válido solo consulta tamaño y fecha, sin leer el CSV
+        almacen = AlmacenMapeado.abrir(ruta_archivo, CacheDatos.firma_rapida(ruta_archivo))
+        if almacen is None:
+            firma = CacheDatos.firma(ruta_archivo)
+            leidos = [0]
+            bloques = self._leer_bloques(ruta_archivo, tamano_bloque, leidos)
+            # El primer bloque fija las cabeceras antes de empezar a escribir
+            primero = next(bloques, None)
+            pendientes = chain([primero], bloques) if primero is not None else []
+            try:
+                AlmacenMapeado.construir(
+                    ruta_archivo, firma, self._cabeceras, pendientes, self._zonas, leidos
+                )
+                almacen = AlmacenMapeado.abrir(ruta_archivo, firma)
+            except OSError as e:
+                avisos.append(f"No se pudo crear el almacén mapeado ({e}); se cargó en memoria.")
+
+        if almacen is None:
+            leidos = self._parsear_csv(ruta_archivo, tamano_bloque)
+        else:
+            self._cabeceras, self._zonas, self._columnas, leidos = almacen
+            self._codigo_zona = {z: i for i, z in enumerate(self._zonas)}
+        self._finalizar_carga([ruta_archivo], [leidos])
+        return avisos
+
+    def _finalizar_carga(
+        self, rutas: List[str], bytes_leidos: List[int], unico: bool = True
+    ) -> None:
+        """
+        Registra los archivos de origen, quita el filtro de fuente y reconstruye
+        los índices. Con 'unico' la fuente es implícita (todas las filas son del
+        archivo 0) y no se guarda la columna COLUMNA_FUENTE.
+
+        Args:
+            bytes_leidos: Por archivo, bytes consumidos por la carga (hasta su
+                última línea completa); el modo 'tail' sigue leyendo desde ahí.
+        """
+        self._fuentes = ModeloDatos.etiquetas_fuente(rutas)
+        self._rutas = [os.path.abspath(r) for r in rutas]
+        self._bytes_leidos = list(bytes_leidos)
+        self._reservas = {}
+        self._versiones_destino = {}
+        if unico:
+            self._columnas.pop(COLUMNA_FUENTE, None)
+        self._fuente_activa = None
+        self._filas_activas = None
+        self._construir_indices()
+        self._notificar_progreso(len(self.obtener_todos()), 1.0)
+
+    @Instrumentacion.medir("carga.leer_anexos", "carga")
+    def leer_anexos(self, ruta: Optional[str] = None) -> Optional[Dict[str, VistaViajes]]:
+        """
+        Incorpora los viajes añadidos al final de un CSV ya cargado (modo 'tail').
+
+        Solo se leen los bytes nuevos desde la última lectura y solo se procesan
+        líneas completas: una línea a medio escribir se deja para la siguiente
+        llamada. Las columnas, los índices y las versiones de los destinos
+        afectados se actualizan de forma incremental, sin releer el archivo.
+
+        Args:
+            ruta: Archivo a seguir. Por defecto el último cargado (el mes más reciente).
+
+        Returns:
+            Diccionario destino -> vista de sus viajes nuevos (vacío si no hay
+            cambios), o None si el archivo ha encogido y hay que recargarlo.
+
+        Raises:
+            ValueError: Si el archivo no está cargado o el almacén es mapeado.
+            csv.Error, UnicodeDecodeError: Si las líneas nuevas no se pueden leer.
+            OSError: Si el archivo desaparece a mitad de lectura.
+        """
+        if isinstance(self._columnas.get('Zona_destino'), np.memmap):
+            raise ValueError("El seguimiento de archivos requiere el almacén en memoria")
+        ruta = os.path.abspath(ruta) if ruta else (self._rutas[-1] if self._rutas else None)
+        if ruta not in self._rutas:
+            raise ValueError(f"Archivo no cargado: {ruta}")
+
+        fuente = self._rutas.index(ruta)
+        leidos = self._bytes_leidos[fuente]
+        try:
+            tamano = os.path.getsize(ruta)
+        except OSError:
+            return None
+        if tamano < leidos:
+            return None
+        if tamano == leidos:
+            return {}
+
+        with open(ruta, "rb") as f:
+            f.seek(leidos)
+            nuevo = f.read(tamano - leidos)
+        fin = nuevo.rfind(b"\n") + 1
+        if not fin:
+            return {}
+        texto = nuevo[:fin].decode("utf-8")
+        filas = [f for f in csv.reader(io.StringIO(texto, newline="")) if f]
+        # Se avanza solo si el texto se ha podido leer
+        self._bytes_leidos[fuente] = leidos + fin
+        if not filas:
+            return {}
+        bloque = self._construir_columnas(filas)
+        bloque[COLUMNA_FUENTE] = np.full(len(filas), fuente, dtype=np.int16)
+        return self._anexar(bloque)
+
+    def _anexar(self, bloque: Dict[str, np.ndarray]) -> Dict[str, VistaViajes]:
+        """
+        Añade un bloque de filas al final del almacén y actualiza los índices.
+
+        Las columnas son vistas sobre un búfer con capacidad de sobra que se
+        duplica al llenarse, así que anexar cuesta lo que ocupa el bloque. Las
+        vistas entregadas antes siguen siendo válidas (sus filas no cambian).
+
+        Returns:
+            Destino -> vista de sus viajes nuevos visibles con el filtro actual.
+        """
+        n = len(next(iter(self._columnas.values()), ()))
+        m = len(bloque[COLUMNA_FUENTE])
+        for nombre, actual in list(self._columnas.items()):
+            nuevos = bloque.get(nombre)
+            if nuevos is None:
+                nuevos = self._columna_relleno(nombre, m)
+            reserva = self._reservas.get(nombre)
+            if reserva is None or len(reserva) < n + m:
+                reserva = np.empty(max(2 * (n + m), 1024), dtype=actual.dtype)
+                reserva[:n] = actual
+                self._reservas[nombre] = reserva
+            reserva[n:n + m] = nuevos
+            self._columnas[nombre] = reserva[:n + m]
+
+        nuevas = np.arange(n, n + m)
+        if self._fuente_activa is not None:
+            if self._fuentes.index(self._fuente_activa) != bloque[COLUMNA_FUENTE][0]:
+                return {}  # El filtro de mes oculta las filas nuevas
+            if self._filas_activas is not None:
+                self._filas_activas = np.concatenate([self._filas_activas, nuevas])
+
+        afectados: Dict[str, np.ndarray] = {}
+        for nombre, indice in (('Zona_destino', self._indice_destino), ('Zona_origen', self._indice_origen)):
+            if nombre not in self._columnas:
+                continue
+            grupos = _indexar_por_zona(self._columnas[nombre], self._zonas, nuevas)
+            for zona, grupo in grupos.items():
+                previo = indice.get(zona)
+                indice[zona] = grupo if previo is None else np.concatenate([previo, grupo])
+            if nombre == 'Zona_destino':
+                afectados = grupos
+
+        self._matriz_od = self._matriz_od.combinar(self._construir_matriz_od(nuevas))
+        self._cubo_temporal = self._cubo_temporal.combinar(self._construir_cubo_temporal(nuevas))
+        for destino in afectados:
+            self._versiones_destino[destino] = self._versiones_destino.get(destino, 0) + 1
+        return {
+            destino: VistaViajes(self._columnas, self._zonas, self._cabeceras, posiciones)
+            for destino, posiciones in afectados.items()
+        }
+
+    def _parsear_csv(self, ruta_archivo: str, tamano_bloque: Optional[int]) -> int:
+        """
+        Parsea el CSV por bloques y deja las columnas tipadas en el modelo.
+
+        Returns:
+            Bytes consumidos del archivo (hasta su última línea completa).
+        """
+        leidos = [0]
+        bloques: Dict[str, List[np.ndarray]] = {}
+        for bloque in self._leer_bloques(ruta_archivo, tamano_bloque, leidos):
+            for nombre, valores in bloque.items():
+                bloques.setdefault(nombre, []).append(valores)
+
+        if bloques:
+            self._columnas = {c: np.concatenate(partes) for c, partes in bloques.items()}
+        else:
+            self._columnas = self._construir_columnas([])
+        return leidos[0]
+
+    def _leer_bloques(
+        self, ruta_archivo: str, tamano_bloque: Optional[int], leidos: Optional[List[int]] = None
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Generador que lee el CSV en bloques de 'tamano_bloque' filas y produce
+        cada bloque ya convertido a columnas tipadas, descartando el texto.
+        Al empezar fija las cabeceras y reinicia el diccionario de zonas.
+
+        Solo se leen líneas completas: una última línea sin salto de línea se
+        considera a medio escribir y se deja para el modo 'tail'. En 'leidos[0]'
+        se acumulan los bytes consumidos (el desplazamiento tras la última línea
+        completa).
+        """
+        tamano_bloque = tamano_bloque or Configuracion.TAMANO_BLOQUE_CARGA
+        tamano_archivo = os.path.getsize(ruta_archivo) or 1
+        if leidos is None:
+            leidos = [0]
+
+        with open(ruta_archivo, mode='rb') as f:
+            lector = csv.reader(self._lineas_completas(f, leidos))
+            self._cabeceras = list(next(lector, []))
+            self._zonas = []
+            self._codigo_zona = {}
+
+            total_filas = 0
+            while True:
+                filas = list(islice(lector, tamano_bloque))
+                if not filas:
+                    break
+                total_filas += len(filas)
+                bloque = self._construir_columnas(filas)
+                del filas
+                yield bloque
+                self._notificar_progreso(total_filas, min(leidos[0] / tamano_archivo, 1.0))
+
+    @staticmethod
+    def _lineas_completas(f: BinaryIO, leidos: List[int]) -> Iterator[str]:
+        """
+        Itera, ya decodificadas, las líneas terminadas en salto de línea del
+        archivo (abierto en binario), acumulando en 'leidos[0]' sus bytes. Se
+        detiene ante una última línea sin terminar, que no se cuenta.
+        """
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                return
+            leidos[0] += len(linea)
+            yield linea.decode("utf-8")
+
+    @Instrumentacion.medir("carga.parsear_bloque", "carga")
+    def _construir_columnas(self, filas: List[List[str]]) -> Dict[str, np.ndarray]:
+        """
+        Transpone las filas de texto, convierte cada columna a su tipo y añade
+        las columnas derivadas (duración, velocidad, hora del día).
+        """
+        n = len(filas)
+        columnas: Dict[str, np.ndarray] = {}
+        Instrumentacion.contar("filas_parseadas", n)
+
+        for i, nombre in enumerate(self._cabeceras):
+            # Las filas cortas se completan con texto vacío
+            valores = [f[i] if i < len(f) else "" for f in filas]
+            if nombre in COLUMNAS_FLOAT:
+                columnas[nombre] = _a_float(valores)
+            elif nombre in COLUMNAS_INT:
+                columnas[nombre] = _a_int(valores)
+            elif nombre in COLUMNAS_ZONA:
+                columnas[nombre] = _codificar_zonas(valores, self._codigo_zona, self._zonas, n)
+            elif nombre in COLUMNAS_FECHA:
+                columnas[nombre] = _a_minutos_epoca(valores)
+            else:
+                columnas[nombre] = np.array(valores, dtype=object)
+        # Columnas conocidas que el CSV no trae: relleno neutro (NaN, 0, sin fecha)
+        # para que el análisis no dependa de qué columnas opcionales existen
+        for nombre in (*COLUMNAS_FLOAT, *COLUMNAS_INT, *COLUMNAS_FECHA, *COLUMNAS_ZONA):
+            if nombre not in columnas:
+                columnas[nombre] = self._columna_relleno(nombre, n)
+        _calcular_derivadas(columnas)
+        return columnas
+
+    def _columna_relleno(self, nombre: str, n: int) -> np.ndarray:
+        """
+        Como '_columna_vacia', pero las zonas se rellenan con el código de
+        ZONA_VACIA (se añade al diccionario si hace falta), nunca con el de
+        una zona real.
+        """
+        if nombre in COLUMNAS_ZONA:
+            codigo = _codificar_zonas([ZONA_VACIA], self._codigo_zona, self._zonas, 1)[0]
+            return np.full(n, codigo, dtype=np.int32)
+        return _columna_vacia(nombre, n)
+
+    @Instrumentacion.medir("carga.indices", "carga")
+    def _construir_indices(self) -> None:
+        """
+        Indexa las filas (visibles según la fuente activa) por 'Zona_destino'
+        y 'Zona_origen' y avanza la versión.
+        """
+        self._version += 1
+        filas = self._filas_activas
+        destinos = self._columnas.get('Zona_destino', np.empty(0, dtype=np.int32))
+        if filas is None and self._modo_almacen == "mmap" and isinstance(destinos, np.memmap):
+            # El almacén mapeado está ordenado por destino: rangos sin copia, y
+            # los orígenes se buscan por tramos al pedirlos en lugar de ordenarlos
+            self._indice_destino = _indexar_por_rangos(destinos, self._zonas)
+            self._indice_origen = None
+        else:
+            self._indice_destino = _indexar_por_zona(destinos, self._zonas, filas)
+            self._indice_origen = _indexar_por_zona(
+                self._columnas.get('Zona_origen', np.empty(0, dtype=np.int32)), self._zonas, filas
+            )
+        self._matriz_od = self._construir_matriz_od(filas)
+        self._cubo_temporal = self._construir_cubo_temporal(filas)
+
+    def _tramos(self, filas: Optional[np.ndarray]) -> Iterator[np.ndarray]:
+        """Posiciones de las filas indicadas (None = todas) en tramos de _FILAS_POR_TRAMO."""
+        total = len(next(iter(self._columnas.values()), ())) if filas is None else len(filas)
+        for inicio in range(0, total, _FILAS_POR_TRAMO):
+            fin = min(inicio + _FILAS_POR_TRAMO, total)
+            yield np.arange(inicio, fin) if filas is None else filas[inicio:fin]
+
+    def _columnas_tramo(self, nombres: Iterable[str], posiciones: np.ndarray) -> List[np.ndarray]:
+        """Valores de las columnas en las posiciones dadas (ceros si falta una)."""
+        filas = len(posiciones)
+        if filas and posiciones[-1] - posiciones[0] + 1 == filas:
+            # Posiciones consecutivas: rebanada en lugar de indexado (lectura secuencial)
+            posiciones = slice(int(posiciones[0]), int(posiciones[-1]) + 1)
+        return [
+            self._columnas[nombre][posiciones] if nombre in self._columnas else np.zeros(filas)
+            for nombre in nombres
+        ]
+
+    def _construir_matriz_od(self, filas: Optional[np.ndarray]) -> MatrizOD:
+        """Matriz origen-destino de las filas indicadas (None = todas), por tramos."""
+        matriz = MatrizOD.vacia(self._zonas)
+        if 'Zona_origen' not in self._columnas or 'Zona_destino' not in self._columnas:
+            return matriz
+        for posiciones in self._tramos(filas):
+            columnas = self._columnas_tramo(('Zona_origen', 'Zona_destino', 'Importe_total'), posiciones)
+            parcial = MatrizOD.construir(self._zonas, *columnas, posiciones=posiciones)
+            matriz = parcial if not len(matriz) else matriz.combinar(parcial)
+        return matriz
+
+    def _construir_cubo_temporal(self, filas: Optional[np.ndarray]) -> CuboTemporal:
+        """Cubo destino × día × hora de las filas indicadas (None = todas), por tramos."""
+        cubo = CuboTemporal.vacio(self._zonas)
+        nombres = ('Zona_destino', 'Hora_inicio', COLUMNA_HORA_DIA)
+        if not all(c in self._columnas for c in nombres):
+            return cubo
+        nombres += ('Importe_total', 'Distancia_KM', COLUMNA_DURACION)
+        for posiciones in self._tramos(filas):
+            parcial = CuboTemporal.construir(self._zonas, *self._columnas_tramo(nombres, posiciones))
+            cubo = cubo.combinar(parcial)
+        return cubo
+
+    def obtener_fuentes(self) -> List[str]:
+        """Etiquetas de los archivos cargados (p. ej. 'NYC_202501'), en orden de carga."""
+        return self._fuentes
+
+    @staticmethod
+    def etiquetas_fuente(rutas: List[str]) -> List[str]:
+        """
+        Etiqueta única de cada archivo: su nombre sin extensión o, si otro archivo
+        se llama igual, precedido de los directorios padre necesarios para
+        distinguirlos (p. ej. '2024_NYC_01' y '2025_NYC_01').
+        """
+        absolutas = [os.path.abspath(r) for r in rutas]
+        unicas = list(dict.fromkeys(absolutas))
+        partes = [os.path.splitext(r)[0].split(os.sep) for r in unicas]
+        etiquetas = [p[-1] for p in partes]
+        for niveles in range(2, max((len(p) for p in partes), default=0) + 1):
+            repetidas = {e for e in etiquetas if etiquetas.count(e) > 1}
+            if not repetidas:
+                break
+            etiquetas = [
+                "_".join(p[-niveles:]).lstrip("_") if e in repetidas else e
+                for p, e in zip(partes, etiquetas)
+            ]
+
+        # Si la misma ruta aparece varias veces, sus repeticiones se numeran
+        por_ruta = dict(zip(unicas, etiquetas))
+        apariciones: Dict[str, int] = {}
+        salida = []
+        for ruta in absolutas:
+            apariciones[ruta] = apariciones.get(ruta, 0) + 1
+            n = apariciones[ruta]
+            salida.append(por_ruta[ruta] if n == 1 else f"{por_ruta[ruta]}_{n}")
+        return salida
+
+    def obtener_fuente_activa(self) -> Optional[str]:
+        """Fuente a la que se limitan las consultas, o None si se usan todas."""
+        return self._fuente_activa
+
+    def seleccionar_fuente(self, fuente: Optional[str]) -> None:
+        """
+        Limita las consultas del modelo a los viajes de un archivo (mes) o,
+        con None, vuelve a usar todos. Cambia la versión del dataset.
+
+        Raises:
+            ValueError: Si la fuente no está cargada.
+        """
+        if fuente is None:
+            self._filas_activas = None
+        elif fuente in self._fuentes:
+            codigo = self._fuentes.index(fuente)
+            if COLUMNA_FUENTE in self._columnas:
+                self._filas_activas = np.flatnonzero(self._columnas[COLUMNA_FUENTE] == codigo)
+            else:
+                self._filas_activas = None  # Un único archivo: todas las filas
+        else:
+            raise ValueError(f"Fuente no cargada: {fuente}")
+        self._fuente_activa = fuente
+        self._construir_indices()
+
+    def obtener_todos(self) -> VistaViajes:
+        """Devuelve una vista (compatible con lista de diccionarios) de todos los registros."""
+        return VistaViajes(self._columnas, self._zonas, self._cabeceras, self._filas_activas)
 
     def obtener_cabeceras(self) -> List[str]:
         """Devuelve la lista de nombres de columnas del CSV."""
@@ -43,12 +1043,56 @@ class ModeloDatos:
         Extrae y devuelve una lista ordenada alfabéticamente de
         todos los destinos únicos ('Zona_destino') presentes en los datos.
         """
-        # Usamos un set comprehension para velocidad y unicidad
-        destinos = {item.get('Zona_destino') for item in self._datos if item.get('Zona_destino')}
-        return sorted(list(destinos))
+        return sorted(d for d in self._indice_destino if d != ZONA_VACIA)
 
-    def obtener_viajes_por_destino(self, destino: str) -> List[Dict[str, Any]]:
+    def obtener_matriz_od(self) -> MatrizOD:
         """
-        Filtra y devuelve todos los viajes que coinciden con el destino dado.
+        Matriz origen-destino de los viajes visibles (según la fuente activa),
+        construida en la carga y actualizada al anexar viajes.
         """
-        return [item for item in self._datos if item.get('Zona_destino') == destino]
+        return self._matriz_od
+
+    def obtener_cubo_temporal(self) -> CuboTemporal:
+        """
+        Cubo destino × día de la semana × hora de los viajes visibles (según
+        la fuente activa), construido en la carga y actualizado al anexar viajes.
+        """
+        return self._cubo_temporal
+
+    @Instrumentacion.medir("filtrado.por_destino", "filtrado")
+    def obtener_viajes_por_destino(self, destino: str) -> VistaViajes:
+        """
+        Devuelve todos los viajes que coinciden con el destino dado (consulta al índice).
+        """
+        return self._vista_desde_indice(self._indice_destino, destino)
+
+    def obtener_viajes_por_origen(self, origen: str) -> VistaViajes:
+        """
+        Devuelve todos los viajes que salen de la zona de origen dada (consulta al
+        índice o, en el almacén mapeado, búsqueda por tramos sobre la columna).
+        """
+        if self._indice_origen is None:
+            return VistaViajes(
+                self._columnas, self._zonas, self._cabeceras, self._filas_de_zona('Zona_origen', origen)
+            )
+        return self._vista_desde_indice(self._indice_origen, origen)
+
+    def _filas_de_zona(self, nombre: str, zona: str) -> np.ndarray:
+        """Posiciones de las filas con 'zona' en la columna 'nombre', recorrida por tramos."""
+        codigo = self._codigo_zona.get(zona)
+        if codigo is None or nombre not in self._columnas:
+            return np.empty(0, dtype=np.int64)
+        columna = self._columnas[nombre]
+        partes = [
+            np.flatnonzero(columna[inicio:inicio + _FILAS_POR_TRAMO] == codigo) + inicio
+            for inicio in range(0, len(columna), _FILAS_POR_TRAMO)
+        ]
+        return np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+
+    def _vista_desde_indice(
+        self, indice: Dict[str, Union[np.ndarray, slice]], zona: str
+    ) -> VistaViajes:
+        indices = indice.get(zona)
+        if indices is None:
+            indices = np.empty(0, dtype=np.int64)
+        return VistaViajes(self._columnas, self._zonas, self._cabeceras, indices)
@@ -0,0 +1,166 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Con más pares posibles (zonas²) las celdas se cuentan ordenando (np.unique)
+# en lugar de con un np.bincount denso
+MAX_CELDAS_DENSAS = 4_000_000
+_SIN_FILA = np.iinfo(np.int64).max
+
+
+class MatrizOD:
+    """
+    Matriz dispersa origen × destino: viajes e ingresos de cada par de zonas.
+
+    Solo guarda las celdas con viajes, ordenadas por (origen, destino), más una
+    permutación ordenada por (destino, origen) y el inicio de cada zona en
+    ambos órdenes: los flujos de una zona son un tramo contiguo y su top-k se
+    obtiene con una ordenación parcial (np.partition) del tramo. Cada celda
+    recuerda la primera fila en que aparece: a igual número de viajes, el
+    top-k se desempata por orden de primera aparición, de forma determinista.
+
+    Atributos públicos (arrays alineados, uno por celda): 'origen' y
+    'destino' (códigos de 'zonas'), 'viajes', 'ingresos' y 'primera'.
+    """
+
+    def __init__(
+        self,
+        zonas: List[str],
+        origen: np.ndarray,
+        destino: np.ndarray,
+        viajes: np.ndarray,
+        ingresos: np.ndarray,
+        primera: np.ndarray,
+    ):
+        self.zonas = zonas
+        self.origen = origen
+        self.destino = destino
+        self.viajes = viajes
+        self.ingresos = ingresos
+        self.primera = primera
+
+        n = len(zonas)
+        self._codigo = {zona: i for i, zona in enumerate(zonas)}
+        self._inicio_origen = np.searchsorted(origen, np.arange(n + 1))
+        self._orden_destino = np.lexsort((origen, destino))
+        self._inicio_destino = np.searchsorted(destino[self._orden_destino], np.arange(n + 1))
+
+    def __len__(self) -> int:
+        """Número de pares (origen, destino) con algún viaje."""
+        return len(self.viajes)
+
+    @staticmethod
+    def vacia(zonas: List[str]) -> "MatrizOD":
+        vacio = np.empty(0, dtype=np.int64)
+        return MatrizOD(zonas, vacio, vacio, vacio, np.empty(0), vacio)
+
+    @staticmethod
+    def construir(
+        zonas: List[str],
+        origenes: np.ndarray,
+        destinos: np.ndarray,
+        importes: np.ndarray,
+        posiciones: Optional[np.ndarray] = None,
+    ) -> "MatrizOD":
+        """
+        Cuenta los pares de una sola pasada sobre los códigos de zona.
+
+        Args:
+            zonas: Diccionario de zonas del almacén (código -> nombre).
+            origenes, destinos: Códigos de zona de cada viaje.
+            importes: Importe de cada viaje (los NaN suman 0).
+            posiciones: Fila de cada viaje en el almacén, para 'primera'. Por
+                defecto, su posición en los arrays.
+        """
+        if not len(origenes):
+            return MatrizOD.vacia(zonas)
+        n = max(len(zonas), 1)
+        claves = origenes.astype(np.int64) * n + destinos
+        pesos = np.where(np.isnan(importes), 0.0, importes)
+        if posiciones is None:
+            posiciones = np.arange(len(claves))
+
+        if n * n <= MAX_CELDAS_DENSAS:
+            conteos = np.bincount(claves, minlength=n * n)
+            celdas = np.flatnonzero(conteos)
+            viajes = conteos[celdas]
+            ingresos = np.bincount(claves, weights=pesos, minlength=n * n)[celdas]
+            primera = np.full(n * n, _SIN_FILA)
+            np.minimum.at(primera, claves, posiciones)
+            primera = primera[celdas]
+        else:
+            celdas, inversa, viajes = np.unique(claves, return_inverse=True, return_counts=True)
+            ingresos = np.bincount(inversa, weights=pesos, minlength=len(celdas))
+            primera = np.full(len(celdas), _SIN_FILA)
+            np.minimum.at(primera, inversa, posiciones)
+
+        origen, destino = np.divmod(celdas, n)
+        return MatrizOD(zonas, origen, destino, viajes.astype(np.int64), ingresos, primera)
+
+    def combinar(self, otra: "MatrizOD") -> "MatrizOD":
+        """Matriz con las celdas de ambas sumadas (p. ej. al anexar viajes)."""
+        zonas = otra.zonas if len(otra.zonas) >= len(self.zonas) else self.zonas
+        n = max(len(zonas), 1)
+        claves = np.concatenate(
+            [self.origen * n + self.destino, otra.origen * n + otra.destino]
+        )
+        celdas, inversa = np.unique(claves, return_inverse=True)
+        viajes = np.bincount(
+            inversa, weights=np.concatenate([self.viajes, otra.viajes]), minlength=len(celdas)
+        ).astype(np.int64)
+        ingresos = np.bincount(
+            inversa, weights=np.concatenate([self.ingresos, otra.ingresos]), minlength=len(celdas)
+        )
+        primera = np.full(len(celdas), _SIN_FILA)
+        np.minimum.at(primera, inversa, np.concatenate([self.primera, otra.primera]))
+        origen, destino = np.divmod(celdas, n)
+        return MatrizOD(zonas, origen, destino, viajes, ingresos, primera)
+
+    # --- Consultas ---
+
+    def top_origenes(self, destino: str, k: int = 5) -> List[Tuple[str, int, float]]:
+        """Los k orígenes con más viajes hacia 'destino': (zona, viajes, ingresos)."""
+        c = self._codigo.get(destino)
+        if c is None or c + 1 >= len(self._inicio_destino):
+            return []
+        celdas = self._orden_destino[self._inicio_destino[c]:self._inicio_destino[c + 1]]
+        return self._top(celdas, self.origen, k)
+
+    def top_destinos(self, origen: str, k: int = 5) -> List[Tuple[str, int, float]]:
+        """Los k destinos con más viajes desde 'origen': (zona, viajes, ingresos)."""
+        c = self._codigo.get(origen)
+        if c is None or c + 1 >= len(self._inicio_origen):
+            return []
+        celdas = np.arange(self._inicio_origen[c], self._inicio_origen[c + 1])
+        return self._top(celdas, self.destino, k)
+
+    def _top(self, celdas: np.ndarray, zona_de: np.ndarray, k: int) -> List[Tuple[str, int, float]]:
+        viajes = self.viajes[celdas]
+        if k < len(celdas):
+            # Ordenación parcial: solo se busca el k-ésimo mayor; los empates
+            # con él siguen como candidatos para desempatar por aparición
+            umbral = np.partition(viajes, len(viajes) - k)[len(viajes) - k]
+            celdas = celdas[viajes >= umbral]
+        orden = np.lexsort((self.primera[celdas], -self.viajes[celdas]))[:k]
+        celdas = celdas[orden]
+        return [
+            (self.zonas[z], n, ingresos)
+            for z, n, ingresos in zip(
+                zona_de[celdas].tolist(),
+                self.viajes[celdas].tolist(),
+                self.ingresos[celdas].tolist(),
+            )
+        ]
+
+    def origenes_por_destino(self) -> Dict[int, Dict[str, int]]:
+        """
+        Código de destino -> {zona de origen: viajes}, con los orígenes de cada
+        destino en orden de primera aparición.
+        """
+        orden = np.lexsort((self.primera, self.destino))
+        resultado: Dict[int, Dict[str, int]] = {}
+        for d, o, n in zip(
+            self.destino[orden].tolist(), self.origen[orden].tolist(), self.viajes[orden].tolist()
+        ):
+            resultado.setdefault(d, {})[self.zonas[o]] = n
+        return resultado
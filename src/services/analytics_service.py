@@ -1,66 +1,182 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import pandas as pd
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from src.config import Configuracion
+from src.instrumentacion import Instrumentacion
+from src.models.almacen_mapeado import AlmacenMapeado
+from src.models.data_model import VistaViajes, COLUMNA_DURACION, COLUMNA_VELOCIDAD
+from src.models.cubo_temporal import CuboTemporal
+from src.models.matriz_od import MatrizOD
+from src.services.cuantiles import SketchCuantiles
 
+# Columnas del CSV que componen el desglose de costes
+# Nota: 'Tarfia_base' es un typo conocido en el CSV original
+CONCEPTOS_COSTE = {
+    "Tarifa Base": "Tarfia_base",
+    "Impuestos": "Tax",
+    "Propinas": "Propina",
+    "Peajes": "Coste_Peaje",
+    "Recargos": "Recargo_adicional",
+    "Extras/Otros": "Extra",
+}
 
-class ServicioAnalisis:
-    """
-    Servicio encargado de procesar los datos crudos de viajes y generar
-    estructuras de datos listas para ser consumidas por la vista.
+# Métricas con percentiles (resumen combinable) -> columna del almacén.
+# La duración solo cuenta viajes de duración positiva, como en las medias.
+METRICAS_PERCENTILES = {
+    "importe": "Importe_total",
+    "distancia": "Distancia_KM",
+    "duracion": COLUMNA_DURACION,
+    "velocidad": COLUMNA_VELOCIDAD,
+}
+PERCENTILES = (50, 90, 99)
+
+
+class EstadoAgregado:
     """
+    Acumuladores combinables del análisis de un conjunto de viajes.
 
-    @staticmethod
-    def procesar_datos_destino(
-        viajes: List[Dict[str, Any]],
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Procesa una lista de diccionarios de viajes y devuelve un objeto consolidado
-        con métricas, KPIs y datos para gráficos.
+    Guarda sumas y conteos en bruto (no ratios), de modo que los estados de
+    trozos distintos (bloques, archivos, procesos o filas anexadas) se combinan
+    con 'merge' y dan el mismo resultado que procesar todos los viajes juntos.
+    'finalize' produce el diccionario de 'ServicioAnalisis.procesar_datos_destino'.
+    """
 
-        Args:
-            viajes: Lista de diccionarios representando filas del CSV.
+    def __init__(self):
+        self.viajes = 0
+        self.summ_dist = 0.0
+        self.summ_pax = 0
+        self.summ_coste = 0.0
+        self.summ_minutos = 0.0
+        self.summ_horas = 0.0
+        self.costes: Dict[str, float] = {concepto: 0.0 for concepto in CONCEPTOS_COSTE}
+        self.pagos: Dict[int, int] = {}
+        # Viajes por zona de origen en orden de primera aparición (desempate del top)
+        self.origenes: Dict[str, int] = {}
+        self.ultimo_registro: Optional[Dict[str, Any]] = None
+        # Distribución de cada métrica para p50/p90/p99 (memoria acotada)
+        self.cuantiles: Dict[str, SketchCuantiles] = {
+            metrica: SketchCuantiles() for metrica in METRICAS_PERCENTILES
+        }
 
-        Returns:
-            Un diccionario con las claves: 'totales', 'kpis', 'desglose', 'pago',
-            'grafico', 'ultimo_registro'. Retorna None si la lista está vacía.
+    def update(self, viajes: Sequence[Dict[str, Any]]) -> "EstadoAgregado":
+        """
+        Acumula un lote de viajes (lista de diccionarios o VistaViajes).
+        Los lotes deben llegar en el orden de los datos. Devuelve el propio estado.
         """
         if not viajes:
+            return self
+        if isinstance(viajes, VistaViajes):
+            self._update_columnar(viajes)
+        else:
+            self._update_filas(viajes)
+        self.ultimo_registro = viajes[-1]
+        return self
+
+    def merge(self, otro: "EstadoAgregado") -> "EstadoAgregado":
+        """
+        Añade los acumuladores de otro estado, que se considera posterior a este
+        (su último registro pasa a ser el último). Devuelve el propio estado.
+        """
+        self.viajes += otro.viajes
+        self.summ_dist += otro.summ_dist
+        self.summ_pax += otro.summ_pax
+        self.summ_coste += otro.summ_coste
+        self.summ_minutos += otro.summ_minutos
+        self.summ_horas += otro.summ_horas
+        for concepto, valor in otro.costes.items():
+            self.costes[concepto] = self.costes.get(concepto, 0.0) + valor
+        for forma, n in otro.pagos.items():
+            self.pagos[forma] = self.pagos.get(forma, 0) + n
+        for zona, n in otro.origenes.items():
+            self.origenes[zona] = self.origenes.get(zona, 0) + n
+        for metrica, resumen in otro.cuantiles.items():
+            self.cuantiles.setdefault(metrica, SketchCuantiles()).merge(resumen)
+        if otro.ultimo_registro is not None:
+            self.ultimo_registro = otro.ultimo_registro
+        return self
+
+    @Instrumentacion.medir("analisis.finalizar", "analisis")
+    def finalize(self) -> Optional[Dict[str, Any]]:
+        """Calcula promedios, KPIs y top de orígenes. None si no hay viajes."""
+        if not self.viajes:
             return None
 
-        # --- 1. Inicialización de Acumuladores ---
-        total_viajes = len(viajes)
-        summ_dist = 0.0
-        summ_pax = 0
-        summ_coste_total_real = 0.0
-        summ_duracion_horas = 0.0
-        summ_duracion_minutos = 0.0
-
-        # Acumuladores para desglose de costes
-        acc_costes = {
-            "Tarifa Base": 0.0,
-            "Impuestos": 0.0,
-            "Propinas": 0.0,
-            "Peajes": 0.0,
-            "Recargos": 0.0,
-            "Extras/Otros": 0.0,
-        }
+        # sorted es estable: los empates quedan por orden de primera aparición
+        top_origenes = sorted(self.origenes.items(), key=lambda par: -par[1])[:5]
+
+        return ServicioAnalisis._componer_resultado(
+            total_viajes=self.viajes,
+            summ_dist=self.summ_dist,
+            summ_pax=self.summ_pax,
+            summ_coste_total_real=self.summ_coste,
+            summ_duracion_horas=self.summ_horas,
+            summ_duracion_minutos=self.summ_minutos,
+            acc_costes=dict(self.costes),
+            acc_pago=dict(self.pagos),
+            top_origenes=top_origenes,
+            ultimo_registro=self.ultimo_registro,
+            percentiles={
+                metrica: dict(
+                    zip(
+                        (f"p{p}" for p in PERCENTILES),
+                        resumen.cuantiles(tuple(p / 100 for p in PERCENTILES)),
+                    )
+                )
+                for metrica, resumen in self.cuantiles.items()
+            },
+        )
+
+    def _update_columnar(self, viajes: VistaViajes) -> None:
+        """Acumulación vectorizada sobre columnas tipadas (se ignoran los NaN)."""
+        self.viajes += len(viajes)
+        self.summ_dist += float(np.nansum(viajes.columna("Distancia_KM")))
+        self.summ_pax += int(viajes.columna("N_pasajeros").sum())
+        self.summ_coste += float(np.nansum(viajes.columna("Importe_total")))
+
+        # Duración precalculada en la carga (NaN si falta alguna fecha)
+        minutos = viajes.columna(COLUMNA_DURACION)
+        minutos = minutos[minutos > 0]
+        self.summ_minutos += float(minutos.sum())
+        self.summ_horas += float((minutos / 60).sum())
+
+        for concepto, columna in CONCEPTOS_COSTE.items():
+            self.costes[concepto] += float(np.nansum(viajes.columna(columna)))
+
+        formas, conteos = np.unique(viajes.columna("Forma_de_pago"), return_counts=True)
+        for forma, n in zip(formas.tolist(), conteos.tolist()):
+            self.pagos[forma] = self.pagos.get(forma, 0) + n
 
-        # Acumulador para formas de pago
-        # Claves esperadas: 1 (Bizum), 2 (Efectivo), 3/4 (Otros/Desc)
-        acc_pago = {}
+        zonas = viajes.zonas
+        unicos, primera, conteos = np.unique(
+            viajes.codigos_zona("Zona_origen"), return_index=True, return_counts=True
+        )
+        orden = np.argsort(primera)
+        for codigo, n in zip(unicos[orden].tolist(), conteos[orden].tolist()):
+            zona = zonas[codigo]
+            self.origenes[zona] = self.origenes.get(zona, 0) + n
+
+        for metrica, columna in METRICAS_PERCENTILES.items():
+            valores = viajes.columna(columna)
+            if columna == COLUMNA_DURACION:
+                valores = valores[valores > 0]
+            self.cuantiles[metrica].update(valores)
+
+    def _update_filas(self, viajes: Sequence[Dict[str, Any]]) -> None:
+        """Acumulación fila a fila sobre diccionarios con valores de texto."""
+        self.viajes += len(viajes)
+        fmt = "%d/%m/%Y %H:%M"  # Formato esperado: dd/mm/YYYY HH:MM
+        muestras: Dict[str, List[float]] = {metrica: [] for metrica in METRICAS_PERCENTILES}
 
-        # --- 2. Iteración Única sobre Datos ---
         for v in viajes:
             try:
                 # -- Métricas Generales --
-                summ_coste_total_real += float(v.get("Importe_total", 0))
-                dist = float(v.get("Distancia_KM", 0))
-                summ_dist += dist
-                summ_pax += int(v.get("N_pasajeros", 0))
+                self.summ_coste += float(v.get("Importe_total", 0))
+                self.summ_dist += float(v.get("Distancia_KM", 0))
+                self.summ_pax += int(v.get("N_pasajeros", 0))
 
                 # -- Cálculo de Duración --
-                # Formato esperado: dd/mm/YYYY HH:MM
-                fmt = "%d/%m/%Y %H:%M"
                 start_str = v.get("Hora_inicio")
                 end_str = v.get("Hora_fin")
 
@@ -68,22 +184,23 @@ class ServicioAnalisis:
                     try:
                         t1 = datetime.strptime(start_str, fmt)
                         t2 = datetime.strptime(end_str, fmt)
-                        delta = t2 - t1
-                        minutes = delta.total_seconds() / 60
+                        minutes = (t2 - t1).total_seconds() / 60
                         if minutes > 0:
-                            summ_duracion_minutos += minutes
-                            summ_duracion_horas += minutes / 60
+                            self.summ_minutos += minutes
+                            self.summ_horas += minutes / 60
+                            muestras["duracion"].append(minutes)
+                            muestras["velocidad"].append(
+                                float(v.get("Distancia_KM", 0)) / (minutes / 60)
+                            )
                     except ValueError:
                         pass
 
+                muestras["importe"].append(float(v.get("Importe_total", 0)))
+                muestras["distancia"].append(float(v.get("Distancia_KM", 0)))
+
                 # -- Desglose de Costes --
-                # Nota: 'Tarfia_base' es un typo conocido en el CSV original
-                acc_costes["Tarifa Base"] += float(v.get("Tarfia_base", 0))
-                acc_costes["Impuestos"] += float(v.get("Tax", 0))
-                acc_costes["Propinas"] += float(v.get("Propina", 0))
-                acc_costes["Peajes"] += float(v.get("Coste_Peaje", 0))
-                acc_costes["Recargos"] += float(v.get("Recargo_adicional", 0))
-                acc_costes["Extras/Otros"] += float(v.get("Extra", 0))
+                for concepto, columna in CONCEPTOS_COSTE.items():
+                    self.costes[concepto] += float(v.get(columna, 0))
 
                 # -- Forma de Pago --
                 try:
@@ -91,13 +208,290 @@ class ServicioAnalisis:
                 except (ValueError, TypeError):
                     fp = 0
 
-                acc_pago[fp] = acc_pago.get(fp, 0) + 1
+                self.pagos[fp] = self.pagos.get(fp, 0) + 1
 
             except (ValueError, TypeError):
                 # Ignorar filas con datos corruptos numéricos críticos
                 pass
 
-        # --- 3. Cálculo de Promedios y KPIs ---
+            origen = v.get("Zona_origen")
+            if origen is not None:
+                self.origenes[origen] = self.origenes.get(origen, 0) + 1
+
+        for metrica, valores in muestras.items():
+            self.cuantiles[metrica].update(np.asarray(valores, dtype=np.float64))
+
+
+def _agregar_rango_mapeado(directorio: str, inicio: int, fin: int) -> Dict[str, EstadoAgregado]:
+    """
+    Estados por destino de las filas [inicio, fin) de un almacén mapeado. Se
+    ejecuta en un proceso trabajador, que reabre las columnas en disco.
+    """
+    cabeceras, zonas, columnas, _ = AlmacenMapeado.mapear(directorio)
+    vista = VistaViajes(columnas, zonas, cabeceras, slice(inicio, fin))
+    return ServicioAnalisis.agregar_por_destino(vista)
+
+
+class ServicioAnalisis:
+    """
+    Servicio encargado de procesar los datos crudos de viajes y generar
+    estructuras de datos listas para ser consumidas por la vista.
+    """
+
+    @staticmethod
+    @Instrumentacion.medir("analisis.procesar_destino", "analisis")
+    def procesar_datos_destino(
+        viajes: Sequence[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Procesa una lista de diccionarios de viajes y devuelve un objeto consolidado
+        con métricas, KPIs y datos para gráficos.
+
+        Args:
+            viajes: Lista de diccionarios representando filas del CSV, o una
+                VistaViajes del modelo columnar (ruta vectorizada).
+
+        Returns:
+            Un diccionario con las claves: 'totales', 'kpis', 'desglose', 'pago',
+            'grafico', 'ultimo_registro'. Retorna None si la lista está vacía.
+        """
+        return ServicioAnalisis.agregar(viajes).finalize()
+
+    @staticmethod
+    @Instrumentacion.medir("analisis.agregar", "analisis")
+    def agregar(viajes: Sequence[Dict[str, Any]]) -> EstadoAgregado:
+        """Estado de agregados (combinable) de un conjunto de viajes."""
+        return EstadoAgregado().update(viajes)
+
+    @staticmethod
+    def procesar_todos_destinos(
+        viajes: Sequence[Dict[str, Any]],
+        trabajadores: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """
+        Calcula el análisis de todos los destinos de una sola pasada.
+
+        El resultado de cada destino coincide con el de 'procesar_datos_destino'
+        para sus viajes (ver 'agregar_por_destino').
+
+        Args:
+            viajes: Todos los viajes (normalmente 'ModeloDatos.obtener_todos()').
+            trabajadores: Procesos a usar. Con más de uno, sobre un almacén
+                mapeado y con suficientes filas (ver Configuracion.MIN_FILAS_PARALELO)
+                los viajes se reparten por tramos entre un ProcessPoolExecutor y
+                sus estados se combinan. En otro caso se agrega en serie.
+
+        Returns:
+            Lista de diccionarios de análisis ordenada alfabéticamente por destino,
+            cada uno con la clave extra 'destino_nombre'. Los viajes sin destino
+            se ignoran.
+        """
+        estados = ServicioAnalisis.agregar_por_destino(viajes, trabajadores)
+        return list(ServicioAnalisis.finalizar_por_destino(estados))
+
+    @staticmethod
+    def finalizar_por_destino(
+        estados: Dict[str, EstadoAgregado],
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Genera el análisis de cada destino a medida que se finaliza, en orden
+        alfabético y con la clave extra 'destino_nombre'.
+
+        Pensado para las exportaciones en flujo: cada resultado puede
+        escribirse y descartarse antes de calcular el siguiente, así que solo
+        los estados (pequeños) están en memoria a la vez.
+        """
+        for destino in sorted(d for d in estados if d):
+            datos = estados[destino].finalize()
+            if datos:
+                datos["destino_nombre"] = destino
+                yield datos
+
+    @staticmethod
+    @Instrumentacion.medir("analisis.por_destino", "analisis")
+    def agregar_por_destino(
+        viajes: Sequence[Dict[str, Any]],
+        trabajadores: int = 1,
+        matriz: Optional[MatrizOD] = None,
+    ) -> Dict[str, EstadoAgregado]:
+        """
+        Estados de agregados de cada destino, de una sola pasada.
+
+        Sobre una VistaViajes agrupa por código de destino con operaciones
+        vectorizadas (np.bincount) en lugar de recorrer los viajes una vez por
+        destino.
+
+        Args:
+            matriz: Matriz OD ya construida de exactamente estos viajes (p. ej.
+                'ModeloDatos.obtener_matriz_od()' con 'obtener_todos()'); los
+                orígenes de cada destino se leen de ella en lugar de contarlos.
+
+        Returns:
+            Diccionario destino -> EstadoAgregado (incluye el destino vacío si
+            hay viajes sin destino).
+        """
+        if not viajes:
+            return {}
+
+        if not isinstance(viajes, VistaViajes):
+            # Ruta genérica: agrupar en Python y acumular cada grupo
+            grupos: Dict[str, List[Dict[str, Any]]] = {}
+            for v in viajes:
+                if v.get("Zona_destino"):
+                    grupos.setdefault(v["Zona_destino"], []).append(v)
+            return {d: ServicioAnalisis.agregar(g) for d, g in grupos.items()}
+
+        # Solo un almacén mapeado se reparte: los trabajadores reabren sus columnas
+        # en disco, mientras que enviarles un almacén en memoria cuesta más que agregarlo
+        tramo = viajes.tramo_mapeado() if trabajadores > 1 else None
+        if tramo is not None and len(viajes) >= Configuracion.MIN_FILAS_PARALELO:
+            return ServicioAnalisis._agregar_en_paralelo(tramo, trabajadores)
+
+        zonas = viajes.zonas
+        n_zonas = len(zonas)
+        destinos = viajes.codigos_zona("Zona_destino")
+
+        def sumar(valores: np.ndarray) -> np.ndarray:
+            # Suma por destino ignorando NaN (mismo criterio que np.nansum)
+            pesos = np.where(np.isnan(valores), 0.0, valores)
+            return np.bincount(destinos, weights=pesos, minlength=n_zonas)
+
+        conteos = np.bincount(destinos, minlength=n_zonas)
+        summ_dist = sumar(viajes.columna("Distancia_KM"))
+        summ_coste = sumar(viajes.columna("Importe_total"))
+        summ_pax = np.bincount(
+            destinos, weights=viajes.columna("N_pasajeros"), minlength=n_zonas
+        )
+
+        minutos = viajes.columna(COLUMNA_DURACION)
+        minutos = np.where(minutos > 0, minutos, 0.0)
+        summ_minutos = sumar(minutos)
+        summ_horas = sumar(minutos / 60)
+
+        costes = {
+            concepto: sumar(viajes.columna(columna))
+            for concepto, columna in CONCEPTOS_COSTE.items()
+        }
+
+        formas_pago = viajes.columna("Forma_de_pago")
+        pagos = {
+            int(forma): np.bincount(destinos[formas_pago == forma], minlength=n_zonas)
+            for forma in np.unique(formas_pago)
+        }
+
+        # Orígenes de cada destino en orden de primera aparición
+        if matriz is None:
+            matriz = MatrizOD.construir(
+                zonas, viajes.codigos_zona("Zona_origen"), destinos, viajes.columna("Importe_total")
+            )
+        origenes = matriz.origenes_por_destino()
+
+        percentiles = {}
+        for metrica, columna in METRICAS_PERCENTILES.items():
+            valores = viajes.columna(columna)
+            if columna == COLUMNA_DURACION:
+                valores = np.where(valores > 0, valores, np.nan)
+            percentiles[metrica] = SketchCuantiles.por_grupo(destinos, valores, n_zonas)
+
+        # Última aparición de cada destino (para 'ultimo_registro')
+        invertidos = destinos[::-1]
+        presentes, desde_final = np.unique(invertidos, return_index=True)
+        ultima_posicion = dict(zip(presentes.tolist(), (len(destinos) - 1 - desde_final).tolist()))
+
+        estados = {}
+        for c in presentes.tolist():
+            estado = EstadoAgregado()
+            estado.viajes = int(conteos[c])
+            estado.summ_dist = float(summ_dist[c])
+            estado.summ_pax = int(summ_pax[c])
+            estado.summ_coste = float(summ_coste[c])
+            estado.summ_minutos = float(summ_minutos[c])
+            estado.summ_horas = float(summ_horas[c])
+            estado.costes = {k: float(v[c]) for k, v in costes.items()}
+            estado.pagos = {k: int(v[c]) for k, v in pagos.items() if v[c]}
+            estado.origenes = origenes.get(c, {})
+            estado.cuantiles = {
+                metrica: resumenes[c] or SketchCuantiles()
+                for metrica, resumenes in percentiles.items()
+            }
+            estado.ultimo_registro = viajes[ultima_posicion[c]]
+            estados[zonas[c]] = estado
+        return estados
+
+    @staticmethod
+    def _agregar_en_paralelo(
+        tramo: Tuple[str, int, int], trabajadores: int
+    ) -> Dict[str, EstadoAgregado]:
+        """
+        Reparte las filas [inicio, fin) de un almacén mapeado (ver
+        'VistaViajes.tramo_mapeado') en rangos contiguos de igual tamaño, agrega
+        cada rango en un proceso y combina los estados en orden, así que el
+        resultado coincide con el de la ruta en serie. A cada proceso solo se
+        le envía el directorio y su rango: las columnas las lee del disco.
+        """
+        directorio, inicio, fin = tramo
+        tamano = -(-(fin - inicio) // trabajadores)
+        rangos = [(a, min(a + tamano, fin)) for a in range(inicio, fin, tamano)]
+
+        estados: Dict[str, EstadoAgregado] = {}
+        contexto = multiprocessing.get_context(Configuracion.INICIO_PROCESOS)
+        with ProcessPoolExecutor(max_workers=len(rangos), mp_context=contexto) as ejecutor:
+            futuros = [
+                ejecutor.submit(_agregar_rango_mapeado, directorio, a, b) for a, b in rangos
+            ]
+            for futuro in futuros:
+                for destino, estado in futuro.result().items():
+                    if destino in estados:
+                        estados[destino].merge(estado)
+                    else:
+                        estados[destino] = estado
+        return estados
+
+    @staticmethod
+    def flujos_od(matriz: MatrizOD, zona: str, k: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Principales flujos de una zona según la matriz origen-destino: los k
+        orígenes de los viajes que llegan a ella ('llegadas') y los k destinos
+        de los que salen ('salidas'), con sus viajes e ingresos.
+        """
+        def filas(top):
+            return [{"zona": z, "viajes": n, "ingresos": i} for z, n, i in top]
+
+        return {
+            "llegadas": filas(matriz.top_origenes(zona, k)),
+            "salidas": filas(matriz.top_destinos(zona, k)),
+        }
+
+    @staticmethod
+    def perfil_temporal(cubo: CuboTemporal, destino: str) -> Dict[str, np.ndarray]:
+        """
+        Matrices día de la semana × hora (7 × 24) de un destino, leídas del
+        cubo temporal: viajes, ingresos, importe medio y duración media por
+        viaje (NaN en las celdas sin viajes).
+        """
+        return {
+            "viajes": cubo.rebanada("viajes", destino),
+            "ingresos": cubo.rebanada("ingresos", destino),
+            "importe_medio": cubo.media("ingresos", destino),
+            "duracion_media": cubo.media("duracion", destino),
+        }
+
+    @staticmethod
+    def _componer_resultado(
+        total_viajes: int,
+        summ_dist: float,
+        summ_pax: int,
+        summ_coste_total_real: float,
+        summ_duracion_horas: float,
+        summ_duracion_minutos: float,
+        acc_costes: Dict[str, float],
+        acc_pago: Dict[int, int],
+        top_origenes,
+        ultimo_registro: Dict[str, Any],
+        percentiles: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+    ) -> Dict[str, Any]:
+        """Calcula promedios y KPIs a partir de los acumuladores y arma el resultado."""
+        # --- 1. Cálculo de Promedios y KPIs ---
         avg_dist = summ_dist / total_viajes
         avg_pax = summ_pax / total_viajes
 
@@ -112,7 +506,7 @@ class ServicioAnalisis:
             else 0
         )
 
-        # --- 4. Análisis de Pagos ---
+        # --- 2. Análisis de Pagos ---
         bizum_count = acc_pago.get(1, 0)
         efectivo_count = acc_pago.get(2, 0)
         otros_count = acc_pago.get(3, 0) + acc_pago.get(4, 0)
@@ -139,7 +533,7 @@ class ServicioAnalisis:
             "top_nombre": top_name,
         }
 
-        # --- 5. Preparar Datos para Tabla de Desglose ---
+        # --- 3. Preparar Datos para Tabla de Desglose ---
         tabla_desglose = []
         total_desglose = sum(acc_costes.values())
         divisor_pct = total_desglose if total_desglose > 0 else 1
@@ -153,13 +547,6 @@ class ServicioAnalisis:
 
         promedio_total_desglosado = total_desglose / total_viajes
 
-        # --- 6. Datos para Gráficos (Pandas) ---
-        # Usamos Pandas solo para facilitar el conteo y ordenamiento de categorías
-        df = pd.DataFrame(viajes)
-        top_origenes = None
-        if "Zona_origen" in df.columns and not df.empty:
-            top_origenes = df["Zona_origen"].value_counts().head(5)
-
         # --- Retorno Estructurado ---
         return {
             "totales": {
@@ -179,6 +566,9 @@ class ServicioAnalisis:
                 "total_promedio": promedio_total_desglosado,
             },
             "pago": pago_info,
+            # p50/p90/p99 por métrica (None si no hay valores)
+            "percentiles": percentiles or {},
+            # Top 5 de zonas de origen como pares (zona, viajes)
             "grafico": {"top_origenes": top_origenes},
-            "ultimo_registro": viajes[-1] if viajes else {},
+            "ultimo_registro": ultimo_registro or {},
         }
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class CacheAnalisis:
+    """
+    Caché LRU acotada de resultados de análisis por destino.
+
+    Las entradas se identifican por (destino, versión del dataset), de modo que
+    un resultado calculado sobre datos anteriores nunca se devuelve tras una recarga.
+    Cada entrada puede llevar además los agregados en bruto de los que sale el
+    análisis (EstadoAgregado), que se expulsan con ella.
+    """
+
+    def __init__(self, tamano_maximo: int):
+        self.tamano_maximo = max(1, tamano_maximo)
+        # (destino, versión) -> (análisis, agregados en bruto o None)
+        self._entradas: "OrderedDict[Tuple[str, Hashable], Tuple[Dict[str, Any], Any]]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, destino: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        """Devuelve el análisis cacheado o None. Cuenta aciertos y fallos."""
+        clave = (destino, version)
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[0]
+
+    def consultar(self, destino: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        """Como 'obtener' pero sin alterar el orden LRU ni los contadores."""
+        entrada = self._entradas.get((destino, version))
+        return entrada[0] if entrada is not None else None
+
+    def consultar_estado(self, destino: str, version: Hashable) -> Optional[Any]:
+        """Agregados en bruto guardados con el análisis (sin alterar el orden LRU)."""
+        entrada = self._entradas.get((destino, version))
+        return entrada[1] if entrada is not None else None
+
+    def destinos(self) -> List[str]:
+        """Destinos con alguna entrada en la caché (de cualquier versión)."""
+        return list(dict.fromkeys(destino for destino, _ in self._entradas))
+
+    def guardar(
+        self, destino: str, version: Hashable, datos: Dict[str, Any], estado: Any = None
+    ) -> None:
+        """
+        Guarda un análisis (y opcionalmente sus agregados en bruto), expulsando
+        el menos usado si se supera el tamaño. Las versiones anteriores del
+        destino se descartan: las versiones solo avanzan y no se volverán a pedir.
+        """
+        clave = (destino, version)
+        for anterior in [c for c in self._entradas if c[0] == destino and c != clave]:
+            del self._entradas[anterior]
+        self._entradas[clave] = (datos, estado)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.tamano_maximo:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self) -> None:
+        """Vacía la caché (p. ej. tras recargar los datos)."""
+        self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores de uso de la caché."""
+        return {
+            "entradas": len(self._entradas),
+            "tamano_maximo": self.tamano_maximo,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
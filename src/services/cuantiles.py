@@ -0,0 +1,190 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+PRECISION_RELATIVA = 0.01  # Error relativo máximo de cada cuantil (1 %)
+MAX_CUBETAS = 2048         # Cubetas por signo; al superarlas se funden las menores
+MINIMO_ABSOLUTO = 1e-9     # Valores con |x| menor cuentan como cero
+
+_GAMMA = (1 + PRECISION_RELATIVA) / (1 - PRECISION_RELATIVA)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _indices(magnitudes: np.ndarray) -> np.ndarray:
+    """Cubeta de cada magnitud positiva: ceil(log_gamma(x))."""
+    return np.ceil(np.log(magnitudes) / _LOG_GAMMA).astype(np.int64)
+
+
+class _Cubetas:
+    """Conteos de cubetas contiguas a partir del índice 'inicio'."""
+
+    __slots__ = ("inicio", "conteos")
+
+    def __init__(self, inicio: int = 0, conteos: Optional[np.ndarray] = None):
+        self.inicio = inicio
+        self.conteos = conteos if conteos is not None else np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.conteos)
+
+    def sumar(self, inicio: int, conteos: np.ndarray) -> None:
+        if not len(conteos):
+            return
+        if not len(self.conteos):
+            self.inicio, self.conteos = inicio, conteos.astype(np.int64, copy=True)
+        else:
+            nuevo_inicio = min(self.inicio, inicio)
+            fin = max(self.inicio + len(self.conteos), inicio + len(conteos))
+            total = np.zeros(fin - nuevo_inicio, dtype=np.int64)
+            total[self.inicio - nuevo_inicio:self.inicio - nuevo_inicio + len(self.conteos)] += self.conteos
+            total[inicio - nuevo_inicio:inicio - nuevo_inicio + len(conteos)] += conteos
+            self.inicio, self.conteos = nuevo_inicio, total
+        self._acotar()
+
+    def _acotar(self) -> None:
+        """Funde las cubetas de menor magnitud para no pasar de MAX_CUBETAS."""
+        sobran = len(self.conteos) - MAX_CUBETAS
+        if sobran > 0:
+            self.conteos[sobran] += self.conteos[:sobran].sum()
+            self.conteos = self.conteos[sobran:].copy()
+            self.inicio += sobran
+
+
+class SketchCuantiles:
+    """
+    Resumen combinable de una distribución para estimar cuantiles (p50, p90,
+    p99...) con memoria acotada, al estilo de DDSketch.
+
+    Cada valor cuenta en una cubeta logarítmica, ceil(log_gamma(|x|)), con
+    gamma = (1 + a) / (1 - a) y a = PRECISION_RELATIVA, así que el cuantil
+    devuelto difiere del real como mucho un 1 % (relativo). Actualizar es un
+    np.bincount, sin ordenar las filas, y combinar dos resúmenes es sumar sus
+    conteos: el resultado no depende de cómo se repartan los datos en bloques,
+    archivos o procesos. Los negativos y los ceros se cuentan aparte; los NaN
+    se ignoran.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.ceros = 0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._positivos = _Cubetas()
+        self._negativos = _Cubetas()  # Por magnitud
+
+    def __len__(self) -> int:
+        return self.n
+
+    def update(self, valores: np.ndarray) -> "SketchCuantiles":
+        """Añade un lote de valores. Devuelve el propio resumen."""
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return self
+        self.n += len(valores)
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self.ceros += int(np.count_nonzero(np.abs(valores) < MINIMO_ABSOLUTO))
+        for cubetas, magnitudes in (
+            (self._positivos, valores[valores >= MINIMO_ABSOLUTO]),
+            (self._negativos, -valores[valores <= -MINIMO_ABSOLUTO]),
+        ):
+            if len(magnitudes):
+                indices = _indices(magnitudes)
+                inicio = int(indices.min())
+                cubetas.sumar(inicio, np.bincount(indices - inicio))
+        return self
+
+    def merge(self, otro: "SketchCuantiles") -> "SketchCuantiles":
+        """Añade los conteos de otro resumen. Devuelve el propio resumen."""
+        self.n += otro.n
+        self.ceros += otro.ceros
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._positivos.sumar(otro._positivos.inicio, otro._positivos.conteos)
+        self._negativos.sumar(otro._negativos.inicio, otro._negativos.conteos)
+        return self
+
+    def cuantil(self, q: float) -> Optional[float]:
+        """Valor aproximado del cuantil q (0-1). None si el resumen está vacío."""
+        return self.cuantiles((q,))[0]
+
+    def cuantiles(self, qs: Tuple[float, ...]) -> List[Optional[float]]:
+        """Varios cuantiles con un solo recorrido acumulado de las cubetas."""
+        if not self.n:
+            return [None] * len(qs)
+        negativos, positivos = self._negativos, self._positivos
+        # Orden ascendente: negativos de mayor a menor magnitud, ceros, positivos
+        conteos = np.concatenate(
+            (negativos.conteos[::-1], [self.ceros], positivos.conteos)
+        )
+        valores = np.concatenate(
+            (
+                -self._valor(negativos.inicio + np.arange(len(negativos))[::-1]),
+                [0.0],
+                self._valor(positivos.inicio + np.arange(len(positivos))),
+            )
+        )
+        acumulado = np.cumsum(conteos)
+        rangos = np.asarray(qs, dtype=np.float64) * (self.n - 1)
+        i = np.minimum(np.searchsorted(acumulado, rangos, side="right"), len(acumulado) - 1)
+        return np.clip(valores[i], self.minimo, self.maximo).tolist()
+
+    @staticmethod
+    def _valor(indices: np.ndarray) -> np.ndarray:
+        # Punto de la cubeta (gamma^(i-1), gamma^i] con error relativo <= a
+        return 2 * _GAMMA ** indices.astype(np.float64) / (_GAMMA + 1)
+
+    @staticmethod
+    def por_grupo(
+        grupos: np.ndarray, valores: np.ndarray, n_grupos: int
+    ) -> List[Optional["SketchCuantiles"]]:
+        """
+        Un resumen por grupo (p. ej. código de destino) de una sola pasada:
+        las parejas (grupo, cubeta) se cuentan con un único np.bincount.
+
+        Returns:
+            Lista indexada por grupo; None en los grupos sin valores.
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        validos = ~np.isnan(valores)
+        grupos, valores = grupos[validos], valores[validos]
+        resumenes: List[Optional[SketchCuantiles]] = [None] * n_grupos
+        if not len(valores):
+            return resumenes
+
+        conteos = np.bincount(grupos, minlength=n_grupos)
+        minimos = np.full(n_grupos, np.inf)
+        maximos = np.full(n_grupos, -np.inf)
+        np.minimum.at(minimos, grupos, valores)
+        np.maximum.at(maximos, grupos, valores)
+        ceros = np.bincount(
+            grupos, weights=np.abs(valores) < MINIMO_ABSOLUTO, minlength=n_grupos
+        )
+        for g in np.flatnonzero(conteos).tolist():
+            resumen = SketchCuantiles()
+            resumen.n = int(conteos[g])
+            resumen.ceros = int(ceros[g])
+            resumen.minimo, resumen.maximo = float(minimos[g]), float(maximos[g])
+            resumenes[g] = resumen
+
+        for atributo, seleccion, signo in (
+            ("_positivos", valores >= MINIMO_ABSOLUTO, 1.0),
+            ("_negativos", valores <= -MINIMO_ABSOLUTO, -1.0),
+        ):
+            if not seleccion.any():
+                continue
+            indices = _indices(signo * valores[seleccion])
+            inicio = int(indices.min())
+            ancho = int(indices.max()) - inicio + 1
+            tabla = np.bincount(
+                grupos[seleccion].astype(np.int64) * ancho + (indices - inicio),
+                minlength=n_grupos * ancho,
+            ).reshape(n_grupos, ancho)
+            for g in np.flatnonzero(tabla.any(axis=1)).tolist():
+                fila = tabla[g]
+                ocupadas = np.flatnonzero(fila)
+                desde, hasta = int(ocupadas[0]), int(ocupadas[-1]) + 1
+                getattr(resumenes[g], atributo).sumar(inicio + desde, fila[desde:hasta])
+        return resumenes
@@ -1,6 +1,43 @@
 import json
 import csv
-from typing import Dict, Any
+import gzip
+import importlib.util
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, TextIO
+
+import numpy as np
+
+from src.models.data_model import (
+    COLUMNA_DURACION,
+    COLUMNA_VELOCIDAD,
+    COLUMNAS_FECHA,
+    COLUMNAS_ZONA,
+    SIN_FECHA,
+    VistaViajes,
+)
+
+from src.models.matriz_od import MatrizOD
+from src.services.analytics_service import METRICAS_PERCENTILES, PERCENTILES
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Nombre de cada métrica de percentiles en las cabeceras de CSV y Markdown
+ETIQUETAS_PERCENTILES = {
+    "importe": "Importe",
+    "distancia": "Distancia",
+    "duracion": "Duración",
+    "velocidad": "Velocidad",
+}
+UNIDADES_PERCENTILES = {"importe": "$", "distancia": "km", "duracion": "min", "velocidad": "km/h"}
+
+# Formatos columnares (requieren pyarrow, dependencia opcional)
+EXTENSIONES_ARROW = (".arrow", ".feather", ".ipc")
+COMPRESION_COLUMNAR = "zstd"
+DESTINOS_POR_LOTE = 1024     # Registros agregados por lote al escribir en flujo
+FILAS_POR_LOTE = 1_000_000   # Viajes por lote (y grupo de filas de Parquet)
+# Columnas derivadas que se incluyen en la exportación de viajes
+COLUMNAS_DERIVADAS_EXPORTADAS = (COLUMNA_DURACION, COLUMNA_VELOCIDAD)
 
 
 class ServicioExportacion:
@@ -20,6 +57,7 @@ class ServicioExportacion:
             "Coste/Min",
             "Pax Medio",
             "Top Pago",
+            *ServicioExportacion._cabeceras_percentiles(),
             "Concepto Desglose",
             "Importe Desglose",
         ]
@@ -39,6 +77,7 @@ class ServicioExportacion:
             "Coste/Min": kpis["coste_min"],
             "Pax Medio": kpis["pax_medio"],
             "Top Pago": pago["top_nombre"],
+            **ServicioExportacion._valores_percentiles(datos),
         }
 
         for item in datos["desglose"]["filas"]:
@@ -89,6 +128,8 @@ class ServicioExportacion:
 | Coste / Min | ${kpis["coste_min"]:.2f} |
 | Pax / Viaje | {kpis["pax_medio"]:.1f} |
 
+## Percentiles
+{ServicioExportacion._tabla_md_percentiles(datos)}
 ## Análisis de Pago
 - **Método Preferido**: {pago["top_nombre"]}
 - **Bizum**: {pago["bizum_pct"]:.1f}%
@@ -107,8 +148,13 @@ class ServicioExportacion:
             f.write(md)
 
     @staticmethod
-    def exportar_csv_global(lista_datos: list, ruta_archivo: str):
-        """Genera un CSV con una fila por destino (resumen global)."""
+    def exportar_csv_global(lista_datos: Iterable[Dict[str, Any]], ruta_archivo: str):
+        """
+        Genera un CSV con una fila por destino (resumen global).
+
+        'lista_datos' puede ser un generador (ver ServicioAnalisis.finalizar_por_destino):
+        cada fila se escribe en cuanto llega. Si la ruta acaba en '.gz' se comprime.
+        """
         encabezados = [
             "Destino",
             "Viajes",
@@ -120,58 +166,478 @@ class ServicioExportacion:
             "Pax Medio",
             "Top Pago",
             "Pago Top %",
+            *ServicioExportacion._cabeceras_percentiles(),
         ]
 
-        filas = []
-        for datos in lista_datos:
-            kpis = datos["kpis"]
-            totales = datos["totales"]
-            pago = datos["pago"]
+        with ServicioExportacion._abrir(ruta_archivo, newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=encabezados)
+            writer.writeheader()
+            for datos in lista_datos:
+                kpis = datos["kpis"]
+                totales = datos["totales"]
+                pago = datos["pago"]
+
+                top_key = (
+                    pago["top_nombre"].lower() if pago["top_nombre"] != "N/A" else "otros"
+                )
+                # Mapear nombre top a su porcentaje usando las keys estandarizadas
+                pct_key = (
+                    "bizum_pct"
+                    if "bizum" in top_key
+                    else ("efectivo_pct" if "efectivo" in top_key else "otros_pct")
+                )
+                pct_val = pago.get(pct_key, 0)
+
+                writer.writerow(
+                    {
+                        "Destino": datos.get("destino_nombre", "N/A"),
+                        "Viajes": totales["viajes"],
+                        "Coste Total": totales["coste"],
+                        "Distancia Media": kpis["distancia_media"],
+                        "Velocidad Media": kpis["velocidad_media"],
+                        "Coste/Km": kpis["coste_km"],
+                        "Coste/Min": kpis["coste_min"],
+                        "Pax Medio": kpis["pax_medio"],
+                        "Top Pago": pago["top_nombre"],
+                        "Pago Top %": pct_val,
+                        **ServicioExportacion._valores_percentiles(datos),
+                    }
+                )
+
+    @staticmethod
+    def exportar_json_global(lista_datos: Iterable[Dict[str, Any]], ruta_archivo: str):
+        """
+        Exporta los datos de todos los destinos como una lista JSON.
+
+        Escribe cada destino en cuanto llega, sin reunir la lista en memoria; el
+        documento resultante es el mismo que el de json.dump(..., indent=4).
+        Si la ruta acaba en '.gz' se comprime.
+        """
+        with ServicioExportacion._abrir(ruta_archivo) as f:
+            separador = "[\n"
+            for d in lista_datos:
+                texto = json.dumps(
+                    ServicioExportacion._serializable(d), indent=4, ensure_ascii=False
+                )
+                f.write(separador)
+                f.write("    " + texto.replace("\n", "\n    "))
+                separador = ",\n"
+            f.write("[]" if separador == "[\n" else "\n]")
+
+    @staticmethod
+    def exportar_ndjson_global(
+        lista_datos: Iterable[Dict[str, Any]],
+        ruta_archivo: str,
+        comprimir: Optional[bool] = None,
+    ):
+        """
+        Exporta los datos de todos los destinos como JSON delimitado por líneas
+        (NDJSON): un objeto compacto por destino y línea, escrito en cuanto llega.
+
+        Args:
+            lista_datos: Análisis por destino (lista o generador).
+            ruta_archivo: Ruta de salida.
+            comprimir: Escribir con gzip. Por defecto, si la ruta acaba en '.gz'.
+        """
+        with ServicioExportacion._abrir(ruta_archivo, comprimir) as f:
+            for d in lista_datos:
+                f.write(json.dumps(ServicioExportacion._serializable(d), ensure_ascii=False))
+                f.write("\n")
+
+    @staticmethod
+    def arrow_disponible() -> bool:
+        """True si pyarrow está instalado (exportación Parquet / Arrow IPC)."""
+        return importlib.util.find_spec("pyarrow") is not None
+
+    @staticmethod
+    def exportar_parquet_global(lista_datos: Iterable[Dict[str, Any]], ruta_archivo: str):
+        """
+        Exporta los agregados de todos los destinos a Parquet: una fila por
+        destino con columnas tipadas, comprimidas (zstd) y codificadas con
+        diccionario. Se escribe por lotes según llegan los destinos.
+        """
+        ServicioExportacion._exportar_global_columnar(lista_datos, ruta_archivo, "parquet")
+
+    @staticmethod
+    def exportar_arrow_global(lista_datos: Iterable[Dict[str, Any]], ruta_archivo: str):
+        """Como 'exportar_parquet_global' pero en formato Arrow IPC (archivo Feather v2)."""
+        ServicioExportacion._exportar_global_columnar(lista_datos, ruta_archivo, "arrow")
+
+    @staticmethod
+    def exportar_parquet_viajes(viajes: VistaViajes, ruta_archivo: str):
+        """
+        Exporta los viajes de una vista (p. ej. los de un destino) a Parquet.
+
+        Zonas como diccionario, fechas como timestamp y valores no válidos como
+        nulos, además de la duración y la velocidad calculadas en la carga.
+        """
+        ServicioExportacion._exportar_viajes_columnar(viajes, ruta_archivo, "parquet")
+
+    @staticmethod
+    def exportar_arrow_viajes(viajes: VistaViajes, ruta_archivo: str):
+        """Como 'exportar_parquet_viajes' pero en formato Arrow IPC (archivo Feather v2)."""
+        ServicioExportacion._exportar_viajes_columnar(viajes, ruta_archivo, "arrow")
+
+    @staticmethod
+    def exportar_csv_od(matriz: MatrizOD, ruta_archivo: str):
+        """
+        Exporta la matriz origen-destino completa como CSV: una fila por par de
+        zonas con viajes, ordenada por origen y destino. Si la ruta acaba en
+        '.gz' se comprime.
+        """
+        orden = ServicioExportacion._orden_od(matriz)
+        zonas = matriz.zonas
+        with ServicioExportacion._abrir(ruta_archivo, newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Origen", "Destino", "Viajes", "Ingresos"])
+            for inicio in range(0, len(orden), FILAS_POR_LOTE):
+                tramo = orden[inicio:inicio + FILAS_POR_LOTE]
+                writer.writerows(
+                    (zonas[o], zonas[d], n, round(i, 2))
+                    for o, d, n, i in zip(
+                        matriz.origen[tramo].tolist(),
+                        matriz.destino[tramo].tolist(),
+                        matriz.viajes[tramo].tolist(),
+                        matriz.ingresos[tramo].tolist(),
+                    )
+                )
+
+    @staticmethod
+    def exportar_parquet_od(matriz: MatrizOD, ruta_archivo: str):
+        """Exporta la matriz origen-destino a Parquet (zonas como diccionario)."""
+        ServicioExportacion._exportar_od_columnar(matriz, ruta_archivo, "parquet")
+
+    @staticmethod
+    def exportar_arrow_od(matriz: MatrizOD, ruta_archivo: str):
+        """Como 'exportar_parquet_od' pero en formato Arrow IPC (archivo Feather v2)."""
+        ServicioExportacion._exportar_od_columnar(matriz, ruta_archivo, "arrow")
+
+    @staticmethod
+    def formato_columnar(ruta_archivo: str) -> str:
+        """'arrow' si la extensión es de Arrow IPC; 'parquet' en otro caso."""
+        return "arrow" if ruta_archivo.lower().endswith(EXTENSIONES_ARROW) else "parquet"
+
+    @staticmethod
+    def _cargar_arrow():
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "La exportación Parquet/Arrow requiere pyarrow (pip install pyarrow)"
+            ) from e
+        return pa, pq
+
+    @staticmethod
+    def _abrir_escritor(ruta_archivo: str, esquema: "pa.Schema", formato: str):
+        """Escritor por lotes (write_batch) de Parquet o Arrow IPC, ambos comprimidos."""
+        pa, pq = ServicioExportacion._cargar_arrow()
+        if formato == "arrow":
+            # Los diccionarios solo crecen entre lotes: se escriben como deltas
+            opciones = pa.ipc.IpcWriteOptions(
+                compression=COMPRESION_COLUMNAR, emit_dictionary_deltas=True
+            )
+            return pa.ipc.new_file(ruta_archivo, esquema, options=opciones)
+        return pq.ParquetWriter(
+            ruta_archivo, esquema, compression=COMPRESION_COLUMNAR, use_dictionary=True
+        )
+
+    @staticmethod
+    def _exportar_global_columnar(
+        lista_datos: Iterable[Dict[str, Any]], ruta_archivo: str, formato: str
+    ):
+        pa, _ = ServicioExportacion._cargar_arrow()
+        registros = iter(lista_datos)
+        lote = [ServicioExportacion._fila_global(d) for d in islice(registros, DESTINOS_POR_LOTE)]
+        esquema = ServicioExportacion._esquema_global(pa, lote)
+        # Códigos de las columnas de texto, compartidos por todos los lotes
+        diccionarios = {c.name: {} for c in esquema if pa.types.is_dictionary(c.type)}
+        with ServicioExportacion._abrir_escritor(ruta_archivo, esquema, formato) as escritor:
+            while lote:
+                escritor.write_batch(
+                    ServicioExportacion._lote_global(pa, lote, esquema, diccionarios)
+                )
+                lote = [
+                    ServicioExportacion._fila_global(d)
+                    for d in islice(registros, DESTINOS_POR_LOTE)
+                ]
+
+    @staticmethod
+    def _lote_global(
+        pa, filas: List[Dict[str, Any]], esquema: "pa.Schema", diccionarios: Dict[str, dict]
+    ) -> "pa.RecordBatch":
+        """
+        Lote de filas agregadas. Las columnas de texto se codifican con un
+        diccionario que solo crece, de modo que cada lote amplía el anterior
+        (Arrow IPC no admite reemplazar diccionarios dentro de un archivo).
+        """
+        columnas = []
+        for campo in esquema:
+            valores = [fila.get(campo.name) for fila in filas]
+            if campo.name in diccionarios:
+                codigos = diccionarios[campo.name]
+                indices = [codigos.setdefault(v, len(codigos)) for v in valores]
+                columnas.append(
+                    pa.DictionaryArray.from_arrays(
+                        ServicioExportacion._array_arrow(pa, np.array(indices, dtype=np.int32)),
+                        ServicioExportacion._textos_arrow(pa, list(codigos)),
+                    )
+                )
+            elif campo.name == "top_origenes":
+                columnas.append(ServicioExportacion._top_origenes_arrow(pa, valores, campo.type))
+            else:
+                nulos = np.array([v is None for v in valores], dtype=bool)
+                tipo = np.int64 if pa.types.is_integer(campo.type) else np.float64
+                numeros = np.array([0 if v is None else v for v in valores], dtype=tipo)
+                columnas.append(ServicioExportacion._array_arrow(pa, numeros, nulos))
+        return pa.RecordBatch.from_arrays(columnas, schema=esquema)
+
+    @staticmethod
+    def _array_arrow(
+        pa, valores: np.ndarray, nulos: Optional[np.ndarray] = None, tipo=None
+    ) -> "pa.Array":
+        """
+        Array de Arrow de ancho fijo montado sobre el búfer de 'valores'.
+
+        Los arrays se construyen a partir de búferes y no con 'pa.array', que
+        importa pandas (para reconocer sus tipos) aunque reciba arrays de numpy:
+        así el modo por lotes no carga pandas.
+        """
+        valores = np.ascontiguousarray(valores)
+        validez = None
+        if nulos is not None and nulos.any():
+            validez = pa.py_buffer(np.packbits(~nulos, bitorder="little"))
+        return pa.Array.from_buffers(
+            tipo or pa.from_numpy_dtype(valores.dtype),
+            len(valores),
+            [validez, pa.py_buffer(valores)],
+        )
+
+    @staticmethod
+    def _textos_arrow(pa, textos: Iterable[str]) -> "pa.Array":
+        """Array de texto de Arrow (ver '_array_arrow')."""
+        codificados = [str(t).encode("utf-8") for t in textos]
+        desplazamientos = np.zeros(len(codificados) + 1, dtype=np.int32)
+        np.cumsum([len(t) for t in codificados], out=desplazamientos[1:])
+        return pa.StringArray.from_buffers(
+            len(codificados), pa.py_buffer(desplazamientos), pa.py_buffer(b"".join(codificados))
+        )
+
+    @staticmethod
+    def _top_origenes_arrow(pa, listas: List[List[Dict[str, Any]]], tipo) -> "pa.Array":
+        """Columna lista de structs (zona, viajes) del top de orígenes de cada destino."""
+        desplazamientos = np.zeros(len(listas) + 1, dtype=np.int32)
+        np.cumsum([len(top) for top in listas], out=desplazamientos[1:])
+        elementos = [item for top in listas for item in top]
+        pares = pa.StructArray.from_arrays(
+            [
+                ServicioExportacion._textos_arrow(pa, [e["zona"] for e in elementos]),
+                ServicioExportacion._array_arrow(
+                    pa, np.array([e["viajes"] for e in elementos], dtype=np.int64)
+                ),
+            ],
+            names=["zona", "viajes"],
+        )
+        return pa.ListArray.from_arrays(
+            ServicioExportacion._array_arrow(pa, desplazamientos), pares, type=tipo
+        )
+
+    @staticmethod
+    def _fila_global(datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplana el análisis de un destino en una fila de columnas simples."""
+        totales, kpis, pago = datos["totales"], datos["kpis"], datos["pago"]
+        fila = {
+            "destino": datos.get("destino_nombre", "N/A"),
+            "viajes": totales["viajes"],
+            "coste_total": totales["coste"],
+            "distancia_total": totales["distancia"],
+            "distancia_media": kpis["distancia_media"],
+            "velocidad_media": kpis["velocidad_media"],
+            "coste_km": kpis["coste_km"],
+            "coste_min": kpis["coste_min"],
+            "pax_medio": kpis["pax_medio"],
+            "top_pago": pago["top_nombre"],
+            "bizum_pct": pago["bizum_pct"],
+            "efectivo_pct": pago["efectivo_pct"],
+            "otros_pct": pago["otros_pct"],
+            "desglose_total_promedio": datos["desglose"]["total_promedio"],
+        }
+        for item in datos["desglose"]["filas"]:
+            fila[f"promedio_{item['concepto']}"] = item["promedio"]
+        percentiles = datos.get("percentiles", {})
+        for metrica in METRICAS_PERCENTILES:
+            for p in PERCENTILES:
+                fila[f"{metrica}_p{p}"] = percentiles.get(metrica, {}).get(f"p{p}")
+        top = datos.get("grafico", {}).get("top_origenes") or []
+        fila["top_origenes"] = [{"zona": str(z), "viajes": int(v)} for z, v in top]
+        return fila
+
+    @staticmethod
+    def _esquema_global(pa, filas: List[Dict[str, Any]]) -> "pa.Schema":
+        texto = pa.dictionary(pa.int32(), pa.string())
+        campos = []
+        for nombre in (filas[0] if filas else {"destino": "", "viajes": 0}):
+            if nombre in ("destino", "top_pago"):
+                tipo = texto
+            elif nombre == "viajes":
+                tipo = pa.int64()
+            elif nombre == "top_origenes":
+                tipo = pa.list_(pa.struct([("zona", pa.string()), ("viajes", pa.int64())]))
+            else:
+                tipo = pa.float64()
+            campos.append(pa.field(nombre, tipo))
+        return pa.schema(campos)
+
+    @staticmethod
+    def _exportar_viajes_columnar(viajes: VistaViajes, ruta_archivo: str, formato: str):
+        pa, _ = ServicioExportacion._cargar_arrow()
+        nombres = list(viajes.cabeceras) + [
+            c for c in COLUMNAS_DERIVADAS_EXPORTADAS if viajes.tiene_columna(c)
+        ]
+        diccionario_zonas = ServicioExportacion._textos_arrow(pa, viajes.zonas)
+        # Columnas de texto ya codificadas (almacén mapeado): su vocabulario se
+        # convierte una vez y cada lote solo aporta los códigos
+        diccionarios = {}
+        for nombre in nombres:
+            codificada = viajes[:0].texto_codificado(nombre)
+            if codificada is not None:
+                diccionarios[nombre] = ServicioExportacion._textos_arrow(pa, codificada[1])
 
-            top_key = (
-                pago["top_nombre"].lower() if pago["top_nombre"] != "N/A" else "otros"
+        def lote(inicio: int) -> "pa.RecordBatch":
+            tramo = viajes[inicio:inicio + FILAS_POR_LOTE]
+            return pa.RecordBatch.from_arrays(
+                [
+                    ServicioExportacion._columna_arrow(
+                        pa, nombre, tramo, diccionario_zonas, diccionarios.get(nombre)
+                    )
+                    for nombre in nombres
+                ],
+                names=nombres,
             )
-            # Mapear nombre top a su porcentaje usando las keys estandarizadas
-            pct_key = (
-                "bizum_pct"
-                if "bizum" in top_key
-                else ("efectivo_pct" if "efectivo" in top_key else "otros_pct")
+
+        primero = lote(0)
+        with ServicioExportacion._abrir_escritor(ruta_archivo, primero.schema, formato) as escritor:
+            escritor.write_batch(primero)
+            for inicio in range(FILAS_POR_LOTE, len(viajes), FILAS_POR_LOTE):
+                escritor.write_batch(lote(inicio))
+
+    @staticmethod
+    def _exportar_od_columnar(matriz: MatrizOD, ruta_archivo: str, formato: str):
+        pa, _ = ServicioExportacion._cargar_arrow()
+        orden = ServicioExportacion._orden_od(matriz)
+        diccionario_zonas = ServicioExportacion._textos_arrow(pa, matriz.zonas)
+        array = ServicioExportacion._array_arrow
+        lote = pa.RecordBatch.from_arrays(
+            [
+                pa.DictionaryArray.from_arrays(
+                    array(pa, matriz.origen[orden].astype(np.int32)), diccionario_zonas
+                ),
+                pa.DictionaryArray.from_arrays(
+                    array(pa, matriz.destino[orden].astype(np.int32)), diccionario_zonas
+                ),
+                array(pa, matriz.viajes[orden]),
+                array(pa, matriz.ingresos[orden]),
+            ],
+            names=["Origen", "Destino", "Viajes", "Ingresos"],
+        )
+        with ServicioExportacion._abrir_escritor(ruta_archivo, lote.schema, formato) as escritor:
+            escritor.write_batch(lote)
+
+    @staticmethod
+    def _orden_od(matriz: MatrizOD) -> np.ndarray:
+        """Celdas de la matriz ordenadas por nombre de origen y de destino."""
+        rango = np.empty(len(matriz.zonas), dtype=np.int64)
+        rango[np.argsort(np.asarray(matriz.zonas, dtype=object), kind="stable")] = np.arange(
+            len(matriz.zonas)
+        )
+        return np.lexsort((rango[matriz.destino], rango[matriz.origen]))
+
+    @staticmethod
+    def _columna_arrow(
+        pa, nombre: str, viajes: VistaViajes, diccionario_zonas, diccionario=None
+    ) -> "pa.Array":
+        """
+        Columna del almacén como array de Arrow con su tipo lógico. Con
+        'diccionario' (vocabulario de una columna de texto codificada) se
+        exportan sus códigos como DictionaryArray, sin decodificar el texto.
+        """
+        if diccionario is not None:
+            codigos, _ = viajes.texto_codificado(nombre)
+            return pa.DictionaryArray.from_arrays(
+                ServicioExportacion._array_arrow(pa, codigos.astype(np.int32, copy=False)),
+                diccionario,
             )
-            pct_val = pago.get(pct_key, 0)
-
-            filas.append(
-                {
-                    "Destino": datos.get("destino_nombre", "N/A"),
-                    "Viajes": totales["viajes"],
-                    "Coste Total": totales["coste"],
-                    "Distancia Media": kpis["distancia_media"],
-                    "Velocidad Media": kpis["velocidad_media"],
-                    "Coste/Km": kpis["coste_km"],
-                    "Coste/Min": kpis["coste_min"],
-                    "Pax Medio": kpis["pax_medio"],
-                    "Top Pago": pago["top_nombre"],
-                    "Pago Top %": pct_val,
-                }
+        valores = viajes.columna(nombre)
+        if nombre in COLUMNAS_ZONA:
+            return pa.DictionaryArray.from_arrays(
+                ServicioExportacion._array_arrow(pa, valores.astype(np.int32, copy=False)),
+                diccionario_zonas,
             )
+        if nombre in COLUMNAS_FECHA:
+            # Minutos desde 1970 -> timestamp en segundos; SIN_FECHA -> nulo
+            vacias = valores == SIN_FECHA
+            segundos = np.where(vacias, 0, valores) * 60
+            return ServicioExportacion._array_arrow(pa, segundos, vacias, pa.timestamp("s"))
+        if valores.dtype.kind in "OU":
+            # Parquet las codifica con diccionario al escribir
+            return ServicioExportacion._textos_arrow(pa, valores)
+        # NaN (valor no numérico en el CSV) -> nulo
+        valores = np.asarray(valores)
+        nulos = np.isnan(valores) if valores.dtype.kind == "f" else None
+        return ServicioExportacion._array_arrow(pa, valores, nulos)
 
-        with open(ruta_archivo, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=encabezados)
-            writer.writeheader()
-            writer.writerows(filas)
+    @staticmethod
+    def _cabeceras_percentiles() -> List[str]:
+        """Columnas 'Importe p50', 'Importe p90'... de los CSV."""
+        return [
+            f"{ETIQUETAS_PERCENTILES[metrica]} p{p}"
+            for metrica in METRICAS_PERCENTILES
+            for p in PERCENTILES
+        ]
 
     @staticmethod
-    def exportar_json_global(lista_datos: list, ruta_archivo: str):
-        """Exporta la lista completa de datos de todos los destinos a JSON."""
-        # Limpiar datos no serializables (graficos) de cada entrada
-        datos_limpios = []
-        for d in lista_datos:
-            d_safe = d.copy()
-            if "grafico" in d_safe:
-                del d_safe["grafico"]
-            datos_limpios.append(d_safe)
+    def _valores_percentiles(datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Valores de '_cabeceras_percentiles' (vacío si no hay datos)."""
+        percentiles = datos.get("percentiles", {})
+        valores = {}
+        for metrica in METRICAS_PERCENTILES:
+            for p in PERCENTILES:
+                valor = percentiles.get(metrica, {}).get(f"p{p}")
+                valores[f"{ETIQUETAS_PERCENTILES[metrica]} p{p}"] = "" if valor is None else valor
+        return valores
 
-        with open(ruta_archivo, "w", encoding="utf-8") as f:
-            json.dump(datos_limpios, f, indent=4, ensure_ascii=False)
+    @staticmethod
+    def _tabla_md_percentiles(datos: Dict[str, Any]) -> str:
+        """Tabla Markdown con una fila por métrica y una columna por percentil."""
+        percentiles = datos.get("percentiles", {})
+        lineas = [
+            "| Métrica | " + " | ".join(f"p{p}" for p in PERCENTILES) + " |",
+            "|---------|" + "------|" * len(PERCENTILES),
+        ]
+        for metrica in METRICAS_PERCENTILES:
+            celdas = []
+            for p in PERCENTILES:
+                valor = percentiles.get(metrica, {}).get(f"p{p}")
+                celdas.append("-" if valor is None else f"{valor:.2f}")
+            etiqueta = f"{ETIQUETAS_PERCENTILES[metrica]} ({UNIDADES_PERCENTILES[metrica]})"
+            lineas.append(f"| {etiqueta} | " + " | ".join(celdas) + " |")
+        return "\n".join(lineas) + "\n"
+
+    @staticmethod
+    def _serializable(datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia superficial sin 'grafico' (datos de la gráfica, no del informe)."""
+        return {clave: valor for clave, valor in datos.items() if clave != "grafico"}
+
+    @staticmethod
+    def _abrir(
+        ruta_archivo: str, comprimir: Optional[bool] = None, newline: Optional[str] = None
+    ) -> TextIO:
+        """Abre la salida en modo texto UTF-8, con gzip si se pide o la ruta acaba en '.gz'."""
+        if comprimir is None:
+            comprimir = ruta_archivo.endswith(".gz")
+        if comprimir:
+            return gzip.open(ruta_archivo, "wt", encoding="utf-8", newline=newline)
+        return open(ruta_archivo, "w", encoding="utf-8", newline=newline)
 
     @staticmethod
     def exportar_png(figura, ruta_archivo: str):
@@ -0,0 +1,82 @@
+import unicodedata
+from typing import Dict, List, Sequence, Tuple
+
+# Longitud máxima de los fragmentos indexados. Consultas de hasta esta longitud
+# se resuelven con una sola búsqueda en el diccionario.
+LONGITUD_NGRAMA = 3
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, para que 'cafe' encuentre 'Café'."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class IndiceBusqueda:
+    """
+    Índice de subcadenas para la búsqueda incremental de destinos.
+
+    Guarda, para cada fragmento de 1 a LONGITUD_NGRAMA caracteres, la lista
+    ordenada de nombres que lo contienen. Una consulta corta es una sola
+    consulta al diccionario; una larga parte de la lista más corta de sus
+    trigramas y comprueba solo esos candidatos. Si la consulta amplía la
+    anterior (el usuario sigue escribiendo), se filtra el resultado previo,
+    que siempre es menor.
+
+    Los resultados son posiciones en la secuencia original: primero los
+    nombres que empiezan por la consulta y después el resto, cada grupo en el
+    orden original.
+    """
+
+    def __init__(self, nombres: Sequence[str]):
+        self._normalizados = [normalizar(n) for n in nombres]
+        self._fragmentos: Dict[str, List[int]] = {}
+        for i, texto in enumerate(self._normalizados):
+            vistos = set()
+            for k in range(1, LONGITUD_NGRAMA + 1):
+                for j in range(len(texto) - k + 1):
+                    fragmento = texto[j:j + k]
+                    if fragmento not in vistos:
+                        vistos.add(fragmento)
+                        self._fragmentos.setdefault(fragmento, []).append(i)
+        self._ultima: Tuple[str, List[int]] = ("", list(range(len(self._normalizados))))
+
+    def __len__(self) -> int:
+        return len(self._normalizados)
+
+    def buscar(self, consulta: str) -> List[int]:
+        """
+        Posiciones de los nombres que contienen la consulta (sin distinguir
+        mayúsculas ni tildes). Una consulta vacía devuelve todos.
+        """
+        texto = normalizar(consulta.strip())
+        if not texto:
+            return list(range(len(self._normalizados)))
+
+        candidatos = self._candidatos(texto)
+        anterior, resultado = self._ultima
+        if anterior and texto.startswith(anterior) and len(resultado) < len(candidatos):
+            candidatos = resultado
+
+        if len(texto) > LONGITUD_NGRAMA or candidatos is resultado:
+            normalizados = self._normalizados
+            candidatos = [i for i in candidatos if texto in normalizados[i]]
+        self._ultima = (texto, candidatos)
+
+        prefijo, resto = [], []
+        for i in candidatos:
+            (prefijo if self._normalizados[i].startswith(texto) else resto).append(i)
+        return prefijo + resto
+
+    def _candidatos(self, texto: str) -> List[int]:
+        """Nombres que contienen todos los fragmentos indexables de la consulta."""
+        if len(texto) <= LONGITUD_NGRAMA:
+            return self._fragmentos.get(texto, [])
+        # La lista más corta entre los trigramas acota los candidatos
+        return min(
+            (
+                self._fragmentos.get(texto[j:j + LONGITUD_NGRAMA], [])
+                for j in range(len(texto) - LONGITUD_NGRAMA + 1)
+            ),
+            key=len,
+        )
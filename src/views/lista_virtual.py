@@ -0,0 +1,192 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+from typing import List, Optional, Sequence
+
+from src.config import Configuracion
+from src.services.indice_busqueda import IndiceBusqueda
+
+
+class ListaVirtual(ttk.Frame):
+    """
+    Lista de texto virtualizada sobre un Canvas.
+
+    Solo existen los elementos gráficos de las filas visibles (un rectángulo y
+    un texto por fila, reutilizados al desplazarse), así que cargar o filtrar
+    miles de destinos no crea miles de entradas de Tk. El filtro usa un
+    IndiceBusqueda y la selección se guarda por nombre: sobrevive a los
+    cambios de filtro aunque la fila deje de estar visible.
+
+    Al seleccionar con el ratón o el teclado genera '<<ListboxSelect>>', como
+    un tk.Listbox.
+    """
+
+    def __init__(self, padre, fuente=None, **opciones):
+        super().__init__(padre, style="Panel.TFrame", **opciones)
+        self._fuente = fuente or (Configuracion.FUENTE_FAMILIA, 12)
+        self._alto_fila = tkfont.Font(font=self._fuente).metrics("linespace") + 8
+
+        self.canvas = tk.Canvas(
+            self,
+            bg=Configuracion.COLOR_PANEL_LATERAL,
+            bd=0,
+            highlightthickness=0,
+            cursor="hand2",
+            takefocus=1,
+        )
+        self.barra = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.barra.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self._elementos: List[str] = []
+        self._indice = IndiceBusqueda([])
+        self._filtro = ""
+        self._visibles: List[int] = []  # Posiciones en _elementos que pasan el filtro
+        self._seleccion: Optional[str] = None
+        self._desplazamiento = 0  # Píxeles desde la primera fila
+        self._filas: List[tuple] = []  # (rectángulo, texto) reutilizables
+
+        self.canvas.bind("<Configure>", lambda _: self._repintar())
+        self.canvas.bind("<Button-1>", self._clic)
+        self.canvas.bind("<MouseWheel>", self._rueda)
+        self.canvas.bind("<Button-4>", lambda _: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda _: self.yview("scroll", 3, "units"))
+        self.canvas.bind("<Up>", lambda _: self._mover_seleccion(-1))
+        self.canvas.bind("<Down>", lambda _: self._mover_seleccion(1))
+
+    # --- Datos ---
+
+    def cargar(self, elementos: Sequence[str]) -> None:
+        """Sustituye los elementos (reindexa) y borra la selección."""
+        self._elementos = list(elementos)
+        self._indice = IndiceBusqueda(self._elementos)
+        self._seleccion = None
+        self.filtrar(self._filtro)
+
+    def filtrar(self, texto: str) -> None:
+        """Muestra solo los elementos que contienen 'texto'."""
+        self._filtro = texto
+        self._visibles = self._indice.buscar(texto)
+        self._desplazamiento = 0
+        self._repintar()
+
+    def cantidad(self) -> int:
+        """Número total de elementos (sin filtrar)."""
+        return len(self._elementos)
+
+    def visibles(self) -> List[str]:
+        """Elementos que pasan el filtro actual, en el orden mostrado."""
+        return [self._elementos[i] for i in self._visibles]
+
+    # --- Selección ---
+
+    def seleccion(self) -> Optional[str]:
+        return self._seleccion
+
+    def seleccionar(self, elemento: str, notificar: bool = False) -> None:
+        """Marca un elemento y lo hace visible si pasa el filtro."""
+        if elemento not in self._elementos:
+            return
+        self._seleccion = elemento
+        fila = self._fila_de(elemento)
+        if fila is not None:
+            self.ver(fila)
+        self._repintar()
+        if notificar:
+            self.event_generate("<<ListboxSelect>>")
+
+    def _fila_de(self, elemento: str) -> Optional[int]:
+        for fila, i in enumerate(self._visibles):
+            if self._elementos[i] == elemento:
+                return fila
+        return None
+
+    def _clic(self, evento: tk.Event) -> None:
+        self.canvas.focus_set()
+        fila = (self._desplazamiento + evento.y) // self._alto_fila
+        if 0 <= fila < len(self._visibles):
+            self.seleccionar(self._elementos[self._visibles[fila]], notificar=True)
+
+    def _mover_seleccion(self, paso: int) -> None:
+        if not self._visibles:
+            return
+        actual = self._fila_de(self._seleccion) if self._seleccion is not None else None
+        fila = 0 if actual is None else min(max(actual + paso, 0), len(self._visibles) - 1)
+        if fila != actual:
+            self.seleccionar(self._elementos[self._visibles[fila]], notificar=True)
+
+    # --- Desplazamiento ---
+
+    def yview(self, *args) -> None:
+        """Protocolo de desplazamiento de Tk ('moveto' / 'scroll'), para la Scrollbar."""
+        total = len(self._visibles) * self._alto_fila
+        if args and args[0] == "moveto":
+            self._desplazamiento = int(float(args[1]) * total)
+        elif args and args[0] == "scroll":
+            paso = self.canvas.winfo_height() if args[2] == "pages" else self._alto_fila
+            self._desplazamiento += int(args[1]) * paso
+        self._repintar()
+
+    def ver(self, fila: int) -> None:
+        """Desplaza lo mínimo para que la fila quede visible."""
+        alto = self.canvas.winfo_height()
+        arriba = fila * self._alto_fila
+        if arriba < self._desplazamiento:
+            self._desplazamiento = arriba
+        elif arriba + self._alto_fila > self._desplazamiento + alto:
+            self._desplazamiento = arriba + self._alto_fila - alto
+
+    def _rueda(self, evento: tk.Event) -> None:
+        # Windows envía múltiplos de 120; macOS, valores pequeños
+        pasos = -evento.delta // 120 if abs(evento.delta) >= 120 else -evento.delta
+        self.yview("scroll", pasos * 3, "units")
+
+    # --- Dibujo ---
+
+    def _repintar(self) -> None:
+        """Coloca las filas visibles reutilizando los elementos del Canvas."""
+        alto = max(self.canvas.winfo_height(), 1)
+        ancho = self.canvas.winfo_width()
+        total = len(self._visibles) * self._alto_fila
+        self._desplazamiento = min(max(self._desplazamiento, 0), max(total - alto, 0))
+
+        necesarias = alto // self._alto_fila + 2
+        while len(self._filas) < necesarias:
+            self._filas.append(
+                (
+                    self.canvas.create_rectangle(0, 0, 0, 0, width=0),
+                    self.canvas.create_text(
+                        0, 0, anchor="w", font=self._fuente,
+                        fill=Configuracion.COLOR_TEXTO_PRINCIPAL,
+                    ),
+                )
+            )
+
+        primera = self._desplazamiento // self._alto_fila
+        for k, (rectangulo, texto) in enumerate(self._filas):
+            fila = primera + k
+            if k >= necesarias or fila >= len(self._visibles):
+                self.canvas.itemconfigure(rectangulo, state="hidden")
+                self.canvas.itemconfigure(texto, state="hidden")
+                continue
+            elemento = self._elementos[self._visibles[fila]]
+            y = fila * self._alto_fila - self._desplazamiento
+            marcado = elemento == self._seleccion
+            self.canvas.coords(rectangulo, 0, y, ancho, y + self._alto_fila)
+            self.canvas.itemconfigure(
+                rectangulo,
+                state="normal" if marcado else "hidden",
+                fill=Configuracion.COLOR_PRIMARIO,
+            )
+            self.canvas.coords(texto, 6, y + self._alto_fila / 2)
+            self.canvas.itemconfigure(
+                texto,
+                state="normal",
+                text=elemento,
+                fill="white" if marcado else Configuracion.COLOR_TEXTO_PRINCIPAL,
+            )
+
+        if total <= alto:
+            self.barra.set(0.0, 1.0)
+        else:
+            self.barra.set(self._desplazamiento / total, (self._desplazamiento + alto) / total)
@@ -1,10 +1,63 @@
 import tkinter as tk
 from tkinter import ttk
+from types import SimpleNamespace
+
+import numpy as np
 from src.config import Configuracion
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.ticker import MaxNLocator
-import seaborn as sns
+from src.instrumentacion import Instrumentacion
+from src.models.cubo_temporal import DIAS_SEMANA, HORAS_DIA
+from src.services.analytics_service import PERCENTILES
+from src.views.lista_virtual import ListaVirtual
+
+_graficos = None
+
+GRAFICO_MAX_BARRAS = 5    # Barras del gráfico de orígenes (top 5 de la matriz OD)
+GRAFICO_MAX_ETIQUETA = 22  # Caracteres de cada zona antes de recortarla
+# Las llegadas (top de orígenes) ya las muestra el gráfico
+FLUJOS_OD_GRUPOS = (("salidas", "Salen hacia"),)
+# Métricas del mapa de calor día × hora (claves de ServicioAnalisis.perfil_temporal)
+METRICAS_MAPA_CALOR = (
+    ("viajes", "Viajes"),
+    ("ingresos", "Ingresos ($)"),
+    ("importe_medio", "Importe medio ($)"),
+    ("duracion_media", "Duración media (min)"),
+)
+
+# Filas de la tabla de percentiles del panel y formato de cada valor
+PERCENTILES_PANEL = (
+    ("importe", "Importe"),
+    ("distancia", "Distancia"),
+    ("duracion", "Duración"),
+    ("velocidad", "Velocidad"),
+)
+FORMATOS_PERCENTIL = {
+    "importe": "${:.2f}",
+    "distancia": "{:.2f} km",
+    "duracion": "{:.0f} min",
+    "velocidad": "{:.1f} km/h",
+}
+
+
+def cargar_graficos() -> SimpleNamespace:
+    """
+    Importa matplotlib (con el backend de Tk) y seaborn la primera vez que se
+    necesitan. Son la mayor parte del tiempo de arranque, así que no se importan
+    con el módulo: la pantalla de bienvenida aparece sin esperarlos.
+    """
+    global _graficos
+    if _graficos is None:
+        import seaborn as sns
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from matplotlib.ticker import MaxNLocator
+
+        _graficos = SimpleNamespace(
+            sns=sns,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            MaxNLocator=MaxNLocator,
+        )
+    return _graficos
 
 
 class VistaPrincipal(ttk.Frame):
@@ -85,26 +138,36 @@ class VistaPrincipal(ttk.Frame):
             font=(Configuracion.FUENTE_FAMILIA, 14, "bold"),
         ).pack(anchor="w", pady=(0, 15))
 
-        # Listbox personalizado
-        self.lista_destinos = tk.Listbox(
+        # Acceso al panel de rendimiento (solo con la instrumentación activa)
+        self.btn_estadisticas = None
+        if Instrumentacion.activa:
+            self.btn_estadisticas = ttk.Button(
+                self.sidebar, text="⏱ Rendimiento", cursor="hand2"
+            )
+            self.btn_estadisticas.pack(side="bottom", fill="x", pady=(10, 0))
+
+        # Selector de mes (solo visible si se han cargado varios archivos)
+        self.combo_fuente = ttk.Combobox(
+            self.sidebar, state="readonly", font=(Configuracion.FUENTE_FAMILIA, 11)
+        )
+
+        # Búsqueda incremental sobre la lista de destinos
+        self.var_busqueda = tk.StringVar(self)
+        self.entrada_busqueda = ttk.Entry(
             self.sidebar,
-            bg=Configuracion.COLOR_PANEL_LATERAL,
-            fg=Configuracion.COLOR_TEXTO_PRINCIPAL,
-            bd=0,
-            highlightthickness=0,
-            selectbackground=Configuracion.COLOR_PRIMARIO,
-            selectforeground="white",
-            activestyle="none",
-            font=(Configuracion.FUENTE_FAMILIA, 12),
-            cursor="hand2",
+            textvariable=self.var_busqueda,
+            font=(Configuracion.FUENTE_FAMILIA, 11),
         )
-        self.lista_destinos.pack(side="left", fill="both", expand=True)
+        self.entrada_busqueda.pack(fill="x", pady=(0, 10))
+
+        # Lista virtualizada: solo dibuja las filas visibles
+        self.lista_destinos = ListaVirtual(self.sidebar)
+        self.lista_destinos.pack(fill="both", expand=True)
 
-        sb = ttk.Scrollbar(
-            self.sidebar, orient="vertical", command=self.lista_destinos.yview
+        self.var_busqueda.trace_add(
+            "write", lambda *_: self.lista_destinos.filtrar(self.var_busqueda.get())
         )
-        sb.pack(side="right", fill="y")
-        self.lista_destinos.config(yscrollcommand=sb.set)
+        self.entrada_busqueda.bind("<Return>", self._seleccionar_primer_resultado)
 
         # --- CONTENIDO (DERECHA) ---
         self.content_area = ttk.Frame(self.marco_actual, style="App.TFrame", padding=30)
@@ -139,25 +202,168 @@ class VistaPrincipal(ttk.Frame):
         )
         self.lbl_placeholder.pack(expand=True)
 
-    def actualizar_lista_destinos(self, destinos):
-        self.lista_destinos.delete(0, tk.END)
-        for d in destinos:
-            self.lista_destinos.insert(tk.END, d)
+        # El informe se construye con el primer análisis y después solo se actualiza
+        self._informe = None
+        self._grafico = None
+        self._callbacks = {}
+        self.figura_actual = None
+
+    def mostrar_progreso_carga(self, filas: int, fraccion: float):
+        """Muestra en el subtítulo del panel el avance de la carga de datos."""
+        if not hasattr(self, "lbl_subtitulo_analisis"):
+            return
+        if fraccion >= 1.0:
+            texto = "Selecciona un destino para comenzar"
+        else:
+            texto = f"Cargando datos... {fraccion:.0%} ({filas:,} viajes)"
+        self.lbl_subtitulo_analisis.config(text=texto)
+        # Forzar el repintado: la carga se ejecuta en el hilo de la UI
+        self.update_idletasks()
+
+    def mostrar_aviso(self, texto: str):
+        """Muestra en el subtítulo del panel un aviso de la carga (p. ej. modo de almacén)."""
+        if hasattr(self, "lbl_subtitulo_analisis"):
+            self.lbl_subtitulo_analisis.config(text=texto)
+
+    def mostrar_cargando(self, destino: str):
+        """Estado de carga mientras se calcula el análisis de un destino."""
+        self.lbl_titulo_analisis.config(text=destino)
+        self.lbl_subtitulo_analisis.config(text="Calculando análisis...")
+
+    def mostrar_error(self, destino: str, mensaje: str):
+        """
+        Sustituye el estado de carga por un mensaje de error y oculta el informe
+        anterior, que ya no corresponde al destino seleccionado.
+        """
+        self.lbl_titulo_analisis.config(text=destino)
+        self.lbl_subtitulo_analisis.config(text=f"No se pudo calcular el análisis: {mensaje}")
+        if self._informe is not None:
+            self._informe.contenedor.pack_forget()
 
-    def mostrar_analisis(self, destino: str, datos: dict, callbacks: dict = None):
+    def mostrar_estadisticas(self, etapas, contadores, acciones: dict):
+        """
+        Ventana con los tiempos por etapa y los contadores de la instrumentación.
+
+        Args:
+            etapas: Filas de 'Instrumentacion.resumen()'.
+            contadores: Diccionario nombre -> valor.
+            acciones: Callbacks 'actualizar', 'exportar' y 'reiniciar'.
+        """
+        if getattr(self, "ventana_estadisticas", None) and self.ventana_estadisticas.winfo_exists():
+            ventana = self.ventana_estadisticas
+            for w in ventana.winfo_children():
+                w.destroy()
+        else:
+            ventana = self.ventana_estadisticas = tk.Toplevel(self)
+            ventana.title("Rendimiento")
+            ventana.geometry("640x480")
+            ventana.configure(bg=Configuracion.COLOR_TARJETA)
+
+        marco = ttk.Frame(ventana, style="Panel.TFrame", padding=20)
+        marco.pack(fill="both", expand=True)
+
+        ttk.Label(marco, text="Tiempos por etapa", style="TituloPanel.TLabel").pack(anchor="w")
+
+        cols = ("Etapa", "Llamadas", "Total", "Media", "Max")
+        tabla = ttk.Treeview(marco, columns=cols, show="headings", height=12)
+        for col, texto, ancho, ancla in (
+            ("Etapa", "Etapa", 220, "w"),
+            ("Llamadas", "Llamadas", 70, "e"),
+            ("Total", "Total (ms)", 90, "e"),
+            ("Media", "Media (ms)", 90, "e"),
+            ("Max", "Máx (ms)", 90, "e"),
+        ):
+            tabla.heading(col, text=texto, anchor=ancla)
+            tabla.column(col, width=ancho, anchor=ancla)
+        tabla.pack(fill="both", expand=True, pady=(5, 10))
+
+        for fila in etapas:
+            tabla.insert(
+                "",
+                "end",
+                values=(
+                    fila["etapa"],
+                    fila["llamadas"],
+                    f"{fila['total_ms']:.1f}",
+                    f"{fila['media_ms']:.2f}",
+                    f"{fila['max_ms']:.1f}",
+                ),
+            )
+
+        for nombre, valor in sorted(contadores.items()):
+            ttk.Label(marco, text=f"{nombre}: {valor:,}", style="Secundario.TLabel").pack(anchor="w")
+
+        botones = ttk.Frame(marco, style="Panel.TFrame")
+        botones.pack(fill="x", pady=(10, 0))
+        for texto, clave in (("Actualizar", "actualizar"), ("Exportar traza", "exportar"), ("Reiniciar", "reiniciar")):
+            ttk.Button(botones, text=texto, command=acciones[clave]).pack(side="left", padx=(0, 5))
+
+    TODAS_LAS_FUENTES = "Todos los meses"
+
+    def actualizar_fuentes(self, fuentes):
+        """Muestra el selector de mes cuando hay más de un archivo cargado."""
+        if len(fuentes) > 1:
+            self.combo_fuente.config(values=[self.TODAS_LAS_FUENTES, *fuentes])
+            self.combo_fuente.set(self.TODAS_LAS_FUENTES)
+            self.combo_fuente.pack(fill="x", pady=(0, 10), before=self.entrada_busqueda)
+        else:
+            self.combo_fuente.pack_forget()
+
+    def obtener_fuente_seleccionada(self):
+        """Fuente elegida en el selector, o None para todas."""
+        valor = self.combo_fuente.get()
+        return None if valor in ("", self.TODAS_LAS_FUENTES) else valor
+
+    def seleccionar_destino(self, destino: str):
+        """Marca un destino en la lista lateral (sin disparar el evento)."""
+        self.lista_destinos.seleccionar(destino)
+
+    def obtener_destino_seleccionado(self):
+        """Destino marcado en la lista lateral, o None."""
+        return self.lista_destinos.seleccion()
+
+    def actualizar_lista_destinos(self, destinos):
+        self.lista_destinos.cargar(destinos)
+
+    def _seleccionar_primer_resultado(self, evento=None):
+        """Enter en la búsqueda: abre el primer destino que coincide."""
+        resultados = self.lista_destinos.visibles()
+        if resultados:
+            self.lista_destinos.seleccionar(resultados[0], notificar=True)
+
+    @Instrumentacion.medir("vista.mostrar_analisis", "vista")
+    def mostrar_analisis(
+        self,
+        destino: str,
+        datos: dict,
+        callbacks: dict = None,
+        flujos: dict = None,
+        temporal: dict = None,
+    ):
         """
         Orquesta la renderización del dashboard.
 
+        Los widgets del informe se crean la primera vez; en las siguientes
+        selecciones solo se actualizan sus textos, las filas de la tabla y las
+        barras del gráfico.
+
         Args:
             destino: Nombre del destino seleccionado.
             datos: Diccionario de datos ya procesados por el servicio.
             callbacks: Diccionario de funciones para acciones (exportar, etc).
+            flujos: Principales orígenes y destinos de la zona (ver
+                ServicioAnalisis.flujos_od). Sus 'llegadas' alimentan el gráfico
+                de orígenes y sus 'salidas' la tabla de flujos; sin él, el
+                gráfico usa el top del análisis y la tabla se oculta.
+            temporal: Matrices día × hora del destino (ver
+                ServicioAnalisis.perfil_temporal). Sin él se oculta el mapa de calor.
         """
-        # Limpiar dashboard anterior
-        self.figura_actual = None  # Reset figura
-        plt.close("all")
-        for w in self.report_card.winfo_children():
-            w.destroy()
+        if self._informe is None:
+            self.lbl_placeholder.destroy()
+            self._informe = self._construir_informe()
+        elif not self._informe.contenedor.winfo_ismapped():
+            # Oculto tras un error (ver mostrar_error)
+            self._informe.contenedor.pack(fill="both", expand=True)
 
         # Actualizar Título Principal
         viajes_count = datos["totales"]["viajes"]
@@ -166,7 +372,33 @@ class VistaPrincipal(ttk.Frame):
             text=f"Reporte de actividad • {viajes_count} viajes registrados"
         )
 
-        # --- Layout Principal (Grid 2x2 + Botonera) ---
+        # 1. Actualizar Componentes
+        if flujos:
+            top = [(f["zona"], f["viajes"]) for f in flujos.get("llegadas", [])]
+        else:
+            top = datos["grafico"]["top_origenes"]
+        self._renderizar_grafico(top)
+        self._renderizar_kpis_top(datos["totales"], datos["kpis"])
+        self._renderizar_percentiles(datos.get("percentiles", {}))
+        self._renderizar_panel_inferior(datos["kpis"], datos["pago"], datos["desglose"])
+        self._renderizar_flujos_od(flujos)
+        self._renderizar_mapa_calor(temporal)
+
+        # 2. Botones de Exportación (Mosaico): visibles solo si hay acciones
+        self._callbacks = callbacks or {}
+        if callbacks:
+            self._informe.botonera.grid()
+        else:
+            self._informe.botonera.grid_remove()
+
+        # 3. Footer
+        self._renderizar_footer(datos["ultimo_registro"])
+
+    def _construir_informe(self) -> SimpleNamespace:
+        """
+        Crea una sola vez el layout del informe (Grid 2x2 + Botonera) con todos
+        sus widgets. Los textos variables quedan en StringVar.
+        """
         contenedor = ttk.Frame(self.report_card, style="Panel.TFrame")
         contenedor.pack(fill="both", expand=True)
 
@@ -174,29 +406,26 @@ class VistaPrincipal(ttk.Frame):
         contenedor.columnconfigure(1, weight=1)
         contenedor.rowconfigure(0, weight=0)  # Gráfico + Top KPIs
         contenedor.rowconfigure(1, weight=1)  # Tablas / Detalles
-        contenedor.rowconfigure(2, weight=0)  # Botonera Exportación
-        contenedor.rowconfigure(3, weight=0)  # Footer
-
-        # 1. Renderizar Componentes
-        self._renderizar_grafico(contenedor, datos["grafico"]["top_origenes"])
-        self._renderizar_kpis_top(contenedor, datos["totales"], datos["kpis"])
-        self._renderizar_panel_inferior(
-            contenedor, datos["kpis"], datos["pago"], datos["desglose"]
-        )
-
-        # 2. Renderizar Botones de Exportación (Mosaico)
-        if callbacks:
-            self._renderizar_botones_exportacion(contenedor, callbacks)
-
-        # 3. Renderizar Footer
-        self._renderizar_footer(contenedor, datos["ultimo_registro"])
-
-    def _renderizar_botones_exportacion(self, parent, callbacks):
+        contenedor.rowconfigure(2, weight=0)  # Mapa de calor día × hora
+        contenedor.rowconfigure(3, weight=0)  # Botonera Exportación + Flujos OD
+        contenedor.rowconfigure(4, weight=0)  # Footer
+
+        informe = SimpleNamespace(contenedor=contenedor, textos={})
+        self._grafico = self._crear_grafico(contenedor)
+        self._crear_kpis_top(contenedor, informe.textos)
+        informe.tabla = self._crear_panel_inferior(contenedor, informe.textos)
+        informe.mapa = self._crear_mapa_calor(contenedor)
+        informe.botonera = self._crear_botones_exportacion(contenedor)
+        informe.flujos = self._crear_flujos_od(contenedor)
+        informe.footer = self._crear_footer(contenedor, informe.textos)
+        return informe
+
+    def _crear_botones_exportacion(self, parent):
         """Crea dos grupos de botones para exportación (Global vs Actual) apilados verticalmente."""
         frame_btns = ttk.Frame(parent, style="Panel.TFrame")
         # Cambio IMPORTANTE: columnspan=1 para que se quede en la columna izquierda
         frame_btns.grid(
-            row=2, column=0, columnspan=1, sticky="ew", pady=(20, 0), padx=(0, 20)
+            row=3, column=0, columnspan=1, sticky="ew", pady=(20, 0), padx=(0, 20)
         )
 
         frame_btns.columnconfigure(0, weight=1)
@@ -214,9 +443,15 @@ class VistaPrincipal(ttk.Frame):
         fg_btns.pack(fill="x")
         fg_btns.columnconfigure(0, weight=1)
         fg_btns.columnconfigure(1, weight=1)
+        fg_btns.columnconfigure(2, weight=1)
+        fg_btns.columnconfigure(3, weight=1)
+        fg_btns.columnconfigure(4, weight=1)
 
-        self._crear_boton_export(fg_btns, 0, "CSV", "csv", "📄", callbacks)
-        self._crear_boton_export(fg_btns, 1, "JSON", "json", "｛ ｝", callbacks)
+        self._crear_boton_export(fg_btns, 0, "CSV", "csv", "📄")
+        self._crear_boton_export(fg_btns, 1, "JSON", "json", "｛ ｝")
+        self._crear_boton_export(fg_btns, 2, "NDJSON", "ndjson", "≡")
+        self._crear_boton_export(fg_btns, 3, "Parquet", "parquet", "▦")
+        self._crear_boton_export(fg_btns, 4, "Matriz OD", "od", "⇄")
 
         # --- GRUPO INFERIOR: ACTUAL ---
         f_actual = ttk.Frame(frame_btns, style="Panel.TFrame")
@@ -231,23 +466,32 @@ class VistaPrincipal(ttk.Frame):
         fa_btns.pack(fill="x")
         fa_btns.columnconfigure(0, weight=1)
         fa_btns.columnconfigure(1, weight=1)
+        fa_btns.columnconfigure(2, weight=1)
 
-        self._crear_boton_export(fa_btns, 0, "Markdown", "md", "M↓", callbacks)
-        self._crear_boton_export(fa_btns, 1, "Imagen", "png", "🖼", callbacks)
+        self._crear_boton_export(fa_btns, 0, "Markdown", "md", "M↓")
+        self._crear_boton_export(fa_btns, 1, "Imagen", "png", "🖼")
+        self._crear_boton_export(fa_btns, 2, "Viajes", "viajes", "▦")
+        return frame_btns
 
-    def _crear_boton_export(self, parent, col, text, key, icon, callbacks):
+    def _crear_boton_export(self, parent, col, text, key, icon):
         """Helper par crear un botón de exportación individual."""
 
         def cmd():
-            return callbacks.get(key, lambda: None)()
+            # Se consulta al pulsar: los callbacks llegan con cada análisis
+            return self._callbacks.get(key, lambda: None)()
 
         btn = ttk.Button(
             parent, text=f"{icon} {text}", command=cmd, style="Primario.TButton"
         )
         btn.grid(row=0, column=col, sticky="ew", padx=5)
 
-    def _renderizar_grafico(self, parent, top_data):
-        """Genera el gráfico de barras en el cuadrante superior izquierdo."""
+    def _crear_grafico(self, parent):
+        """
+        Crea una sola vez la figura, las barras y el lienzo de Tk del cuadrante
+        superior izquierdo. Los márgenes son fijos para no recalcular el layout
+        (tight_layout) en cada selección.
+        """
+        g = cargar_graficos()
         frame = ttk.Frame(parent, style="Panel.TFrame")
         frame.grid(row=0, column=0, sticky="nsew", padx=(0, 20), pady=(0, 20))
 
@@ -258,49 +502,72 @@ class VistaPrincipal(ttk.Frame):
             font=(Configuracion.FUENTE_FAMILIA, 12, "bold"),
         ).pack(anchor="w", pady=(0, 5))
 
-        if top_data is not None:
-            fig, ax = plt.subplots(figsize=(3, 2), dpi=100)
-            self.figura_actual = fig  # Guardar referencia para exportar
-
-            fig.patch.set_facecolor(Configuracion.COLOR_TARJETA)
-            ax.set_facecolor(Configuracion.COLOR_TARJETA)
-
-            sns.barplot(
-                x=top_data.values,
-                y=top_data.index,
-                ax=ax,
-                hue=top_data.index,
-                legend=False,
-                palette="Blues_r",
-                edgecolor="none",
-            )
+        # Figure directamente (sin pyplot): no queda registrada en el gestor global
+        fig = g.Figure(figsize=(3, 2), dpi=100)
+        ax = fig.add_subplot()
+        fig.patch.set_facecolor(Configuracion.COLOR_TARJETA)
+        ax.set_facecolor(Configuracion.COLOR_TARJETA)
+        fig.subplots_adjust(left=0.42, right=0.95, top=0.95, bottom=0.2)
+
+        posiciones = range(GRAFICO_MAX_BARRAS)
+        barras = ax.barh(posiciones, [0] * GRAFICO_MAX_BARRAS, edgecolor="none")
+
+        # Estilizado limpio
+        ax.spines["top"].set_visible(False)
+        ax.spines["right"].set_visible(False)
+        ax.spines["left"].set_visible(False)
+        ax.spines["bottom"].set_color("#cbd5e1")
+        ax.xaxis.set_major_locator(g.MaxNLocator(integer=True))
+
+        ax.set_xlabel("Viajes", color=Configuracion.COLOR_TEXTO_SECUNDARIO, fontsize=8)
+        ax.tick_params(axis="x", colors=Configuracion.COLOR_TEXTO_SECUNDARIO, labelsize=8)
+        ax.tick_params(
+            axis="y", colors=Configuracion.COLOR_TEXTO_PRINCIPAL, labelsize=8, length=0
+        )
 
-            # Estilizado limpio
-            ax.spines["top"].set_visible(False)
-            ax.spines["right"].set_visible(False)
-            ax.spines["left"].set_visible(False)
-            ax.spines["bottom"].set_color("#cbd5e1")
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        canvas = g.FigureCanvasTkAgg(fig, master=frame)
+        canvas.get_tk_widget().pack(fill="both", expand=True)
 
-            ax.set_xlabel(
-                "Viajes", color=Configuracion.COLOR_TEXTO_SECUNDARIO, fontsize=8
-            )
-            ax.set_ylabel("", color=Configuracion.COLOR_TEXTO_SECUNDARIO)
-            ax.tick_params(
-                axis="x", colors=Configuracion.COLOR_TEXTO_SECUNDARIO, labelsize=8
-            )
-            ax.tick_params(
-                axis="y", colors=Configuracion.COLOR_TEXTO_PRINCIPAL, labelsize=8
-            )
+        return SimpleNamespace(
+            marco=frame, figura=fig, ejes=ax, barras=barras, lienzo=canvas
+        )
+
+    @Instrumentacion.medir("vista.grafico", "vista")
+    def _renderizar_grafico(self, top_data):
+        """
+        Actualiza las barras del gráfico persistente y pide un repintado diferido.
 
-            plt.tight_layout()
+        Args:
+            top_data: Pares (zona, viajes) de mayor a menor.
+        """
+        grafico = self._grafico
+
+        n = min(len(top_data), GRAFICO_MAX_BARRAS)
+        valores = [float(v) for _, v in top_data[:n]]
+        colores = cargar_graficos().sns.color_palette("Blues_r", n) if n else []
+        for i, barra in enumerate(grafico.barras):
+            visible = i < n
+            barra.set_visible(visible)
+            if visible:
+                barra.set_width(valores[i])
+                barra.set_facecolor(colores[i])
+
+        ax = grafico.ejes
+        nombres = [str(z) or "(sin zona)" for z, _ in top_data[:n]]
+        ax.set_yticks(range(n))
+        ax.set_yticklabels(
+            [z if len(z) <= GRAFICO_MAX_ETIQUETA else z[: GRAFICO_MAX_ETIQUETA - 1] + "…"
+             for z in nombres]
+        )
+        # Mismo orden que barplot: la primera categoría arriba
+        ax.set_ylim(max(n, 1) - 0.5, -0.5)
+        ax.set_xlim(0, max(valores, default=1) * 1.05)
 
-            canvas = FigureCanvasTkAgg(fig, master=frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.figura_actual = grafico.figura if n else None  # Referencia para exportar
+        grafico.lienzo.draw_idle()
 
-    def _renderizar_kpis_top(self, parent, totales, kpis):
-        """Renderiza la cuadrícula de KPIs numéricos en el cuadrante superior derecho."""
+    def _crear_kpis_top(self, parent, textos):
+        """Crea la cuadrícula de KPIs numéricos en el cuadrante superior derecho."""
         frame = ttk.Frame(parent, style="Panel.TFrame")
         frame.grid(row=0, column=1, sticky="nsew", padx=(10, 0), pady=(0, 0))
 
@@ -311,19 +578,64 @@ class VistaPrincipal(ttk.Frame):
         grid_kpis.columnconfigure(1, weight=1)
 
         metricas = [
-            (0, 0, "Viajes Totales", str(totales["viajes"])),
-            (0, 1, "Coste Total", f"${totales['coste']:,.0f}"),
-            (1, 0, "Distancia Media", f"{kpis['distancia_media']:.2f} km"),
-            (1, 1, "Velocidad Media", f"{kpis['velocidad_media']:.1f} km/h"),
-            (2, 0, "Coste / Km", f"${kpis['coste_km']:.2f}"),
-            (2, 1, "Coste / Min", f"${kpis['coste_min']:.2f}"),
+            (0, 0, "Viajes Totales", "viajes"),
+            (0, 1, "Coste Total", "coste"),
+            (1, 0, "Distancia Media", "distancia_media"),
+            (1, 1, "Velocidad Media", "velocidad_media"),
+            (2, 0, "Coste / Km", "coste_km"),
+            (2, 1, "Coste / Min", "coste_min"),
         ]
 
-        for row, col, lbl, val in metricas:
-            self._crear_kpi_grid(grid_kpis, row, col, lbl, val)
+        for row, col, lbl, clave in metricas:
+            textos[clave] = tk.StringVar(self)
+            self._crear_kpi_grid(grid_kpis, row, col, lbl, textos[clave])
 
-    def _renderizar_panel_inferior(self, parent, kpis, pago, desglose):
-        """Renderiza las métricas de pago/pax y la tabla de desglose."""
+        # Percentiles (colas de la distribución que las medias ocultan)
+        grid_pct = ttk.Frame(frame, style="Panel.TFrame")
+        grid_pct.pack(fill="x", pady=(5, 0), padx=5)
+        for col in range(len(PERCENTILES) + 1):
+            grid_pct.columnconfigure(col, weight=1)
+
+        for col, p in enumerate(PERCENTILES, start=1):
+            ttk.Label(grid_pct, text=f"p{p}", style="KPI.Label.TLabel").grid(
+                row=0, column=col, sticky="e"
+            )
+        for row, (metrica, etiqueta) in enumerate(PERCENTILES_PANEL, start=1):
+            ttk.Label(grid_pct, text=etiqueta, style="KPI.Label.TLabel").grid(
+                row=row, column=0, sticky="w", pady=1
+            )
+            for col, p in enumerate(PERCENTILES, start=1):
+                clave = f"{metrica}_p{p}"
+                textos[clave] = tk.StringVar(self)
+                ttk.Label(
+                    grid_pct,
+                    textvariable=textos[clave],
+                    style="Secundario.TLabel",
+                    font=(Configuracion.FUENTE_FAMILIA, 10),
+                ).grid(row=row, column=col, sticky="e")
+
+    def _renderizar_kpis_top(self, totales, kpis):
+        """Actualiza los KPIs numéricos del cuadrante superior derecho."""
+        textos = self._informe.textos
+        textos["viajes"].set(str(totales["viajes"]))
+        textos["coste"].set(f"${totales['coste']:,.0f}")
+        textos["distancia_media"].set(f"{kpis['distancia_media']:.2f} km")
+        textos["velocidad_media"].set(f"{kpis['velocidad_media']:.1f} km/h")
+        textos["coste_km"].set(f"${kpis['coste_km']:.2f}")
+        textos["coste_min"].set(f"${kpis['coste_min']:.2f}")
+
+    def _renderizar_percentiles(self, percentiles):
+        """Actualiza la tabla de p50/p90/p99 de importe, distancia, duración y velocidad."""
+        textos = self._informe.textos
+        for metrica, _ in PERCENTILES_PANEL:
+            formato = FORMATOS_PERCENTIL[metrica]
+            valores = percentiles.get(metrica, {})
+            for p in PERCENTILES:
+                valor = valores.get(f"p{p}")
+                textos[f"{metrica}_p{p}"].set("-" if valor is None else formato.format(valor))
+
+    def _crear_panel_inferior(self, parent, textos):
+        """Crea las métricas de pago/pax y la tabla de desglose. Devuelve la tabla."""
 
         # --- A. Métricas Extra (Cuadrante Inferior Izq) ---
         frame_extra = ttk.Frame(parent, style="Panel.TFrame")
@@ -339,23 +651,20 @@ class VistaPrincipal(ttk.Frame):
         ttk.Label(sub_pago, text="Pref. Pago", style="KPI.Label.TLabel").pack(
             anchor="w"
         )
-        top_pago = pago.get("top_nombre", "N/A")
+        textos["top_pago"] = tk.StringVar(self)
         ttk.Label(
             sub_pago,
-            text=top_pago,
+            textvariable=textos["top_pago"],
             style="KPI.Value.TLabel",
             foreground=Configuracion.COLOR_PRIMARIO,
             font=(Configuracion.FUENTE_FAMILIA, 14, "bold"),
         ).pack(anchor="w", pady=(0, 5))
 
-        for k, v in [
-            ("Bizum", pago.get("bizum_pct", 0)),
-            ("Efectivo", pago.get("efectivo_pct", 0)),
-            ("Otros", pago.get("otros_pct", 0)),
-        ]:
+        for clave in ("bizum_pct", "efectivo_pct", "otros_pct"):
+            textos[clave] = tk.StringVar(self)
             ttk.Label(
                 sub_pago,
-                text=f"{k}: {v:.0f}%",
+                textvariable=textos[clave],
                 style="Secundario.TLabel",
                 font=(Configuracion.FUENTE_FAMILIA, 9),
             ).pack(anchor="w")
@@ -367,9 +676,10 @@ class VistaPrincipal(ttk.Frame):
         ttk.Label(sub_pax, text="Pax / Viaje", style="KPI.Label.TLabel").pack(
             anchor="w"
         )
+        textos["pax_medio"] = tk.StringVar(self)
         ttk.Label(
             sub_pax,
-            text=f"{kpis['pax_medio']:.1f}",
+            textvariable=textos["pax_medio"],
             style="KPI.Value.TLabel",
             font=(Configuracion.FUENTE_FAMILIA, 24, "bold"),
         ).pack(anchor="w", pady=(0, 5))
@@ -397,38 +707,205 @@ class VistaPrincipal(ttk.Frame):
         tabla.column("Porcentaje", width=60, anchor="e")
 
         tabla.pack(fill="x", expand=True)
+        tabla.tag_configure("total", font=(Configuracion.FUENTE_FAMILIA, 10, "bold"))
+        return tabla
+
+    def _renderizar_panel_inferior(self, kpis, pago, desglose):
+        """Actualiza las métricas de pago/pax y las filas de la tabla de desglose."""
+        textos = self._informe.textos
+        textos["top_pago"].set(pago.get("top_nombre", "N/A"))
+        for k, clave in [
+            ("Bizum", "bizum_pct"),
+            ("Efectivo", "efectivo_pct"),
+            ("Otros", "otros_pct"),
+        ]:
+            textos[clave].set(f"{k}: {pago.get(clave, 0):.0f}%")
+        textos["pax_medio"].set(f"{kpis['pax_medio']:.1f}")
 
-        for item in desglose["filas"]:
-            tabla.insert(
-                "",
-                "end",
-                values=(
+        filas = [
+            (
+                (
                     item["concepto"],
                     f"${item['promedio']:.2f}",
                     f"{item['porcentaje']:.1f}%",
                 ),
+                (),
             )
-
+            for item in desglose["filas"]
+        ]
         prom_total = desglose["total_promedio"]
-        tabla.insert(
-            "", "end", values=("TOTAL", f"${prom_total:.2f}", "100.0%"), tags=("total",)
+        filas.append((("TOTAL", f"${prom_total:.2f}", "100.0%"), ("total",)))
+
+        # Reutilizar las filas existentes; solo se insertan o borran las que sobran
+        tabla = self._informe.tabla
+        existentes = tabla.get_children()
+        for i, (valores, etiquetas) in enumerate(filas):
+            if i < len(existentes):
+                tabla.item(existentes[i], values=valores, tags=etiquetas)
+            else:
+                tabla.insert("", "end", values=valores, tags=etiquetas)
+        if len(existentes) > len(filas):
+            tabla.delete(*existentes[len(filas):])
+
+    def _crear_mapa_calor(self, parent):
+        """
+        Crea una sola vez el mapa de calor día de la semana × hora (ancho
+        completo, bajo las tablas) con un selector de métrica. Como el gráfico
+        de barras, la imagen se actualiza con set_data sin rehacer la figura.
+        """
+        g = cargar_graficos()
+        frame = ttk.Frame(parent, style="Panel.TFrame")
+        frame.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(20, 0))
+
+        cabecera = ttk.Frame(frame, style="Panel.TFrame")
+        cabecera.pack(fill="x", pady=(0, 5))
+        ttk.Label(
+            cabecera,
+            text="Actividad por día y hora",
+            style="TituloPanel.TLabel",
+            font=(Configuracion.FUENTE_FAMILIA, 11, "bold"),
+        ).pack(side="left")
+
+        etiquetas = [etiqueta for _, etiqueta in METRICAS_MAPA_CALOR]
+        metrica = tk.StringVar(self, value=etiquetas[0])
+        selector = ttk.Combobox(
+            cabecera, textvariable=metrica, values=etiquetas, state="readonly", width=20
         )
-        tabla.tag_configure("total", font=(Configuracion.FUENTE_FAMILIA, 10, "bold"))
+        selector.pack(side="right")
+        selector.bind("<<ComboboxSelected>>", lambda _: self._pintar_mapa_calor())
+
+        fig = g.Figure(figsize=(6, 2), dpi=100)
+        ax = fig.add_subplot()
+        fig.patch.set_facecolor(Configuracion.COLOR_TARJETA)
+        fig.subplots_adjust(left=0.06, right=0.98, top=0.95, bottom=0.15)
+
+        vacio = np.ma.masked_all((len(DIAS_SEMANA), HORAS_DIA))
+        imagen = ax.imshow(vacio, aspect="auto", cmap="Blues", interpolation="nearest")
+        imagen.cmap.set_bad(Configuracion.COLOR_TARJETA)  # Celdas sin viajes
+        fig.colorbar(imagen, ax=ax, pad=0.01, fraction=0.03).ax.tick_params(labelsize=7)
+
+        ax.set_yticks(range(len(DIAS_SEMANA)))
+        ax.set_yticklabels(DIAS_SEMANA)
+        ax.set_xticks(range(0, HORAS_DIA, 2))
+        ax.set_xticklabels([f"{h}h" for h in range(0, HORAS_DIA, 2)])
+        ax.tick_params(colors=Configuracion.COLOR_TEXTO_SECUNDARIO, labelsize=7, length=0)
+        for borde in ax.spines.values():
+            borde.set_visible(False)
+
+        canvas = g.FigureCanvasTkAgg(fig, master=frame)
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+
+        return SimpleNamespace(
+            marco=frame, metrica=metrica, imagen=imagen, lienzo=canvas, perfil=None
+        )
+
+    def _renderizar_mapa_calor(self, temporal):
+        """Guarda el perfil día × hora del destino y lo pinta (o oculta el mapa)."""
+        mapa = self._informe.mapa
+        mapa.perfil = temporal
+        if not temporal:
+            mapa.marco.grid_remove()
+            return
+        mapa.marco.grid()
+        self._pintar_mapa_calor()
+
+    @Instrumentacion.medir("vista.mapa_calor", "vista")
+    def _pintar_mapa_calor(self):
+        """Pinta la métrica elegida del perfil guardado; solo cambian datos y escala."""
+        mapa = self._informe.mapa
+        if not mapa.perfil:
+            return
+        claves = {etiqueta: clave for clave, etiqueta in METRICAS_MAPA_CALOR}
+        valores = np.ma.masked_invalid(
+            np.asarray(mapa.perfil[claves[mapa.metrica.get()]], dtype=np.float64)
+        )
+        mapa.imagen.set_data(valores)
+        maximo = valores.max() if valores.count() else 0
+        mapa.imagen.set_clim(0, float(maximo) or 1.0)
+        mapa.lienzo.draw_idle()
+
+    def _crear_flujos_od(self, parent):
+        """
+        Crea la tabla de flujos origen-destino (junto a la botonera) con los
+        destinos de los viajes que salen de la zona; los orígenes de los que
+        llegan están en el gráfico. Devuelve el marco y la tabla.
+        """
+        frame = ttk.Frame(parent, style="Panel.TFrame")
+        frame.grid(row=3, column=1, sticky="nsew", pady=(20, 0))
+
+        ttk.Label(
+            frame,
+            text="Flujos OD",
+            style="TituloPanel.TLabel",
+            font=(Configuracion.FUENTE_FAMILIA, 11, "bold"),
+        ).pack(anchor="w", pady=(0, 5))
+
+        tabla = ttk.Treeview(
+            frame, columns=("Viajes", "Ingresos"), show="tree headings", height=6
+        )
+        tabla.heading("#0", text="Zona", anchor="w")
+        tabla.heading("Viajes", text="Viajes", anchor="e")
+        tabla.heading("Ingresos", text="Ingresos ($)", anchor="e")
 
-    def _renderizar_footer(self, parent, ultimo_registro):
+        tabla.column("#0", width=180, anchor="w")
+        tabla.column("Viajes", width=60, anchor="e")
+        tabla.column("Ingresos", width=90, anchor="e")
+
+        for clave, titulo in FLUJOS_OD_GRUPOS:
+            tabla.insert("", "end", iid=clave, text=titulo, open=True, tags=("grupo",))
+        tabla.tag_configure("grupo", font=(Configuracion.FUENTE_FAMILIA, 10, "bold"))
+        tabla.pack(fill="x", expand=True)
+        return frame, tabla
+
+    def _renderizar_flujos_od(self, flujos):
+        """Actualiza las filas de cada grupo de la tabla de flujos (o la oculta)."""
+        frame, tabla = self._informe.flujos
+        if not flujos:
+            frame.grid_remove()
+            return
+        frame.grid()
+
+        for clave, _ in FLUJOS_OD_GRUPOS:
+            filas = [
+                (f["zona"] or "(sin zona)", (f"{f['viajes']:,}", f"${f['ingresos']:,.2f}"))
+                for f in flujos.get(clave, [])
+            ]
+            # Reutilizar las filas existentes, como en la tabla de desglose
+            existentes = tabla.get_children(clave)
+            for i, (zona, valores) in enumerate(filas):
+                if i < len(existentes):
+                    tabla.item(existentes[i], text=zona, values=valores)
+                else:
+                    tabla.insert(clave, "end", text=zona, values=valores)
+            if len(existentes) > len(filas):
+                tabla.delete(*existentes[len(filas):])
+
+    def _crear_footer(self, parent, textos):
+        """Crea el pie de página (oculto hasta que haya último registro)."""
+        separador = ttk.Separator(parent, orient="horizontal")
+        separador.grid(row=4, column=0, columnspan=2, sticky="ew", pady=(20, 10))
+        textos["ultimo_registro"] = tk.StringVar(self)
+        etiqueta = ttk.Label(
+            parent, textvariable=textos["ultimo_registro"], style="Secundario.TLabel"
+        )
+        etiqueta.grid(row=5, column=0, columnspan=2, sticky="w")
+        return (separador, etiqueta)
+
+    def _renderizar_footer(self, ultimo_registro):
         """Muestra el pie de página con información del último registro."""
         if ultimo_registro:
-            ttk.Separator(parent, orient="horizontal").grid(
-                row=3, column=0, columnspan=2, sticky="ew", pady=(20, 10)
-            )
-            info = f"Ultimo registro: {ultimo_registro.get('Hora_inicio')}"
-            ttk.Label(parent, text=info, style="Secundario.TLabel").grid(
-                row=4, column=0, columnspan=2, sticky="w"
+            self._informe.textos["ultimo_registro"].set(
+                f"Ultimo registro: {ultimo_registro.get('Hora_inicio')}"
             )
-
-    def _crear_kpi_grid(self, parent, row, col, label, value):
-        """Helper para crear una celda de KPI en un grid."""
+            for w in self._informe.footer:
+                w.grid()
+        else:
+            for w in self._informe.footer:
+                w.grid_remove()
+
+    def _crear_kpi_grid(self, parent, row, col, label, variable):
+        """Helper para crear una celda de KPI en un grid (valor ligado a un StringVar)."""
         f = ttk.Frame(parent, style="Panel.TFrame")
         f.grid(row=row, column=col, sticky="w", pady=10, padx=5)
         ttk.Label(f, text=label, style="KPI.Label.TLabel").pack(anchor="w")
-        ttk.Label(f, text=value, style="KPI.Value.TLabel").pack(anchor="w")
+        ttk.Label(f, textvariable=variable, style="KPI.Value.TLabel").pack(anchor="w")